@@ -1,10 +1,168 @@
 # -*- coding: utf-8 -*-
 # ==========================================
 # DATEI: coolMATH.py
-# VERSION: 44.10 (UnboundLocalError Fix)
-# ZEITSTEMPEL: 20.02.2026 23:15 Uhr
+# VERSION: 44.35 (Zeitspuren)
+# ZEITSTEMPEL: 18.10.2026 19:40 Uhr
 # AUTOR: Michael Schäpers, °coolsulting
 # ==========================================
+# ÄNDERUNGEN v44.35 (gegenüber v44.34):
+# - NEU: Zeitspuren je Rerun — Abschnitte von main() (setup … archiv, footer) mit verschachtelten Spans
+#   für Rechengraph-Knoten, DB-Zugriffe, Exporte und Rechenfunktionen (@gemessen, zeitspur())
+# - device_label/find_samsung_device als Sammelspan je Abschnitt (Summe + Anzahl)
+# - Sidebar (Admin): Wasserfall der letzten 20 Läufe, Abschnitte im Vergleich, JSON-Export (inkl. Chrome-Trace)
+# - setup_page(sidebar=...): Admin-Sidebar nur mit Schalter COOLMATH_ADMIN_PANEL (st.secrets/Umgebung),
+#   sonst wie bisher ausgeblendet
+# ==========================================
+# ÄNDERUNGEN v44.34 (gegenüber v44.33):
+# - NEU: CLI bench — Benchmark-Suite über Physik (calc_*), Gerätesuche, Rechenkette 5/50/500 Zonen,
+#   Projektdatenbank mit 10 000 Projekten, PDF/Word/Excel-Exporte und Preisliste
+# - Ergebnisse als JSON-Baseline (coolmath_bench.json), Exit 1 bei Regression > 25 % (--schwelle)
+# - Vergleich relativ zu einer Referenzlast je Messprobe (robust auf geteilten Maschinen), Bestätigungslauf
+# ==========================================
+# ÄNDERUNGEN v44.33 (gegenüber v44.32):
+# - NEU: inkrementeller Abgleich Board ↔ Projektdatenbank (monday_abgleich), im Worker alle 15 min, legt nie Items an
+#   Pull: items_page mit __last_updated__-Regel + Cursor (100 je Seite), Stand in monday_sync mit 5 min Überlappung
+#   Push: nur von coolMATH gepflegte Felder, nur Abweichungen vom Snapshot, Batch per change_multiple_column_values
+# - Migration 6: monday_status/monday_aktualisiert je Projekt, Tabellen monday_snapshot + monday_sync; Archiv-Spalte Monday
+# - Sidebar (Admin): Stand + „Jetzt abgleichen“; CLI: outbox --abgleich; Stand-in mit Board im Speicher
+# ==========================================
+# ÄNDERUNGEN v44.32 (gegenüber v44.31):
+# - Monday: prozessweite requests.Session (Keep-alive, urllib3-Pool) statt requests.post je Aufruf
+# - create_items(): Batch-Mutation mit Aliasen + GraphQL-Variablen (25 Items je Anfrage), Teilfehler je Item
+# - MondayBudget: Complexity-Budget aus der Antwort (complexity-Feld), Warten bis Reset statt Lastfehler
+# - Outbox holt fällige Aufträge gemeinsam ab und legt deren Items per Batch an; CLI: outbox --archiv (Massen-Abgleich)
+# - CLI: mondaybench — Items/s gegen lokalen Stand-in (monday_testserver)
+# ==========================================
+# ÄNDERUNGEN v44.31 (gegenüber v44.30):
+# - NEU: Monday-Upload über persistente Warteschlange (Migration 5, Tabelle monday_outbox) + Hintergrund-Thread
+#   UI reiht nur ein (Projekt wird archiviert), PDF entsteht im Worker aus dem Archiv
+# - Idempotenz: ein Auftrag je projekt_id, monday_id wird nach create_item sofort gesichert
+# - Exponentielles Backoff mit Jitter (Netz, 429/5xx, Lastgrenzen), dauerhafte Fehler → Status 'fehler'
+# - Statuszeile unter dem Button, Sidebar (Admin) mit Warteschlange; CLI: outbox
+# - MONDAY_API_URL per st.secrets überschreibbar (lokaler Test-Server)
+# ==========================================
+# ÄNDERUNGEN v44.30 (gegenüber v44.29):
+# - NEU: RechenGraph — Eingaben → Kurven → Summen → Peaks → Geräte → Preise → Diagramme je Session
+#   Knoten rechnen nur bei geänderten Eingaben neu (Inhalts-Hash bzw. Vorgänger-Versionen)
+# - Plotly-Figuren, Ergebnis-Matrix und Geräteauslegung werden über Reruns wiederverwendet
+# - Sidebar (Admin): Zeit je Knoten des letzten Laufs
+# ==========================================
+# ÄNDERUNGEN v44.29 (gegenüber v44.28):
+# - DB: 24-h-Lastprofile je Zone/Methode + Gebäudesumme als float32-BLOB (Migration 4, Tabelle projekt_kurven)
+# - db_load_project liefert kurven / gebaeude_kurven als np.frombuffer-Sicht (ohne Kopie, ohne JSON)
+# - Projektarchiv: „Kurven vergleichen“ — Gebäude-Simultankurven mehrerer Projekte überlagert
+# - Sammel-Export nutzt gespeicherte Profile statt Neuberechnung
+# ==========================================
+# ÄNDERUNGEN v44.28 (gegenüber v44.27):
+# - Projektarchiv: Keyset-Pagination (25 je Seite), nur die sichtbare Seite wird abgefragt
+# - Volltextsuche (FTS5, Präfix, ohne Umlaute) über Projekt/Kunde/Bearbeiter; Fallback LIKE
+# - Sortierung neueste/älteste/Projekt/Kunde mit je eigenem Index (Migration 3)
+# - Filter (Suche, Zeitraum, Peak) gemeinsam für Liste und Sammel-Export; db_load_projects entfällt
+# ==========================================
+# ÄNDERUNGEN v44.27 (gegenüber v44.26):
+# - DB: Zonen, Peaks (je Zone + Gebäude, je Methode) und Geräte in eigenen Tabellen statt JSON-Spalten
+# - Indizes (firma, created_at), created_at, (methode, zone, peak_w); Filter „Peak ab kW“ im Sammel-Export
+# - Schemaversion über PRAGMA user_version, Migrationen je Schritt unter Schreibsperre
+# - Altbestand aus JSON übernommen (Spalten bleiben, werden nicht mehr geschrieben)
+# ==========================================
+# ÄNDERUNGEN v44.26 (gegenüber v44.25):
+# - NEU: DBPool — Verbindungen je Vorgang ausgeliehen (with _db() as conn), commit/rollback
+#   max. 8 Verbindungen, WAL, synchronous=NORMAL, busy_timeout 5 s, 8 MB Cache; atexit-Close
+# - db_init(): Schema einmal je Prozess statt bei jedem Rerun
+# - CLI: python coolMATH.py dbbench — N Sessions speichern/laden gleichzeitig
+# ==========================================
+# ÄNDERUNGEN v44.25 (gegenüber v44.24):
+# - NEU: archiv_export()/run_archiv_export() — gefilterte Archiv-Projekte → ZIP
+#   (Kundenbericht, Technikübergabe, Excel-Anfrage, Übergabe-JSON je Projekt)
+# - Worker-Prozesse (spawn), max. 2 × Worker Ergebnisse im Speicher, ZIP inkrementell
+# - db_projekte_iter() (fetchmany) + db_projekte_zaehlen(): Filter Firma/Datum/Suchtext
+# - Archiv speichert Gebäudewerte (Standard, Masse, Raumhöhe); room_inputs_aus_zonen()
+# - UI: Sammel-Export im Projektarchiv mit Fortschritt/Abbruch; CLI: python coolMATH.py archiv
+# ==========================================
+# ÄNDERUNGEN v44.24 (gegenüber v44.23):
+# - NEU: vektor_pdf_chart()/vektor_comparison_chart() — 24h-Kurven als ReportLab-Drawing
+# - PDF-Berichte standardmäßig vektoriell (vektor=True): kein Matplotlib im Exportpfad
+# - PNG-Pfad (Pool + Cache) bleibt über vektor=False; Farben/Linienstile als gemeinsame Konstanten
+# - pdfbench: Zeit und Größe PNG vs. Vektor (5 Zonen: 3.0 s/459 kB → 0.1 s/20 kB)
+# ==========================================
+# ÄNDERUNGEN v44.23 (gegenüber v44.22):
+# - NEU: diagramm_cache() — PNG-Diagramme inhaltsadressiert (SHA-256 über Kurven, Titel, mode_key, dpi)
+# - LRUCache: optionale Byte-Grenze (maxbytes); Diagramm-Cache 256 Bilder / 64 MB
+# - render_diagramme() rendert nur fehlende Diagramme; Statistik in der Sidebar
+# - pdfbench: zusätzlich Spalte mit warmem Cache
+# ==========================================
+# ÄNDERUNGEN v44.22 (gegenüber v44.21):
+# - NEU: render_diagramme() — PDF-Diagramme im prozessweiten Pool (spawn), Story danach
+# - Fortschritt (progress) + Abbruch (abbrechen / Abbrechen-Button → BerichtAbgebrochen)
+# - CLI: python coolMATH.py pdfbench — Wandzeit je Bericht für 5 vs. 50 Zonen
+# ==========================================
+# ÄNDERUNGEN v44.21 (gegenüber v44.20):
+# - ZonenTabelle (spaltenorientiert): 1–500 Zonen statt fester 5
+# - Eingabe: Tabs bis 8 Zonen, darüber seitenweiser Tabellen-Editor (20/Seite)
+# - Zonenliste als CSV importierbar (Spalten wie Batch)
+# - Geräteauswahl je Zone im Session-State, es wird nur die aktuelle Seite gerendert
+# - Exporte für N Zonen (Blöcke à 5), PDF-Legende gekappt, Excel per write_only gestreamt
+# - Archiv speichert die vollständige Zonentabelle
+# ==========================================
+# ÄNDERUNGEN v44.20 (gegenüber v44.19):
+# - NEU: optimiere_konfiguration() — günstigste Kombination RAC Single-Split / FJM Multi-Split
+#   über alle IG-Serien, FJM-AG nach simultanem Gruppen-Peak (Summenkurve VDI 6007 NEU)
+#   Branch-and-Bound (Anschlüsse, kW, Kombination ≤ 130 %), Top-N-Varianten, Zeitlimit
+# - UI: Expander 'Kostenoptimale Konfiguration' vor der finalen Geräteauswahl
+# ==========================================
+# ÄNDERUNGEN v44.19 (gegenüber v44.18):
+# - NEU: geraete_dimensionieren() — Zonen × Methoden × Serien, je Serie ein searchsorted
+#   beliebiger Zuschlag (Skalar oder je Methode), kW/Art.-Nr./Preis/oversized-Matrizen
+# - NEU: guenstigste_serien() — günstigste normgerechte Serie je Zone (UI-Hinweis)
+# - Vergleichstabelle, VDI-Alt-Karten und finale Auswahl lesen aus der Matrix
+# ==========================================
+# ÄNDERUNGEN v44.18 (gegenüber v44.17):
+# - NEU: GeraeteKatalog — IG je Serie, FJM Multi-AG, RAC-AG je Serie als sortierte kW-Arrays
+#   + Artikelnummer-Index; Suche 'kleinstes Gerät >= kW' per np.searchsorted
+# - find_samsung_device, device_label, AG-Auswahl, Preissummen und Exporte nutzen den Katalog
+# - Preise aus der kompilierten Preisliste (Art.-Nr.), IG-/RAC-Preise jetzt in PDF/Word
+# ==========================================
+# ÄNDERUNGEN v44.17 (gegenüber v44.16):
+# - NEU: kompiliere_katalog()/load_katalog() — Excel-Preisliste einmalig → .npy (mmap)
+#   Cache in .coolmath_cache/, Neubau bei geänderter Quelle (Größe/mtime, SHA-256)
+# - load_samsung_prices() + load_samsung_from_file() lesen nur noch den Katalog
+# ==========================================
+# ÄNDERUNGEN v44.16 (gegenüber v44.15):
+# - Kaltstart: pandas/plotly/matplotlib/reportlab/requests erst bei Gebrauch laden
+#   _pdf_engine_laden(), _pyplot(), _http(); Preisliste lazy über fjm_ag_prices()
+# - set_page_config() in setup_page() verschoben (kein st-Aufruf beim Import)
+# - FIX: Monday-Methoden nutzten undefiniertes 'requests' (NameError, still verschluckt)
+# - NEU: python coolMATH.py startzeit — Benchmark Importzeit lazy vs. eager
+# ==========================================
+# ÄNDERUNGEN v44.15 (gegenüber v44.14):
+# - NEU: python coolMATH.py batch <csv|json> --out <ordner> [--workers N]
+#   Prozess-Pool über alle Kerne, je Projekt Übergabe-JSON (build_transfer_report)
+# - FJM_AG / RAC_AG_BY_SERIE / device_label() aus main() auf Modulebene
+# - zonen_ergebnisse(), default_fjm_ag(): gemeinsame Logik für UI und Batch
+# ==========================================
+# ÄNDERUNGEN v44.14 (gegenüber v44.13):
+# - NEU: LRUCache + prozessweiter Speicher (st.cache_resource) — überlebt Reruns
+# - calc_zonen_cached(): nur geänderte Zonen werden neu berechnet (Batch der Fehlzugriffe)
+# - find_samsung_device() gecacht (Kopien), Treffer/Fehlzähler in der Sidebar
+# ==========================================
+# ÄNDERUNGEN v44.13 (gegenüber v44.12):
+# - NEU: Jahresmodus 8760 h — simuliere_jahr() über stündliche Wetterreihe (TRY-CSV)
+#   load_jahresreihe() liest chunkweise, Zustände (RC-Filter, Phasenversatz) laufen mit
+#   Ergebnis je Methode: Jahrespeak, Zeitpunkt, Kühlenergie [kWh]
+# - UI: Expander 'Jahressimulation' mit CSV-Upload
+# ==========================================
+# ÄNDERUNGEN v44.12 (gegenüber v44.11):
+# - VDI 6007: 96h-Einschwingschleife ersetzt durch geschlossene periodische Lösung
+#   vdi_neu_rc_filter() — exakt eingeschwungen, vektorisiert über Zonen
+# - Einschwinghorizont als Parameter (zyklen=4 → bisheriges 96h-Ergebnis)
+# - NEU: vdi_neu_regression() — Abweichung periodisch vs. alte 4-Zyklen-Schleife
+# ==========================================
+# ÄNDERUNGEN v44.11 (gegenüber v44.10):
+# - NEU: calc_alle_methoden_batch() — alle 6 Methoden für N Zonen in einem Aufruf
+#   (N × 6 × 24 ndarray), bitgenau identisch zu den calc_*-Einzelfunktionen
+# - Physik-Kennwerte (U/g/Fc, ΔT, τ/φ/f) als Modul-Konstanten zentralisiert
+# - main(): Zonen-Eingaben werden gesammelt und in einem Batch berechnet
+# ==========================================
 # ÄNDERUNGEN v44.10 (gegenüber v44.9):
 # - FIX: partner_firma UnboundLocalError - wird initial gesetzt, später überschrieben
 # ==========================================
@@ -47,19 +205,21 @@
 # ==========================================
 
 import streamlit as st
-import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
+import contextvars
+import functools
 import json
 import os
 import io
+import sys
 import tempfile
-# PDF: reportlab + python-docx
-from datetime import datetime
+# Lazy geladen (Kaltstart): pandas, plotly, matplotlib, reportlab, python-docx,
+# openpyxl, requests — jeweils erst in der Funktion, die sie braucht
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from typing import Dict, Optional, Tuple
 
 # --- BRANDING KONSTANTEN ---
@@ -71,80 +231,155 @@ CI_WHITE = "#FFFFFF"
 # --- PREISLISTE ---
 PREISLISTE_PATH = "S_Klima_Artikel_Import_2026-02-02-APP.xlsx"
 
-def load_samsung_prices():
-    """Lädt Samsung-Preise aus Excel-Datei"""
-    import os
-    import re
-    
-    # Suche Preisliste in verschiedenen Pfaden
+# Fallback ohne Preisliste (FJM Multi-AG Listenpreise)
+_FJM_AG_PREISE_FALLBACK = {
+    4.0:  {"preis": 2347},
+    5.0:  {"preis": 2706},
+    5.2:  {"preis": 3061},
+    6.8:  {"preis": 3548},
+    8.0:  {"preis": 4494},
+    10.0: {"preis": 5533},
+}
+
+# --- KOMPILIERTER ARTIKELKATALOG ---
+# Das Excel wird einmal in ein strukturiertes .npy übersetzt (memory-mapped,
+# lädt in ms). Meta-JSON hält Größe/mtime/SHA-256 der Quelle → automatischer
+# Neubau, sobald sich das XLSX ändert.
+KATALOG_CACHE_DIR = ".coolmath_cache"
+KATALOG_VERSION   = 1
+_KATALOG_SHEET    = ' Kima 2026-02-02'
+_KUEHLEN_KW_RE    = r'Kühlen\s+(\d+\.?\d*)\s*kW'
+
+
+def _preisliste_finden():
+    """Sucht die Preisliste in den bekannten Pfaden → Pfad oder None"""
     search_paths = [
         PREISLISTE_PATH,
-        os.path.join(os.path.dirname(__file__), PREISLISTE_PATH),
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), PREISLISTE_PATH),
         os.path.join('/mnt/user-data/outputs', PREISLISTE_PATH),
     ]
-    
-    xlsx_path = None
-    for path in search_paths:
-        if os.path.exists(path):
-            xlsx_path = path
-            break
-    
+    return next((p for p in search_paths if os.path.exists(p)), None)
+
+
+def _datei_sha256(path):
+    import hashlib
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def kompiliere_katalog(xlsx_path):
+    """
+    Excel-Preisliste → strukturiertes ndarray (eine Zeile je Artikel).
+    Felder: art_nr, bez, zusatz, gruppe, preis, kuehlen_kw (NaN wenn im
+    Langtext keine Kühlleistung steht). Langtext selbst wird nicht abgelegt.
+    """
+    import re
+    import pandas as pd
+    df = pd.read_excel(xlsx_path, sheet_name=_KATALOG_SHEET)
+    text = lambda c: ["" if pd.isna(v) else str(v) for v in df[c]] if c in df.columns else [""] * len(df)
+    art, bez, zus, grp = (text(c) for c in ("Artikelnummer", "Bezeichnung", "Zusatz", "Artikelgruppe"))
+    kw = []
+    for lt in text("Langtext"):
+        m = re.search(_KUEHLEN_KW_RE, lt, re.IGNORECASE)
+        kw.append(float(m.group(1)) if m else np.nan)
+    breite = lambda werte: max([1] + [len(v) for v in werte])
+    dtype = [("art_nr", f"U{breite(art)}"), ("bez", f"U{breite(bez)}"),
+             ("zusatz", f"U{breite(zus)}"), ("gruppe", f"U{breite(grp)}"),
+             ("preis", "f8"), ("kuehlen_kw", "f8")]
+    kat = np.empty(len(df), dtype=dtype)
+    kat["art_nr"], kat["bez"], kat["zusatz"], kat["gruppe"] = art, bez, zus, grp
+    kat["preis"] = pd.to_numeric(df["Listenpreis"], errors="coerce").to_numpy(dtype=float)
+    kat["kuehlen_kw"] = kw
+    return kat
+
+
+def _katalog_cache_pfade(xlsx_path):
+    stem = os.path.splitext(os.path.basename(xlsx_path))[0]
+    for basis in (os.path.dirname(os.path.abspath(__file__)), tempfile.gettempdir()):
+        d = os.path.join(basis, KATALOG_CACHE_DIR)
+        try:
+            os.makedirs(d, exist_ok=True)
+            if os.access(d, os.W_OK):
+                return os.path.join(d, f"{stem}.npy"), os.path.join(d, f"{stem}.json")
+        except OSError:
+            continue
+    return None, None
+
+
+def load_katalog(xlsx_path=None, force=False):
+    """
+    Lädt den kompilierten Artikelkatalog (memory-mapped), baut ihn bei
+    geänderter Quelle neu. Gültigkeit: Größe + mtime → schnell; bei
+    abweichender mtime entscheidet der SHA-256 (touch/Kopie ohne Neubau).
+    Rückgabe: strukturiertes ndarray oder None (keine Preisliste)
+    """
+    xlsx_path = xlsx_path or _preisliste_finden()
     if not xlsx_path:
-        # Fallback auf hardcoded Preise
-        return {
-            4.0:  {"preis": 2347},
-            5.0:  {"preis": 2706},
-            5.2:  {"preis": 3061},
-            6.8:  {"preis": 3548},
-            8.0:  {"preis": 4494},
-            10.0: {"preis": 5533},
-        }
-    
+        return None
+    npy, meta_pfad = _katalog_cache_pfade(xlsx_path)
+    if npy is None:
+        return kompiliere_katalog(xlsx_path)        # kein beschreibbares Cache-Verzeichnis
+    st_q = os.stat(xlsx_path)
+    meta = {}
+    if not force and os.path.exists(npy) and os.path.exists(meta_pfad):
+        try:
+            with open(meta_pfad, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {}
+    gueltig = (meta.get("version") == KATALOG_VERSION and meta.get("size") == st_q.st_size)
+    if gueltig and meta.get("mtime_ns") != st_q.st_mtime_ns:
+        gueltig = meta.get("sha256") == _datei_sha256(xlsx_path)
+        if gueltig:
+            meta["mtime_ns"] = st_q.st_mtime_ns
+            _katalog_meta_schreiben(meta_pfad, meta)
+    if not gueltig:
+        kat = kompiliere_katalog(xlsx_path)
+        tmp = f"{npy}.{os.getpid()}.tmp.npy"
+        np.save(tmp, kat, allow_pickle=False)
+        os.replace(tmp, npy)
+        _katalog_meta_schreiben(meta_pfad, {
+            "version": KATALOG_VERSION, "quelle": os.path.abspath(xlsx_path),
+            "size": st_q.st_size, "mtime_ns": st_q.st_mtime_ns,
+            "sha256": _datei_sha256(xlsx_path), "artikel": int(len(kat)),
+        })
+    return np.load(npy, mmap_mode="r", allow_pickle=False)
+
+
+def _katalog_meta_schreiben(pfad, meta):
+    tmp = f"{pfad}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, pfad)
+
+
+def samsung_katalog():
+    """Prozessweit geladener Artikelkatalog (None ohne Preisliste)"""
+    return prozess_ressource("samsung_katalog", load_katalog)
+
+
+def load_samsung_prices():
+    """Samsung FJM Multi-AG Preise aus dem kompilierten Artikelkatalog"""
     try:
-        import pandas as pd
-        df = pd.read_excel(xlsx_path, sheet_name=' Kima 2026-02-02')
-        
-        # FJM AG Außengeräte extrahieren
-        fjm_ag = df[(df['Artikelgruppe'] == 'S_FJM') & 
-                    (df['Bezeichnung'].str.contains('AG', case=False)) &
-                    (df['Artikelnummer'].str.startswith('AJ0'))]
-        
+        kat = samsung_katalog()
+        if kat is None:
+            return dict(_FJM_AG_PREISE_FALLBACK)
+        maske = ((kat["gruppe"] == "S_FJM")
+                 & (np.char.find(np.char.upper(kat["bez"]), "AG") >= 0)
+                 & np.char.startswith(kat["art_nr"], "AJ0")
+                 & ~np.isnan(kat["kuehlen_kw"]))
         prices = {}
-        for _, row in fjm_ag.iterrows():
-            langtext = row['Langtext']
-            preis = row['Listenpreis']
-            
-            # kW aus Langtext extrahieren
-            kw_match = re.search(r'Kühlen\s+(\d+\.?\d*)\s*kW', langtext, re.IGNORECASE)
-            if kw_match:
-                kw = float(kw_match.group(1))
-                prices[kw] = {"preis": preis}
-        
-        return prices if prices else {
-            4.0:  {"preis": 2347},
-            5.0:  {"preis": 2706},
-            5.2:  {"preis": 3061},
-            6.8:  {"preis": 3548},
-            8.0:  {"preis": 4494},
-            10.0: {"preis": 5533},
-        }
+        for kw, preis in zip(kat["kuehlen_kw"][maske], kat["preis"][maske]):
+            prices[float(kw)] = {"preis": float(preis)}
+        return prices if prices else dict(_FJM_AG_PREISE_FALLBACK)
     except Exception as e:
         print(f"⚠️ Preisliste konnte nicht geladen werden: {e}")
-        # Fallback
-        return {
-            4.0:  {"preis": 2347},
-            5.0:  {"preis": 2706},
-            5.2:  {"preis": 3061},
-            6.8:  {"preis": 3548},
-            8.0:  {"preis": 4494},
-            10.0: {"preis": 5533},
-        }
+        return dict(_FJM_AG_PREISE_FALLBACK)
 
-# --- GERÄTE-PREISLISTEN (für PDF-Berichte) ---
-FJM_AG_PRICES = load_samsung_prices()
-RAC_AG_PRICES = {
-    # Wird aus main() RAC_AG_BY_SERIE extrahiert falls benötigt
-}
+# Gerätepreise für Berichte: GeraeteKatalog (Abschnitt 3) über Artikelnummer
 
 
 def pdf_safe(text):
@@ -209,15 +444,191 @@ def fmt_number(num, decimals=0):
     return formatted
 
 
+# ==========================================
+# 0. ZEITSPUREN — Instrumentierung je Rerun
+# ==========================================
+# Benannte Zeitabschnitte (Spans) eines Streamlit-Laufs: Abschnitte von main()
+# nacheinander, darin verschachtelt DB-, Export- und Rechenfunktionen.
+# Ohne aktiven Lauf (CLI, Worker-Threads, Fragment-Reruns) kostet ein Span
+# nur das Nachsehen der ContextVar.
+ZEITSPUREN_LAEUFE = 20          # Läufe je Session für die Admin-Sidebar
+
+_zeitspuren_lauf = contextvars.ContextVar("zeitspuren_lauf", default=None)
+
+
+class Zeitspuren:
+    """
+    Spans eines Laufs als Liste [name, start_ms, dauer_ms, tiefe, anzahl].
+    abschnitt() schließt den vorherigen Hauptabschnitt (kein Einrücken von
+    main() nötig), spur() verschachtelt. Gesammelte Spans (sammeln=True,
+    z. B. device_label je Zone) ergeben je Elternspan einen Eintrag mit
+    Summe und Anzahl statt Dutzender Einzelbalken.
+    """
+
+    def __init__(self, nr=0):
+        self.nr      = nr
+        self.zeit    = time.time()
+        self.t0      = time.perf_counter()
+        self.dauer_ms = None
+        self.abgebrochen = False
+        self.spans   = []
+        self._offen  = []       # Stapel offener Spans (Index in spans)
+        self._sammel = {}       # (Elternindex, name) → Index des Sammelspans
+
+    def _ms(self):
+        return (time.perf_counter() - self.t0) * 1000
+
+    def _oeffnen(self, name):
+        self.spans.append([name, self._ms(), None, len(self._offen), 1])
+        self._offen.append(len(self.spans) - 1)
+        return self._offen[-1]
+
+    def _schliessen(self, bis):
+        """Offene Spans bis einschließlich Index 'bis' schließen"""
+        while self._offen and self._offen[-1] >= bis:
+            s = self.spans[self._offen.pop()]
+            s[2] = self._ms() - s[1]
+
+    @contextmanager
+    def spur(self, name, sammeln=False):
+        if not sammeln:
+            i = self._oeffnen(name)
+            try:
+                yield
+            finally:
+                self._schliessen(i)
+            return
+        t = self._ms()
+        try:
+            yield
+        finally:
+            schluessel = (self._offen[-1] if self._offen else None, name)
+            i = self._sammel.get(schluessel)
+            if i is None:
+                i = self._sammel[schluessel] = len(self.spans)
+                self.spans.append([name, t, 0.0, len(self._offen), 0])
+            self.spans[i][2] += self._ms() - t
+            self.spans[i][4] += 1
+
+    def abschnitt(self, name=None):
+        """Nächster Hauptabschnitt (schließt alle offenen Spans); None → nur schließen"""
+        self._schliessen(0)
+        if name:
+            self._oeffnen(name)
+
+    def abschliessen(self, abgebrochen=False):
+        """Lauf beenden; abgebrochen (st.rerun, Fehler): Dauer bis zum Ende des letzten Spans"""
+        if abgebrochen:
+            self.abgebrochen = True
+            self.dauer_ms = max([s + (d or 0.0) for _, s, d, _, _ in self.spans] or [0.0])
+            self._offen.clear()
+        else:
+            self.abschnitt(None)
+            self.dauer_ms = self._ms()
+        return self
+
+    def als_dict(self):
+        return {"lauf": self.nr, "zeit": datetime.fromtimestamp(self.zeit).isoformat(timespec="milliseconds"),
+                "dauer_ms": round(self.dauer_ms if self.dauer_ms is not None else self._ms(), 3),
+                "abgebrochen": self.abgebrochen,
+                "spans": [{"name": n, "start_ms": round(s, 3), "dauer_ms": round(d or 0.0, 3),
+                           "tiefe": t, "anzahl": a} for n, s, d, t, a in self.spans]}
+
+
+@contextmanager
+def zeitspur(name, sammeln=False):
+    """Span im aktuellen Lauf (ohne Aufzeichnung: nichts)"""
+    lauf = _zeitspuren_lauf.get()
+    if lauf is None:
+        yield
+        return
+    with lauf.spur(name, sammeln):
+        yield
+
+
+def gemessen(fn=None, *, sammeln=False):
+    """Dekorator: Aufruf als Span (Name = Funktionsname); @gemessen oder @gemessen(sammeln=True)"""
+    if fn is None:
+        return lambda f: gemessen(f, sammeln=sammeln)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        lauf = _zeitspuren_lauf.get()
+        if lauf is None:
+            return fn(*args, **kwargs)
+        with lauf.spur(fn.__name__, sammeln):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def zeitspuren_beginnen():
+    """
+    Aufzeichnung für diesen Lauf starten (Beginn von main()). Ein Vorlauf, der
+    main() nicht zu Ende gebracht hat (st.rerun, Fehler), wird als
+    abgebrochen abgelegt.
+    """
+    vorlauf = st.session_state.pop("zeitspuren_offen", None)
+    if vorlauf is not None:
+        _zeitspuren_ablegen(vorlauf.abschliessen(abgebrochen=True))
+    laeufe = st.session_state.get("zeitspuren") or []
+    lauf = Zeitspuren((laeufe[-1]["lauf"] if laeufe else 0) + 1)
+    st.session_state["zeitspuren_offen"] = lauf
+    _zeitspuren_lauf.set(lauf)
+    return lauf
+
+
+def _zeitspuren_ablegen(lauf):
+    laeufe = st.session_state.setdefault("zeitspuren", [])
+    laeufe.append(lauf.als_dict())
+    del laeufe[:-ZEITSPUREN_LAEUFE]
+    return laeufe
+
+
+def zeitspuren_abschliessen(lauf):
+    """Lauf beenden und in der Session ablegen (die letzten ZEITSPUREN_LAEUFE)"""
+    _zeitspuren_lauf.set(None)
+    st.session_state.pop("zeitspuren_offen", None)
+    return _zeitspuren_ablegen(lauf.abschliessen())
+
+
+def zeitspuren_json(laeufe):
+    """
+    Export für die Offline-Analyse: eigene Läufe plus traceEvents im
+    Chrome-Trace-Format (direkt in Perfetto / chrome://tracing ladbar,
+    ein Lauf je Zeile).
+    """
+    events = []
+    for lauf in laeufe:
+        basis = datetime.fromisoformat(lauf["zeit"]).timestamp() * 1e6
+        events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": lauf["lauf"],
+                       "args": {"name": f"Lauf {lauf['lauf']}"}})
+        events += [{"name": s["name"], "ph": "X", "pid": 1, "tid": lauf["lauf"],
+                    "ts": round(basis + s["start_ms"] * 1000), "dur": round(s["dauer_ms"] * 1000),
+                    "args": {"anzahl": s["anzahl"]}} for s in lauf["spans"]]
+    return json.dumps({"laeufe": laeufe, "traceEvents": events}, ensure_ascii=False, indent=1)
+
+
 # ==========================================
 # 1. SETUP & CSS (Kein weißer Balken Bug)
 # ==========================================
-try:
-    st.set_page_config(page_title="coolMATH Pro Simulation", layout="wide", initial_sidebar_state="collapsed")
-except Exception:
-    pass
+def admin_panel_aktiv():
+    """Admin-Sidebar nur mit Schalter COOLMATH_ADMIN_PANEL (st.secrets oder Umgebung), Standard aus"""
+    wert = os.environ.get("COOLMATH_ADMIN_PANEL", "")
+    try:
+        wert = st.secrets.get("COOLMATH_ADMIN_PANEL", wert)
+    except Exception:
+        pass
+    return str(wert).strip().lower() in ("1", "true", "ja", "yes", "on")
 
-def setup_page():
+
+@gemessen
+def setup_page(sidebar=False):
+    """Seitenlayout + CSS; sidebar=True (Admins): Sidebar sichtbar und ausgeklappt"""
+    try:
+        st.set_page_config(page_title="coolMATH Pro Simulation", layout="wide",
+                           initial_sidebar_state="expanded" if sidebar else "collapsed")
+    except Exception:
+        pass
     st.markdown(f"""
         <style>
         /* Basis Reset */
@@ -239,10 +650,8 @@ def setup_page():
         [data-testid="stDecoration"] {{
             display: none !important;
         }}
-        /* Sidebar verstecken */
-        [data-testid="stSidebar"] {{
-            display: none;
-        }}
+        /* Sidebar verstecken (außer für Admins: Cache, Warteschlange, Zeitspuren) */
+        {"" if sidebar else '[data-testid="stSidebar"] { display: none; }'}
         /* Streiche den Deploy-Button */
         .stDeployButton {{
             display: none !important;
@@ -553,20 +962,29 @@ SOLAR_DB = {
     "SUED-WEST":  [0,0,0,0,0,0,20,50,80,120,200,350,500,620,650,580,450,250,80,20,0,0,0,0],
 }
 
+# Physikalische Kennwerte (gemeinsam für Einzel- und Batch-Berechnung)
+U_WERTE  = {"Altbau": 1.7, "Bestand": 0.8, "Neubau (GEG)": 0.28, "Passivhaus": 0.15}
+G_WERTE  = {"Einfach": 0.85, "Doppel": 0.65, "Dreifach": 0.50, "Sonnenschutz": 0.32}
+FC_WERTE = {"Keine": 1.0, "Vorhang (Innen)": 0.6, "Raffstore (Aussen)": 0.25, "Rollladen": 0.15}
+# Auslegungs-ΔT je Standard [K]
+DT_STANDARD = {"Altbau": 9.0, "Bestand": 7.0, "Neubau (GEG)": 5.0, "Passivhaus": 3.0}
+# Praktiker q-Werte [W/m²]
+Q_STD_PRAK = {"Altbau": 90.0, "Bestand": 75.0, "Neubau (GEG)": 55.0, "Passivhaus": 35.0}
+Q_ORI_PRAK = {"SUED": 15, "SUED-OST": 12, "SUED-WEST": 12, "WEST": 8, "OST": 5, "NORD": 0}
+# Baumasse: RC-Zeitkonstante τ [h], Phasenverschiebung φ [h], Dämpfung f
+TAU_BAUMASSE = {"Schwer (Beton/Stein)": 18.0, "Mittel (Ziegel/Holz-Beton)": 10.0, "Leicht (Holz/Trockenbau)": 4.0}
+PHI_BAUMASSE = {"Schwer (Beton/Stein)": 10, "Mittel (Ziegel/Holz-Beton)": 6, "Leicht (Holz/Trockenbau)": 2}
+F_BAUMASSE   = {"Schwer (Beton/Stein)": 0.55, "Mittel (Ziegel/Holz-Beton)": 0.70, "Leicht (Holz/Trockenbau)": 0.88}
+
 def get_phys_constants(standard, glass, shade):
     """Physikalische Konstanten je Gebäudestandard"""
-    u_vals  = {"Altbau": 1.7, "Bestand": 0.8, "Neubau (GEG)": 0.28, "Passivhaus": 0.15}
-    g_vals  = {"Einfach": 0.85, "Doppel": 0.65, "Dreifach": 0.50, "Sonnenschutz": 0.32}
-    fc_vals = {"Keine": 1.0, "Vorhang (Innen)": 0.6, "Raffstore (Aussen)": 0.25, "Rollladen": 0.15}
-    return u_vals.get(standard, 0.8), g_vals.get(glass, 0.65), fc_vals.get(shade, 1.0)
+    return U_WERTE.get(standard, 0.8), G_WERTE.get(glass, 0.65), FC_WERTE.get(shade, 1.0)
 
 
 def calc_praktiker(area, orient, standard, glass, shade, pers, tech):
     """METHODE 1: Praktiker (Heuristik) — q-Wert je Standard, Orientierung, Sonnenschutz REDUZIERT"""
     _, _, fc = get_phys_constants(standard, glass, shade)
-    q_std  = {"Altbau": 90.0, "Bestand": 75.0, "Neubau (GEG)": 55.0, "Passivhaus": 35.0}
-    q_ori  = {"SUED": 15, "SUED-OST": 12, "SUED-WEST": 12, "WEST": 8, "OST": 5, "NORD": 0}
-    q_base = (q_std.get(standard, 75.0) + q_ori.get(orient, 0)) * fc
+    q_base = (Q_STD_PRAK.get(standard, 75.0) + Q_ORI_PRAK.get(orient, 0)) * fc
     q_int  = (pers * 100 + tech) / max(area, 1)
     return np.full(24, area * (q_base + q_int))
 
@@ -574,8 +992,7 @@ def calc_recknagel(area, orient, standard, glass, shade, pers, tech, win_area):
     """METHODE 4: Recknagel — Q_tr (dT standard-abh.) + Q_solar + Q_int"""
     u, g, fc = get_phys_constants(standard, glass, shade)
     sol_raw  = np.array(SOLAR_DB[orient], dtype=float)
-    dT_map   = {"Altbau": 9.0, "Bestand": 7.0, "Neubau (GEG)": 5.0, "Passivhaus": 3.0}
-    delta_T  = dT_map.get(standard, 6.0)
+    delta_T  = DT_STANDARD.get(standard, 6.0)
     q_tr     = area * u * delta_T
     q_st     = sol_raw * win_area * g * fc
     q_int    = np.array([
@@ -591,20 +1008,92 @@ def calc_vdi_alt(reck_curve):
     return reck_curve * 1.20
 
 
-def calc_vdi_neu(area, orient, standard, glass, shade, pers, tech, win_area, bau_m):
-    """METHODE 3: VDI 6007 — RC-Tiefpass, gleiche Eingangslast wie Recknagel"""
+def vdi_neu_rc_filter(q_ext, tau, zyklen=None):
+    """
+    RC-Tiefpass VDI 6007 in geschlossener Form, vektorisiert über Zonen.
+    Rekursion q[h] = q[h-1] + (q_ext[h] - q[h-1]) / (τ+1)  ⇔  q[h] = a·q[h-1] + b·q_ext[h]
+    mit a = τ/(τ+1), b = 1/(τ+1).
+    q_ext:  (N × 24) oder (24,) Eingangslast [W]
+    tau:    Zeitkonstante(n) [h], Skalar oder (N,)
+    zyklen: None → exakt periodisch eingeschwungener Zustand (zyklische Lösung)
+            k    → Zustand nach k Tageszyklen Einschwingen ab 0 (Legacy: 4 = 96h)
+    """
+    x    = np.asarray(q_ext, dtype=float)
+    flat = x.ndim == 1
+    x    = x.reshape(-1, 24)
+    tau  = np.broadcast_to(np.asarray(tau, dtype=float), (x.shape[0],))
+    a    = tau / (tau + 1)
+    b    = 1.0 / (tau + 1)
+    # y[h] = b/(1-a^24) · Σ_k a^k · x[(h-k) mod 24]
+    idx  = (HOURS[:, None] - HOURS[None, :]) % 24
+    w    = a[:, None] ** HOURS[None, :]
+    y    = (x[:, idx] * w[:, None, :]).sum(axis=2) * (b / (1 - a ** 24))[:, None]
+    if zyklen is not None:
+        # Einschwingen ab 0: fehlender Rest der geometrischen Reihe
+        # y_k[h] = y[h] - a^(24(k-1)+h+1) · y[23]
+        expo = 24 * (int(zyklen) - 1) + HOURS[None, :] + 1
+        y    = y - a[:, None] ** expo * y[:, 23:24]
+    return y[0] if flat else y
+
+
+def vdi_neu_rc_reihe(q_ext, tau, q0):
+    """
+    RC-Tiefpass VDI 6007 über eine beliebig lange Reihe ohne Stundenschleife.
+    q[h] = a·q[h-1] + b·q_ext[h] ab Zustand q0 (q[-1]), a = τ/(τ+1), b = 1/(τ+1).
+    Zweistufig geschlossen: Blöcke der Länge L ≈ √T lokal ab 0 (Dreiecksmatrix
+    b·a^(h-k)), dann die Blockenden über A = a^L (Dreiecksmatrix A^(j-i)) und
+    der Zustand vor jedem Block als a^(h+1)·Start addiert. Nur Potenzen ≤ 1 —
+    kein Über-/Unterlauf; Speicher N × (L² + B²) statt N × T².
+    q_ext: (N × T), tau: Skalar oder (N,), q0: (N,) → (N × T)
+    """
+    x = np.asarray(q_ext, dtype=float)
+    n, T = x.shape
+    tau = np.broadcast_to(np.asarray(tau, dtype=float), (n,))
+    a, b = tau / (tau + 1), 1.0 / (tau + 1)
+    L = max(1, int(np.ceil(np.sqrt(T))))
+    B = -(-T // L)
+    xb = np.zeros((n, B * L))
+    xb[:, :T] = x
+    xb = xb.reshape(n, B, L)
+
+    def dreieck(basis, m):
+        d = np.arange(m)[:, None] - np.arange(m)[None, :]
+        return np.where(d >= 0, basis[:, None, None] ** np.maximum(d, 0), 0.0)
+
+    lokal = np.einsum("nhk,nbk->nbh", dreieck(a, L) * b[:, None, None], xb)
+    A = a ** L
+    j = np.arange(B)
+    enden = (np.einsum("nji,ni->nj", dreieck(A, B), lokal[:, :, -1])
+             + A[:, None] ** (j[None, :] + 1) * np.asarray(q0, dtype=float)[:, None])
+    start = np.concatenate([np.asarray(q0, dtype=float)[:, None], enden[:, :-1]], axis=1)
+    y = lokal + a[:, None, None] ** (np.arange(L) + 1)[None, None, :] * start[:, :, None]
+    return y.reshape(n, B * L)[:, :T]
+
+
+def _vdi_neu_legacy(q_ext, tau):
+    """Referenz: ursprüngliche 96h-Einschwingschleife (4 × 24 Schritte), vektorisiert über Zonen"""
+    x     = np.asarray(q_ext, dtype=float).reshape(-1, 24)
+    tau1  = np.broadcast_to(np.asarray(tau, dtype=float), (x.shape[0],)) + 1
+    q_vdi = np.zeros_like(x)
+    for _ in range(4):
+        for h in range(24):
+            q_prev      = q_vdi[:, (h-1) % 24]
+            q_vdi[:, h] = q_prev + (x[:, h] - q_prev) / tau1
+    return q_vdi
+
+
+def calc_vdi_neu(area, orient, standard, glass, shade, pers, tech, win_area, bau_m, zyklen=None):
+    """
+    METHODE 3: VDI 6007 — RC-Tiefpass, gleiche Eingangslast wie Recknagel.
+    Periodisch eingeschwungen (geschlossene Form); zyklen=4 → alte 96h-Einschwingung.
+    """
     u, g, fc = get_phys_constants(standard, glass, shade)
     sol_raw  = np.array(SOLAR_DB[orient], dtype=float)
-    tau      = {"Schwer (Beton/Stein)": 18.0, "Mittel (Ziegel/Holz-Beton)": 10.0, "Leicht (Holz/Trockenbau)": 4.0}.get(bau_m, 10.0)
-    delta_T  = {"Altbau": 9.0, "Bestand": 7.0, "Neubau (GEG)": 5.0, "Passivhaus": 3.0}.get(standard, 6.0)
+    tau      = TAU_BAUMASSE.get(bau_m, 10.0)
+    delta_T  = DT_STANDARD.get(standard, 6.0)
     q_ext    = (area * u * delta_T + sol_raw * win_area * g * fc
                 + np.array([(pers*100+tech+area*8) if 8<=h<=18 else (pers*50+tech*0.1) for h in HOURS]))
-    q_vdi    = np.zeros(24)
-    for _ in range(4):  # 96h Einschwingen
-        for h in range(24):
-            q_prev   = q_vdi[(h-1)%24]
-            q_vdi[h] = q_prev + (q_ext[h] - q_prev) / (tau + 1)
-    return q_vdi
+    return vdi_neu_rc_filter(q_ext, tau, zyklen)
 
 
 def calc_kaltluftsee(area, orient, standard, glass, shade, pers, tech, win_area, bau_m, raumhoehe=2.5):
@@ -616,9 +1105,9 @@ def calc_ki_hybrid(area, orient, standard, glass, shade, pers, tech, win_area, b
     """METHODE 6: KI-Hybrid — Phasenverschiebung + Daempfung + Pre-Cooling"""
     u, g, fc  = get_phys_constants(standard, glass, shade)
     sol_raw   = np.array(SOLAR_DB[orient], dtype=float)
-    delta_T   = {"Altbau": 9.0, "Bestand": 7.0, "Neubau (GEG)": 5.0, "Passivhaus": 3.0}.get(standard, 6.0)
-    phi       = {"Schwer (Beton/Stein)": 10, "Mittel (Ziegel/Holz-Beton)": 6, "Leicht (Holz/Trockenbau)": 2}.get(bau_m, 6)
-    f         = {"Schwer (Beton/Stein)": 0.55, "Mittel (Ziegel/Holz-Beton)": 0.70, "Leicht (Holz/Trockenbau)": 0.88}.get(bau_m, 0.70)
+    delta_T   = DT_STANDARD.get(standard, 6.0)
+    phi       = PHI_BAUMASSE.get(bau_m, 6)
+    f         = F_BAUMASSE.get(bau_m, 0.70)
     q_sol     = np.roll(sol_raw, phi) * f * win_area * g * fc
     q_tr      = area * u * delta_T
     q_int     = np.array([(pers*100+tech+area*6) if 8<=h<=18 else (pers*50+tech*0.05) for h in HOURS])
@@ -626,6 +1115,315 @@ def calc_ki_hybrid(area, orient, standard, glass, shade, pers, tech, win_area, b
     return (q_sol + q_tr + q_int) * pre_cool
 
 
+# ==========================================
+# 2b. BATCH-ENGINE — 6 METHODEN × N ZONEN
+# ==========================================
+# Reihenfolge der Methodenachse im Batch-Ergebnis (N × 6 × 24)
+METHODEN_KEYS = ["VDI_N", "VDI_A", "PRAK", "RECK", "KLTS", "KI"]
+# Methodenschlüssel → Profil-Key (individual_profiles) bzw. Ergebnis-Spalte (room_results)
+METHODEN_PROFIL_KEYS = {"VDI_N": "vdi_n", "VDI_A": "vdi_a", "PRAK": "prak",
+                        "RECK": "reck", "KLTS": "klts", "KI": "ki"}
+METHODEN_RESULT_KEYS = {"VDI_N": "VDI NEU", "VDI_A": "VDI ALT", "PRAK": "PRAKTIKER",
+                        "RECK": "RECKNAGEL", "KLTS": "KALTLUFTSEE", "KI": "KI HYBRID"}
+
+# Spalten der Zonen-Tabelle (Reihenfolge = Parameter der calc_*-Funktionen)
+ZONEN_PARAMETER = ("area", "orient", "standard", "glass", "shade",
+                   "pers", "tech", "win_area", "bau_m", "raumhoehe")
+_ZONEN_DEFAULTS = {"raumhoehe": 2.5}
+
+
+def _zonen_spalten(zonen):
+    """
+    Normalisiert eine Zonen-Tabelle in ein Spalten-Dict.
+    Akzeptiert pandas DataFrame, Dict von Spalten oder Liste von Zonen-Dicts.
+    """
+    if hasattr(zonen, "columns") and hasattr(zonen, "to_dict"):
+        zonen = {c: list(zonen[c]) for c in zonen.columns}
+    elif isinstance(zonen, (list, tuple)):
+        zonen = {k: [z.get(k, _ZONEN_DEFAULTS.get(k)) for z in zonen] for k in ZONEN_PARAMETER}
+    n = len(zonen["area"])
+    spalten = {}
+    for k in ZONEN_PARAMETER:
+        werte = zonen.get(k)
+        if werte is None:
+            if k not in _ZONEN_DEFAULTS:
+                raise KeyError(f"Zonen-Tabelle: Spalte '{k}' fehlt")
+            werte = [_ZONEN_DEFAULTS[k]] * n
+        spalten[k] = werte
+    return spalten, n
+
+
+def _lookup(werte, tabelle, default):
+    """Vektorisiertes dict.get() über eine Spalte kategorialer Werte"""
+    keys, inv = np.unique(np.asarray(werte, dtype=str), return_inverse=True)
+    return np.array([tabelle.get(k, default) for k in keys], dtype=float)[inv]
+
+
+def _batch_parameter(zonen):
+    """Zonen-Tabelle → Parameter-Arrays (je Zone) für die Batch-Engine"""
+    sp, n = _zonen_spalten(zonen)
+    keys, inv = np.unique(np.asarray(sp["orient"], dtype=str), return_inverse=True)
+    return {
+        "n":       n,
+        "area":    np.asarray(sp["area"], dtype=float),
+        "pers":    np.asarray(sp["pers"], dtype=float),
+        "tech":    np.asarray(sp["tech"], dtype=float),
+        "win":     np.asarray(sp["win_area"], dtype=float),
+        "orient":  np.asarray(sp["orient"], dtype=str),
+        "sol":     np.array([SOLAR_DB[k] for k in keys], dtype=float).reshape(-1, 24)[inv],
+        "u":       _lookup(sp["standard"], U_WERTE, 0.8),
+        "g":       _lookup(sp["glass"], G_WERTE, 0.65),
+        "fc":      _lookup(sp["shade"], FC_WERTE, 1.0),
+        "dT":      _lookup(sp["standard"], DT_STANDARD, 6.0),
+        "q_std":   _lookup(sp["standard"], Q_STD_PRAK, 75.0),
+        "q_ori":   _lookup(sp["orient"], Q_ORI_PRAK, 0),
+        "tau":     _lookup(sp["bau_m"], TAU_BAUMASSE, 10.0),
+        "phi":     _lookup(sp["bau_m"], PHI_BAUMASSE, 6).astype(int),
+        "f":       _lookup(sp["bau_m"], F_BAUMASSE, 0.70),
+    }
+
+
+def _interne_lasten(p, stunden, grund=8, tech_nacht=0.1):
+    """Interne Lasten (N × T): Tagbetrieb 8–18 Uhr, sonst Grundlast"""
+    c = lambda a: a[:, None]
+    tag   = c(p["pers"]) * 100 + c(p["tech"]) + c(p["area"]) * grund
+    nacht = c(p["pers"]) * 50 + c(p["tech"]) * tech_nacht
+    ist_tag = (stunden >= 8) & (stunden <= 18)
+    return np.where(ist_tag[None, :], tag, nacht)
+
+
+def calc_alle_methoden_batch(zonen, vdi_zyklen=None):
+    """
+    Berechnet alle 6 Methoden für N Zonen in einem Aufruf.
+    zonen: Tabelle mit den Spalten ZONEN_PARAMETER (DataFrame, Spalten-Dict
+           oder Liste von Dicts).
+    vdi_zyklen: Einschwinghorizont VDI 6007 (None = periodisch, siehe vdi_neu_rc_filter)
+    Rückgabe: ndarray (N × 6 × 24), Methodenachse in METHODEN_KEYS-Reihenfolge.
+    Ergebnisse identisch zu den Einzelfunktionen calc_*.
+    """
+    p = _batch_parameter(zonen)
+    n = p["n"]
+    c = lambda a: a[:, None]
+    out = np.empty((n, len(METHODEN_KEYS), 24))
+    if n == 0:
+        return out
+
+    # Recknagel-Basis (= Eingangslast VDI 6007)
+    q_tr  = p["area"] * p["u"] * p["dT"]
+    q_st  = p["sol"] * c(p["win"]) * c(p["g"]) * c(p["fc"])
+    reck  = c(q_tr) + q_st + _interne_lasten(p, HOURS)
+
+    # VDI 6007: RC-Tiefpass, periodisch eingeschwungen
+    vdi_n = vdi_neu_rc_filter(reck, p["tau"], vdi_zyklen)
+
+    # Praktiker
+    q_base = (p["q_std"] + p["q_ori"]) * p["fc"]
+    q_int  = (p["pers"] * 100 + p["tech"]) / np.maximum(p["area"], 1)
+    prak   = np.repeat(c(p["area"] * (q_base + q_int)), 24, axis=1)
+
+    # KI-Hybrid: Phasenverschiebung je Zone (np.roll mit zonenweisem φ)
+    idx      = (HOURS[None, :] - c(p["phi"])) % 24
+    sol_roll = np.take_along_axis(p["sol"], idx, axis=1)
+    q_sol    = sol_roll * c(p["f"]) * c(p["win"]) * c(p["g"]) * c(p["fc"])
+    q_int_ki = _interne_lasten(p, HOURS, grund=6, tech_nacht=0.05)
+    pre_cool = np.where(HOURS <= 6, 0.75, 1.0)
+    ki       = (q_sol + c(q_tr) + q_int_ki) * pre_cool
+
+    out[:, 0] = vdi_n
+    out[:, 1] = reck * 1.20
+    out[:, 2] = prak
+    out[:, 3] = reck
+    out[:, 4] = reck / 1.3
+    out[:, 5] = ki
+    return out
+
+
+def vdi_neu_regression(zonen):
+    """
+    Regressionsmodus VDI 6007: vergleicht die periodische Lösung mit dem
+    bisherigen 96h-Ergebnis (4 Zyklen, Schleife) je Zone.
+    Gibt Abweichungen in W bzw. % sowie die Peak-Differenz je Zone zurück.
+    """
+    p      = _batch_parameter(zonen)
+    reck   = calc_alle_methoden_batch(zonen)[:, METHODEN_KEYS.index("RECK")]
+    legacy = _vdi_neu_legacy(reck, p["tau"])
+    neu    = vdi_neu_rc_filter(reck, p["tau"])
+    k4     = vdi_neu_rc_filter(reck, p["tau"], zyklen=4)
+    diff   = neu - legacy
+    ref    = np.maximum(np.abs(legacy), 1e-9)
+    return {
+        "zonen":               p["n"],
+        "max_abw_w":           float(np.abs(diff).max()) if p["n"] else 0.0,
+        "max_abw_pct":         float((np.abs(diff) / ref).max() * 100) if p["n"] else 0.0,
+        "peak_abw_w":          (neu.max(axis=1) - legacy.max(axis=1)).tolist(),
+        # Kontrolle geschlossene Form mit zyklen=4 gegen die Schleife (Rundungsniveau)
+        "closed_form_4z_abw_w": float(np.abs(k4 - legacy).max()) if p["n"] else 0.0,
+    }
+
+
+# ==========================================
+# 2c. JAHRESSIMULATION — 8760 STUNDEN
+# ==========================================
+# Jahresmodus: stündliche Wetterreihe (z.B. Testreferenzjahr) statt Auslegungstag.
+# Transmission mit realem ΔT = t_aussen − T_INNEN_SOLL (statt Auslegungs-ΔT je Standard),
+# Strahlung je Ausrichtung aus der Reihe, interne Lasten / Pre-Cooling nach Tagesstunde.
+JAHRES_STUNDEN = 8760
+T_INNEN_SOLL   = 26.0   # Raumsolltemperatur Kühlfall [°C]
+JAHR_CHUNK_H   = 744    # Chunkgröße (31 Tage) — begrenzt den Speicher auf N × 6 × 744
+
+
+def _wetter_chunk(t_aussen, sol, zeit=None):
+    """Normiert einen Wetter-Chunk: t_aussen (T,), sol {Ausrichtung: (T,)}, zeit (T,) datetime64 oder None"""
+    t_aussen = np.asarray(t_aussen, dtype=float)
+    sol = {k: np.asarray(v, dtype=float) for k, v in sol.items()}
+    if zeit is not None:
+        zeit = np.asarray(zeit, dtype="datetime64[h]")
+    return {"t_aussen": t_aussen, "sol": sol, "zeit": zeit}
+
+
+def _wetter_anlauf(wetter, stunden=24):
+    """
+    Fasst führende Chunks zusammen, bis der erste mindestens 'stunden' lang ist:
+    Startzustände (VDI 6007, KI-Hybrid) entstehen so immer aus den ersten 24 h
+    der Reihe, unabhängig von der Chunkgröße. Reihen < 24 h: ein Chunk, der
+    Starttag wird periodisch aufgefüllt (np.resize).
+    """
+    it = iter(wetter)
+    anlauf = []
+    for ch in it:
+        anlauf.append(ch)
+        if sum(len(c["t_aussen"]) for c in anlauf) >= stunden:
+            break
+    if anlauf:
+        zeiten = [c["zeit"] for c in anlauf]
+        yield _wetter_chunk(
+            np.concatenate([c["t_aussen"] for c in anlauf]),
+            {o: np.concatenate([c["sol"][o] for c in anlauf])
+             for o in set.intersection(*(set(c["sol"]) for c in anlauf))},
+            None if any(z is None for z in zeiten) else np.concatenate(zeiten))
+    yield from it
+
+
+def jahresreihe_aus_arrays(t_aussen, sol, zeit=None, chunk_stunden=JAHR_CHUNK_H):
+    """Zerlegt eine Wetterreihe im Speicher in Chunks (Generator) für simuliere_jahr()"""
+    n = len(t_aussen)
+    for a in range(0, n, chunk_stunden):
+        b = min(a + chunk_stunden, n)
+        yield _wetter_chunk(t_aussen[a:b], {k: np.asarray(v)[a:b] for k, v in sol.items()},
+                            None if zeit is None else np.asarray(zeit)[a:b])
+
+
+def load_jahresreihe(path, chunk_stunden=JAHR_CHUNK_H, sep=None, decimal="."):
+    """
+    Liest eine stündliche Wetterreihe (CSV, z.B. aufbereitetes TRY) in Chunks.
+    Spalten: 't_aussen' [°C], je Ausrichtung die Strahlung [W/m²] mit den
+    SOLAR_DB-Namen (NORD, OST, SUED, WEST, SUED-OST, SUED-WEST), optional 'zeit'.
+    Groß-/Kleinschreibung der Spaltennamen ist egal. Generator — lädt nie die ganze Datei.
+    """
+    import pandas as pd
+    reader = pd.read_csv(path, sep=sep, decimal=decimal, chunksize=chunk_stunden,
+                         engine="python" if sep is None else "c")
+    for df in reader:
+        cols = {str(c).strip().upper(): c for c in df.columns}
+        if "T_AUSSEN" not in cols:
+            raise KeyError(f"Wetterreihe {path}: Spalte 't_aussen' fehlt")
+        sol = {o: df[cols[o]].to_numpy(dtype=float) for o in SOLAR_DB if o in cols}
+        zeit = pd.to_datetime(df[cols["ZEIT"]]).to_numpy() if "ZEIT" in cols else None
+        yield _wetter_chunk(df[cols["T_AUSSEN"]].to_numpy(dtype=float), sol, zeit)
+
+
+def simuliere_jahr(zonen, wetter, t_innen=T_INNEN_SOLL, start="2026-01-01T00"):
+    """
+    Jahressimulation aller 6 Methoden über eine stündliche Wetterreihe.
+    zonen:  Zonen-Tabelle wie calc_alle_methoden_batch()
+    wetter: Iterable von Chunks (load_jahresreihe / jahresreihe_aus_arrays)
+    start:  Zeitstempel der ersten Stunde, falls die Reihe keine 'zeit'-Spalte hat
+    Zustände (RC-Filter VDI 6007, Phasenverschiebung KI-Hybrid) werden über
+    Chunkgrenzen fortgeschrieben; Speicherbedarf unabhängig von der Reihenlänge.
+    Startzustände aus den ersten 24 h der Reihe (_wetter_anlauf) — das Ergebnis
+    hängt nicht von der Chunkgröße ab.
+    Praktiker ist wetterunabhängig (konstanter Auslegungswert).
+    Rückgabe je Methode: Gebäude-Simultanpeak [W], Zeitpunkt, Kühlenergie [kWh]
+    (Summe der positiven Gebäudelast) und Jahrespeak je Zone [W].
+    """
+    p = _batch_parameter(zonen)
+    n = p["n"]
+    c = lambda a: a[:, None]
+    orient_keys, orient_inv = np.unique(p["orient"], return_inverse=True)
+    phi_max = int(p["phi"].max()) if n else 0
+    start   = np.datetime64(start, "h")
+
+    q_prak   = p["area"] * ((p["q_std"] + p["q_ori"]) * p["fc"]
+                            + (p["pers"] * 100 + p["tech"]) / np.maximum(p["area"], 1))
+    vdi_prev = None                       # RC-Zustand q[h-1]
+    sol_hist = None                       # letzte φ_max Stunden Strahlung (KI-Hybrid)
+    m        = len(METHODEN_KEYS)
+    peak     = np.full(m, -np.inf)
+    peak_t   = [None] * m
+    energie  = np.zeros(m)
+    zonen_pk = np.full((m, n), -np.inf)
+    t0       = 0
+
+    for ch in _wetter_anlauf(wetter):
+        T = len(ch["t_aussen"])
+        if T == 0:
+            continue
+        fehlend = [o for o in orient_keys if o not in ch["sol"]]
+        if fehlend:
+            raise KeyError(f"Wetterreihe: Strahlung fehlt für {', '.join(fehlend)}")
+        zeit = ch["zeit"] if ch["zeit"] is not None else start + np.arange(t0, t0 + T).astype("timedelta64[h]")
+        hod  = (zeit - zeit.astype("datetime64[D]")).astype(int)
+        sol  = np.stack([ch["sol"][o] for o in orient_keys])[orient_inv]            # N × T
+
+        q_tr = c(p["area"] * p["u"]) * (ch["t_aussen"] - t_innen)[None, :]
+        reck = q_tr + sol * c(p["win"]) * c(p["g"]) * c(p["fc"]) + _interne_lasten(p, hod)
+
+        # VDI 6007: Startzustand = periodisch eingeschwungener erster Tag
+        if vdi_prev is None:
+            tag = reck[:, :24] if T >= 24 else np.resize(reck, (n, 24))
+            vdi_prev = vdi_neu_rc_filter(tag, p["tau"])[:, 23]
+        vdi_n    = vdi_neu_rc_reihe(reck, p["tau"], vdi_prev)
+        vdi_prev = vdi_n[:, -1]
+
+        # KI-Hybrid: Strahlung um φ Stunden verzögert (Historie aus Vor-Chunk)
+        if sol_hist is None:
+            sol_hist = sol[:, :24][:, -phi_max:] if phi_max else sol[:, :0]
+            sol_hist = np.resize(sol_hist, (n, phi_max))
+        sol_ext  = np.concatenate([sol_hist, sol], axis=1)
+        idx      = phi_max + np.arange(T)[None, :] - c(p["phi"])
+        sol_roll = np.take_along_axis(sol_ext, idx, axis=1)
+        sol_hist = sol_ext[:, sol_ext.shape[1] - phi_max:]
+        q_sol    = sol_roll * c(p["f"]) * c(p["win"]) * c(p["g"]) * c(p["fc"])
+        pre_cool = np.where(hod <= 6, 0.75, 1.0)
+        ki       = (q_sol + q_tr + _interne_lasten(p, hod, grund=6, tech_nacht=0.05)) * pre_cool
+
+        kurven = (vdi_n, reck * 1.20, np.repeat(c(q_prak), T, axis=1), reck, reck / 1.3, ki)
+        for mi, kz in enumerate(kurven):
+            gesamt = kz.sum(axis=0)
+            hi = int(np.argmax(gesamt))
+            if gesamt[hi] > peak[mi]:
+                peak[mi], peak_t[mi] = gesamt[hi], zeit[hi]
+            energie[mi] += np.clip(gesamt, 0, None).sum() / 1000.0
+            if n:
+                zonen_pk[mi] = np.maximum(zonen_pk[mi], kz.max(axis=1))
+        t0 += T
+
+    return {
+        "stunden": t0,
+        "t_innen": t_innen,
+        "methoden": {
+            k: {
+                "peak_w":      int(peak[mi]) if t0 else 0,
+                "zeitpunkt":   (peak_t[mi].item().strftime("%d.%m.%Y %H:%M")
+                                if peak_t[mi] is not None else "—"),
+                "energie_kwh": round(float(energie[mi]), 1),
+                "zonen_peak_w": [int(v) for v in zonen_pk[mi]] if t0 else [0] * n,
+            }
+            for mi, k in enumerate(METHODEN_KEYS)
+        },
+    }
+
+
 # ==========================================
 # 3. SAMSUNG DATENBANK — Wind-Free Wandgeräte
 # ==========================================
@@ -755,7 +1553,244 @@ for kw, d in SAMSUNG_SERIEN[SAMSUNG_DEFAULT_SERIE].items():
 
 SAMSUNG_SIZES_KW = sorted(SAMSUNG_WINDFREE_WALL.keys())
 
-def find_samsung_device(peak_watt, safety_factor=1.10, serie=None):
+
+# ==========================================
+# AUSSENGERÄTE — FJM Multi + RAC Single-Split
+# ==========================================
+# FJM Multi-Außengeräte (für alle FJM IG-Typen: Kassette, Kanal, Standtruhe, WF-Serien)
+FJM_AG = {
+    4.0:  {"art_nr": "AJ040TXJ2KG/EU", "bez": "FJM Multi AG  4,0 kW",   "preis": 2347},
+    5.0:  {"art_nr": "AJ050TXJ2KG/EU", "bez": "FJM Multi AG  5,0 kW",   "preis": 2706},
+    5.2:  {"art_nr": "AJ052TXJ3KG/EU", "bez": "FJM Multi AG  5,2 kW",   "preis": 3061},
+    6.8:  {"art_nr": "AJ068TXJ3KG/EU", "bez": "FJM Multi AG  6,8 kW",   "preis": 3548},
+    8.0:  {"art_nr": "AJ080TXJ4KG/EU", "bez": "FJM Multi AG  8,0 kW",   "preis": 4494},
+    10.0: {"art_nr": "AJ100TXJ5KG/EU", "bez": "FJM Multi AG 10,0 kW",   "preis": 5533},
+}
+
+# RAC Single-Split-AGs je IG-Serie (IG-Artnr Präfix → passende AG-Liste)
+RAC_AG_BY_SERIE = {
+    "Airise Living": [
+        (2.5, "AR50F09C1BHX/EU",  "RAC AG Airise Living 2,5 kW",  984),
+        (3.5, "AR50F12C1BHX/EU",  "RAC AG Airise Living 3,5 kW", 1019),
+        (5.0, "AR50F18C1BHX/EU",  "RAC AG Airise Living 5,0 kW", 1564),
+        (6.5, "AR50F24C1BHX/EU",  "RAC AG Airise Living 6,5 kW", 2056),
+    ],
+    "Wind-Free Standard": [
+        (2.5, "AR60F09C1AWX/EU",  "RAC AG WF Standard 2,5 kW",   1362),
+        (3.5, "AR60F12C1AWX/EU",  "RAC AG WF Standard 3,5 kW",   1540),  # ca.
+        (5.0, "AR60F18C1AWX/EU",  "RAC AG WF Standard 5,0 kW",   1900),
+    ],
+    "Wind-Free Exklusiv": [
+        (2.0, "AR70F07C1AWX/EU",  "RAC AG WF Exklusiv 2,0 kW",   1448),
+        (2.5, "AR70F09C1AWX/EU",  "RAC AG WF Exklusiv 2,5 kW",   1446),
+        (3.5, "AR70F12C1AWX/EU",  "RAC AG WF Exklusiv 3,5 kW",   1540),
+        (4.3, "AR70F15C1AWX/EU",  "RAC AG WF Exklusiv 4,3 kW",   2135),
+        (5.0, "AR70F18C1AWX/EU",  "RAC AG WF Exklusiv 5,0 kW",   2106),
+        (6.5, "AR70F24C1AWX/EU",  "RAC AG WF Exklusiv 6,5 kW",   2761),
+    ],
+    "Wind-Free Exklusiv Black": [
+        (2.0, "AR70F07C1AWX/EU",  "RAC AG WF Exklusiv 2,0 kW",   1448),
+        (2.5, "AR70F09C1AWX/EU",  "RAC AG WF Exklusiv 2,5 kW",   1446),
+        (3.5, "AR70F12C1AWX/EU",  "RAC AG WF Exklusiv 3,5 kW",   1540),
+    ],
+    "Wind-Free Exklusiv-Premiere": [
+        (2.0, "AR70H07C1AWX/EU",  "RAC AG WF Exkl.-Prem. 2,0 kW", 1604),
+        (2.5, "AR70H09C1AWX/EU",  "RAC AG WF Exkl.-Prem. 2,5 kW", 1688),
+        (3.5, "AR70H12C1AWX/EU",  "RAC AG WF Exkl.-Prem. 3,5 kW", 1872),
+        (4.3, "AR70H15C1AWX/EU",  "RAC AG WF Exkl.-Prem. 4,3 kW", 2360),
+        (5.0, "AR70H18C1AWX/EU",  "RAC AG WF Exkl.-Prem. 5,0 kW", 2708),
+        (6.5, "AR70H24C1AWX/EU",  "RAC AG WF Exkl.-Prem. 6,5 kW", 3556),
+    ],
+    "Wind-Free Exklusiv-Premiere Black": [
+        (2.0, "AR70H07C1AWX/EU",  "RAC AG WF Exkl.-Prem. 2,0 kW", 1604),
+        (2.5, "AR70H09C1AWX/EU",  "RAC AG WF Exkl.-Prem. 2,5 kW", 1688),
+        (3.5, "AR70H12C1AWX/EU",  "RAC AG WF Exkl.-Prem. 3,5 kW", 1872),
+    ],
+    "Wind-Free Elite": [
+        (2.5, "AR70F09CAAWKX/EU", "RAC AG WF Elite 2,5 kW",       1752),
+        (3.5, "AR70F12CAAWKX/EU", "RAC AG WF Elite 3,5 kW",       1944),
+    ],
+    "Wind-Free Elite-Premiere Plus": [
+        (2.5, "AR70H09CAAWX/EU",  "RAC AG WF Elite-Prem.Plus 2,5 kW", 1824),
+        (3.5, "AR70H12CAAWX/EU",  "RAC AG WF Elite-Prem.Plus 3,5 kW", 2024),
+    ],
+    "Wind-Free Elite-Premiere Plus Black": [
+        (2.5, "AR70H09CAAWX/EU",  "RAC AG WF Elite-Prem.Plus 2,5 kW", 1824),
+        (3.5, "AR70H12CAAWX/EU",  "RAC AG WF Elite-Prem.Plus 3,5 kW", 2024),
+    ],
+}
+# FJM IG-Typen → immer FJM Multi AG
+FJM_IG_SERIEN = {"Mini-Kassette 620x620", "1-Weg-Kassette", "Kanaleinbau", "Standtruhe"}
+# FJM Wandgeräte-Serien → können RAC AG oder FJM AG bekommen (Umschalter)
+FJM_WAND_SERIEN = {"Wind-Free Standard","Wind-Free Exklusiv","Wind-Free Exklusiv Black",
+                   "Wind-Free Exklusiv-Premiere","Wind-Free Exklusiv-Premiere Black",
+                   "Wind-Free Elite","Wind-Free Elite-Premiere Plus",
+                   "Wind-Free Elite-Premiere Plus Black","Airise Living"}
+
+
+# ==========================================
+# GERÄTEKATALOG — indexiert, einmal je Prozess
+# ==========================================
+class GeraeteReihe:
+    """Eine Geräteserie: nach kW sortiertes Array + Einträge in gleicher Reihenfolge"""
+    __slots__ = ("typ", "serie", "kw", "preis", "art", "eintraege")
+
+    def __init__(self, typ, serie, eintraege):
+        self.typ       = typ
+        self.serie     = serie
+        self.eintraege = sorted(eintraege, key=lambda e: e["kw"])
+        self.kw        = np.array([e["kw"] for e in self.eintraege], dtype=float)
+        self.preis     = np.array([e["preis"] for e in self.eintraege], dtype=float)
+        self.art       = np.array([e["art_nr"] for e in self.eintraege], dtype=object)
+
+    def __len__(self):
+        return len(self.eintraege)
+
+    def kleinstes_ab(self, req_kw):
+        """Index des kleinsten Geräts mit kW >= req_kw (len(self) wenn keines passt)"""
+        return int(np.searchsorted(self.kw, req_kw, side="left"))
+
+    def passend(self, req_kw):
+        """Kleinstes Gerät >= req_kw, sonst größtes → (eintrag, oversized)"""
+        i = self.kleinstes_ab(req_kw)
+        if i >= len(self.eintraege):
+            return self.eintraege[-1], True
+        return self.eintraege[i], False
+
+    def als_tupel(self):
+        """Listenform (kw, art_nr, bez, preis) für Auswahllisten"""
+        return [(e["kw"], e["art_nr"], e["bez"], e["preis"]) for e in self.eintraege]
+
+
+class GeraeteKatalog:
+    """
+    Einheitlicher Samsung-Gerätekatalog (IG je Serie, FJM Multi-AG, RAC-AG je
+    IG-Serie) mit sortierten kW-Arrays und Hash-Index über die Artikelnummer.
+    Preise: Tabellenwerte, überschrieben durch die kompilierte Preisliste
+    (load_katalog), sobald die Artikelnummer dort geführt wird. stand ist
+    ein Hash über Artikelnummer, kW und Preis (Eingabe des Rechengraphen).
+    """
+
+    def __init__(self, serien, fjm_ag, rac_ag_by_serie, preisliste=None):
+        self._listenpreise = {}
+        if preisliste is not None:
+            for art, preis in zip(preisliste["art_nr"], preisliste["preis"]):
+                if not np.isnan(preis):
+                    self._listenpreise.setdefault(str(art), float(preis))
+        self.art_nr = {}
+        self.ig = {s: GeraeteReihe("IG", s, [self._eintrag("IG", s, kw, d["art_nr"], d["bez"], d["preis"])
+                                             for kw, d in db.items()])
+                   for s, db in serien.items()}
+        self.fjm_ag = GeraeteReihe("FJM", "FJM Multi", [
+            self._eintrag("FJM", "FJM Multi", kw, d["art_nr"], d["bez"], d["preis"])
+            for kw, d in fjm_ag.items()])
+        self.rac_ag = {s: GeraeteReihe("RAC", s, [self._eintrag("RAC", s, kw, art, bez, preis)
+                                                  for kw, art, bez, preis in lst])
+                       for s, lst in rac_ag_by_serie.items()}
+        self._ig_kw = {(e["serie"], e["kw"]): e for r in self.ig.values() for e in r.eintraege}
+        self.stand = _fingerabdruck(sorted((a, e["kw"], e["preis"]) for a, e in self.art_nr.items()))
+
+    def _eintrag(self, typ, serie, kw, art_nr, bez, preis):
+        liste = self._listenpreise.get(art_nr)
+        e = {"typ": typ, "serie": serie, "kw": float(kw), "art_nr": art_nr, "bez": bez,
+             "preis": preis if liste is None else float(liste)}
+        self.art_nr.setdefault(art_nr, e)
+        return e
+
+    def ig_reihe(self, serie=None):
+        """IG-Serie (Fallback: Standard-Serie)"""
+        return self.ig.get(serie or SAMSUNG_DEFAULT_SERIE, self.ig[SAMSUNG_DEFAULT_SERIE])
+
+    def ig_eintrag(self, serie, kw):
+        return self._ig_kw.get((serie, float(kw)))
+
+    def rac_reihe(self, ig_serie):
+        """Passende RAC-AGs zur IG-Serie (Fallback: WF Exklusiv, sonst None)"""
+        return self.rac_ag.get(ig_serie, self.rac_ag.get("Wind-Free Exklusiv"))
+
+    def preis(self, art_nr, default=None):
+        e = self.art_nr.get(art_nr)
+        return default if e is None else e["preis"]
+
+
+def geraete_katalog():
+    """Prozessweiter Gerätekatalog (baut beim ersten Zugriff)"""
+    return prozess_ressource("geraete_katalog", lambda: GeraeteKatalog(
+        SAMSUNG_SERIEN, FJM_AG, RAC_AG_BY_SERIE, samsung_katalog()))
+
+
+def katalog_preis_text(art_nr, default="—"):
+    """Listenpreis als '1.234 EUR' (deutsches Format) oder default"""
+    preis = geraete_katalog().preis(art_nr)
+    return default if preis is None else f"{fmt_number(preis)} EUR"
+
+
+@gemessen(sammeln=True)
+def device_label(peak_w, safety=1.10, serie=None):
+    """Gerätekurzbezeichnung aus gewählter Serie → (kw, label, art_nr, preis)"""
+    e, _ = geraete_katalog().ig_reihe(serie).passend((peak_w * safety) / 1000.0)
+    return e["kw"], f"{e['kw']:.1f}kW", e["art_nr"], e["preis"]
+
+
+@gemessen
+def geraete_dimensionieren(peaks, serien=None, safety=1.10):
+    """
+    Vektorisierte Geräteauslegung über Zonen × Methoden × Serien.
+    peaks:  Spitzenlasten [W], z.B. Matrix (Zonen × Methoden)
+    serien: Seriennamen (Standard: alle IG-Serien des Katalogs)
+    safety: Zuschlag — Skalar oder je Methode (letzte Achse)
+    Je Serie ein np.searchsorted über alle Peaks; Regel wie device_label():
+    kleinstes Gerät >= Bedarf, sonst größtes (oversized).
+    Rückgabe: {"serien", "kw", "preis", "art_nr", "oversized"}, Arrays (S, *peaks.shape)
+    """
+    kat    = geraete_katalog()
+    serien = list(kat.ig) if serien is None else list(serien)
+    req    = (np.asarray(peaks, dtype=float) * np.asarray(safety, dtype=float)) / 1000.0
+    form   = (len(serien),) + req.shape
+    kw, preis = np.empty(form), np.empty(form)
+    art, over = np.empty(form, dtype=object), np.empty(form, dtype=bool)
+    for si, serie in enumerate(serien):
+        reihe = kat.ig_reihe(serie)
+        idx = np.searchsorted(reihe.kw, req, side="left")
+        over[si] = idx >= len(reihe)
+        idx = np.minimum(idx, len(reihe) - 1)
+        kw[si], preis[si], art[si] = reihe.kw[idx], reihe.preis[idx], reihe.art[idx]
+    return {"serien": serien, "kw": kw, "preis": preis, "art_nr": art, "oversized": over}
+
+
+def guenstigste_serien(dim, methode=0):
+    """
+    Günstigste normgerechte Serie (Gerät nicht oversized) je Zone für eine
+    Methodenspalte von geraete_dimensionieren(). Gleichstand → erste Serie.
+    Rückgabe: Liste je Zone {"serie", "kw", "art_nr", "preis"} oder None
+    """
+    preis = np.where(dim["oversized"][:, :, methode], np.inf, dim["preis"][:, :, methode])
+    best  = np.argmin(preis, axis=0)
+    out = []
+    for zi, si in enumerate(best):
+        if not np.isfinite(preis[si, zi]):
+            out.append(None)
+            continue
+        out.append({"serie": dim["serien"][si], "kw": float(dim["kw"][si, zi, methode]),
+                    "art_nr": dim["art_nr"][si, zi, methode], "preis": float(preis[si, zi])})
+    return out
+
+
+def default_fjm_ag(zone_idx, ig_kw):
+    """
+    Vorbelegung FJM Multi-AG: Zone 1 = kleinstes AG >= IG-Leistung
+    (AJ100 wenn kein IG), Zone 2-5 = N.V. (None).
+    """
+    if zone_idx != 0:
+        return None
+    reihe = geraete_katalog().fjm_ag
+    if ig_kw == 0:
+        return reihe.eintraege[-1]["kw"]
+    i = reihe.kleinstes_ab(ig_kw)
+    return reihe.eintraege[i]["kw"] if i < len(reihe) else None
+
+
+def _find_samsung_device(peak_watt, safety_factor=1.10, serie=None):
     """
     Findet passendes Samsung Wandgerät für gegebene Spitzenlast.
     safety_factor: 1.10 = 10% Norm-Zuschlag
@@ -764,66 +1799,681 @@ def find_samsung_device(peak_watt, safety_factor=1.10, serie=None):
     """
     if serie is None:
         serie = SAMSUNG_DEFAULT_SERIE
-    # Fallback auf Standard wenn Serie keine passende Größe hat
-    db = SAMSUNG_SERIEN.get(serie, SAMSUNG_SERIEN[SAMSUNG_DEFAULT_SERIE])
-    sizes = sorted(db.keys())
+    # Fallback auf Standard wenn Serie unbekannt
+    reihe = geraete_katalog().ig_reihe(serie)
     required_kw = (peak_watt * safety_factor) / 1000.0
 
-    def make_entry(kw):
-        d = db[kw]
+    def make_entry(e):
         return {
-            "model":       d["bez"],
-            "art_nr":      d["art_nr"],
-            "cool_kw":     kw,
-            "heat_kw":     round(kw * 1.2, 1),
-            "preis":       d["preis"],
-            "kw_class":    kw,
+            "model":       e["bez"],
+            "art_nr":      e["art_nr"],
+            "cool_kw":     e["kw"],
+            "heat_kw":     round(e["kw"] * 1.2, 1),
+            "preis":       e["preis"],
+            "kw_class":    e["kw"],
             "required_kw": required_kw,
             "peak_w":      peak_watt,
             "serie":       serie,
         }
 
-    # Primär: kleinstes Gerät >= required_kw
-    primary = None
-    for kw in sizes:
-        if kw >= required_kw:
-            primary = make_entry(kw)
-            break
-
-    # Fallback: größtes verfügbares
-    if primary is None:
-        primary = make_entry(sizes[-1])
+    # Primär: kleinstes Gerät >= required_kw, sonst größtes verfügbares (oversized)
+    e_p, oversized = reihe.passend(required_kw)
+    primary = make_entry(e_p)
+    if oversized:
         primary["oversized"] = True
 
     # Alternativ: nächstkleineres
-    alt = None
-    idx_p = sizes.index(primary["kw_class"])
-    if idx_p > 0:
-        alt = make_entry(sizes[idx_p - 1])
+    idx_p = reihe.eintraege.index(e_p)
+    alt = make_entry(reihe.eintraege[idx_p - 1]) if idx_p > 0 else None
 
     return primary, alt
 
 
 def load_samsung_from_file():
-    """Versucht Samsung-Daten aus Excel-Datei zu laden (falls vorhanden)"""
+    """Samsung Wandgeräte / Wind-Free aus dem kompilierten Katalog als DataFrame (oder None)"""
     try:
-        samsung_files = [f for f in os.listdir('.') 
-                        if any(kw in f.lower() for kw in ['samsung', 'mtf', 'klima', 'artikel']) 
-                        and f.endswith('.xlsx')]
-        if samsung_files:
-            df = pd.read_excel(samsung_files[0], engine='openpyxl')
-            # Nur Wandgeräte / Wind-Free filtern
-            if 'Bezeichnung' in df.columns:
-                mask = df['Bezeichnung'].astype(str).str.contains('Wind.?Free|Wandgerät|AR[0-9]', 
-                                                                    case=False, regex=True)
-                df_wf = df[mask].copy()
-                if len(df_wf) > 0:
-                    return df_wf
+        kat = samsung_katalog()
+        if kat is None:
+            return None
+        import re
+        import pandas as pd
+        muster = re.compile('Wind.?Free|Wandgerät|AR[0-9]', re.IGNORECASE)
+        maske = np.array([bool(muster.search(b)) for b in kat["bez"]], dtype=bool)
+        if maske.any():
+            df_wf = pd.DataFrame(np.asarray(kat[maske]))
+            return df_wf.rename(columns={"art_nr": "Artikelnummer", "bez": "Bezeichnung",
+                                         "zusatz": "Zusatz", "gruppe": "Artikelgruppe",
+                                         "preis": "Listenpreis"})
     except Exception:
         pass
     return None
 
 
+# ==========================================
+# 3b. RECHEN-CACHE — LRU über Streamlit-Reruns
+# ==========================================
+ZONEN_CACHE_MAX   = 4096   # Einträge à 6×24 float64 (~1.2 kB)
+GERAETE_CACHE_MAX = 4096
+DIAGRAMM_CACHE_MAX       = 256                 # PNG-Diagramme (~80–150 kB)
+DIAGRAMM_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_MISS = object()
+
+
+class LRUCache:
+    """
+    Begrenzter LRU-Cache mit Treffer-/Fehlzählern (thread-sicher).
+    maxbytes: zusätzliche Grenze über len(value) (z.B. PNG-Bytes)
+    """
+
+    def __init__(self, maxsize=1024, maxbytes=None):
+        self.maxsize  = int(maxsize)
+        self.maxbytes = maxbytes
+        self.nbytes   = 0
+        self.hits     = 0
+        self.misses   = 0
+        self._data    = OrderedDict()
+        self._lock    = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            if self.maxbytes is not None:
+                if key in self._data:
+                    self.nbytes -= len(self._data[key])
+                self.nbytes += len(value)
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize or (
+                    self.maxbytes is not None and self.nbytes > self.maxbytes and len(self._data) > 1):
+                _, alt = self._data.popitem(last=False)
+                if self.maxbytes is not None:
+                    self.nbytes -= len(alt)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.nbytes = 0
+
+    def stats(self):
+        abfragen = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data),
+                "maxsize": self.maxsize, "bytes": self.nbytes,
+                "hit_rate": round(self.hits / abfragen, 3) if abfragen else 0.0}
+
+
+@st.cache_resource(show_spinner=False)
+def _prozess_ressourcen():
+    """Prozessweiter Speicher — überlebt Streamlit-Reruns (Modul-Globals nicht)"""
+    return {"_lock": threading.RLock()}   # reentrant: Factories dürfen selbst Ressourcen holen
+
+
+def prozess_ressource(name, factory):
+    """Liefert die prozessweite Instanz 'name', legt sie beim ersten Zugriff an"""
+    r = _prozess_ressourcen()
+    with r["_lock"]:
+        if name not in r:
+            r[name] = factory()
+        return r[name]
+
+
+def zonen_cache():
+    return prozess_ressource("zonen_cache", lambda: LRUCache(ZONEN_CACHE_MAX))
+
+
+def geraete_cache():
+    return prozess_ressource("geraete_cache", lambda: LRUCache(GERAETE_CACHE_MAX))
+
+
+def diagramm_cache():
+    return prozess_ressource("diagramm_cache", lambda: LRUCache(
+        DIAGRAMM_CACHE_MAX, maxbytes=DIAGRAMM_CACHE_MAX_BYTES))
+
+
+def _zonen_key(area, orient, standard, glass, shade, pers, tech, win_area, bau_m, raumhoehe):
+    """Normalisierter Cache-Schlüssel einer Zone (Reihenfolge = ZONEN_PARAMETER)"""
+    return (float(area), str(orient), str(standard), str(glass), str(shade),
+            float(pers), float(tech), float(win_area), str(bau_m), float(raumhoehe))
+
+
+@gemessen
+def calc_zonen_cached(zonen):
+    """
+    Wie calc_alle_methoden_batch(), aber mit Zonen-Cache: nur Zonen mit
+    geänderten Eingaben werden neu berechnet (gemeinsam in einem Batch).
+    Rückgabe: ndarray (N, 6, 24)
+    """
+    spalten, n = _zonen_spalten(zonen)
+    keys  = [_zonen_key(*z) for z in zip(*(spalten[k] for k in ZONEN_PARAMETER))]
+    cache = zonen_cache()
+    out   = np.empty((n, len(METHODEN_KEYS), 24))
+    treffer, fehlend = {}, []
+    for key in dict.fromkeys(keys):          # Duplikate nur einmal abfragen
+        kurven = cache.get(key, _MISS)
+        if kurven is _MISS:
+            fehlend.append(key)
+        else:
+            treffer[key] = kurven
+    if fehlend:
+        neu = calc_alle_methoden_batch([dict(zip(ZONEN_PARAMETER, k)) for k in fehlend])
+        for key, kurven in zip(fehlend, neu):
+            kurven = kurven.copy()
+            kurven.setflags(write=False)
+            cache.put(key, kurven)
+            treffer[key] = kurven
+    for i, key in enumerate(keys):
+        out[i] = treffer[key]
+    return out
+
+
+@gemessen(sammeln=True)
+def find_samsung_device(peak_watt, safety_factor=1.10, serie=None):
+    """
+    Gecachte Gerätesuche (siehe _find_samsung_device).
+    Liefert Kopien, damit Aufrufer die Einträge gefahrlos ändern können.
+    """
+    key = (float(peak_watt), float(safety_factor), serie or SAMSUNG_DEFAULT_SERIE)
+    res = geraete_cache().get(key, _MISS)
+    if res is _MISS:
+        res = _find_samsung_device(peak_watt, safety_factor, serie)
+        geraete_cache().put(key, res)
+    primary, alt = res
+    return dict(primary), (dict(alt) if alt else None)
+
+
+@gemessen
+def zonen_ergebnisse(kurven, zonen_namen):
+    """
+    Kurven (N × 6 × 24) → Gebäudesummen, Einzelprofile, Ergebnis-Matrix und
+    Samsung-Empfehlung (VDI Neu) — gemeinsam für UI und Batch-CLI.
+    Rückgabe: (g_sums, individual_profiles, room_results, samsung_recs)
+    """
+    g_sums = {k: kurven[:, mi].sum(axis=0) for mi, k in enumerate(METHODEN_KEYS)}
+    individual_profiles, room_results, samsung_recs = [], [], []
+    for zi, r_name in enumerate(zonen_namen):
+        c_vdi_n, c_vdi_a, c_prak, c_reck, c_klts, c_ki = kurven[zi]
+        individual_profiles.append({
+            "name":  r_name,
+            "reck":  c_reck,
+            "vdi_a": c_vdi_a,
+            "vdi_n": c_vdi_n,
+            "prak":  c_prak,
+            "klts":  c_klts,
+            "ki":    c_ki,
+        })
+        # Samsung Empfehlung (auf Basis VDI Neu)
+        peak_vdi = int(np.max(c_vdi_n))
+        primary, alt = find_samsung_device(peak_vdi)
+        samsung_recs.append({"zone": r_name, "primary": primary, "alt": alt, "peak_w": peak_vdi})
+        room_results.append({
+            "ZONE":       r_name,
+            "VDI NEU":    peak_vdi,
+            "VDI ALT":    int(np.max(c_vdi_a)),
+            "RECKNAGEL":  int(np.max(c_reck)),
+            "PRAKTIKER":  int(np.max(c_prak)),
+            "KALTLUFTSEE":int(np.max(c_klts)),
+            "KI HYBRID":  int(np.max(c_ki)),
+        })
+    return g_sums, individual_profiles, room_results, samsung_recs
+
+
+def room_inputs_aus_zonen(zonen, zonen_namen):
+    """Eingabedaten-Zeilen für die Berichte (PDF/Word) aus den Zonen-Dicts"""
+    room_inputs = []
+    for z, name in zip(zonen, zonen_namen):
+        u, _, _ = get_phys_constants(z["standard"], z["glass"], z["shade"])
+        room_inputs.append({
+            "name":        name,
+            "flaeche":     z["area"],
+            "hoehe":       z["raumhoehe"],
+            "personen":    z["pers"],
+            "fenster":     z["win_area"],
+            "orientierung": z["orient"],
+            "nutzung":     z["glass"],
+            "u_wert":      u,
+        })
+    return room_inputs
+
+
+def cache_statistik():
+    """Treffer/Fehlzugriffe der Rechen-Caches (für Sidebar und Benchmarks)"""
+    return {"zonen": zonen_cache().stats(), "geraete": geraete_cache().stats(),
+            "diagramme": diagramm_cache().stats()}
+
+
+def _fingerabdruck(wert):
+    """Inhalts-Hash beliebiger (picklebarer) Eingaben — Zonen-Dicts, Listen, Arrays"""
+    import hashlib
+    import pickle
+    return hashlib.blake2b(pickle.dumps(wert, protocol=5), digest_size=16).digest()
+
+
+class RechenGraph:
+    """
+    Abhängigkeitsgraph der UI-Berechnung über Streamlit-Reruns (je Session):
+    Eingaben → Zonenkurven → Summen → Peaks → Geräte → Preise → Diagramme.
+    Eingaben werden per Inhalts-Hash verglichen, Knoten über die Versionen
+    ihrer Vorgänger — ein Knoten rechnet nur neu, wenn sich davon etwas
+    geändert hat, sonst gilt das Ergebnis des letzten Laufs. Knoten mit
+    vergleichen=True behalten ihre Version, wenn das neue Ergebnis gleich
+    ist (Folgeknoten bleiben gültig). Je Lauf wird die Zeit je Knoten
+    protokolliert (lauf: [(name, ms, neu)]).
+    """
+
+    def __init__(self):
+        self._werte    = {}
+        self._version  = {}      # steigt bei jeder Neuberechnung/Änderung
+        self._signatur = {}      # Eingabe: Hash; Knoten: Versionen der Vorgänger
+        self._ergebnis = {}      # Hash des Ergebnisses (Knoten mit vergleichen=True)
+        self.lauf      = []
+
+    def lauf_beginnen(self):
+        self.lauf = []
+
+    def _merken(self, name, signatur, berechnen, vergleichen=False):
+        t0  = time.perf_counter()
+        neu = self._signatur.get(name) != signatur
+        if neu:
+            with zeitspur(f"graph:{name}"):
+                self._werte[name] = berechnen()
+            self._signatur[name] = signatur
+            if vergleichen:
+                ergebnis = _fingerabdruck(self._werte[name])
+                neu = self._ergebnis.get(name) != ergebnis
+                self._ergebnis[name] = ergebnis
+            if neu:
+                self._version[name] = self._version.get(name, 0) + 1
+        self.lauf.append((name, (time.perf_counter() - t0) * 1000, neu))
+        return self._werte[name]
+
+    def eingabe(self, name, wert):
+        """Eingabewert (Widgets, Zonentabelle); Änderung macht Folgeknoten ungültig"""
+        return self._merken(name, _fingerabdruck(wert), lambda: wert)
+
+    def knoten(self, name, fn, *vorgaenger, vergleichen=False):
+        """fn(*Werte der Vorgänger) — nur neu, wenn ein Vorgänger eine neue Version hat"""
+        return self._merken(name, tuple(self._version[v] for v in vorgaenger),
+                            lambda: fn(*(self._werte[v] for v in vorgaenger)), vergleichen)
+
+    def protokoll(self):
+        """Zeiten des letzten Laufs: [{"knoten", "ms", "neu"}] + Summe"""
+        zeilen = [{"knoten": n, "ms": round(ms, 2), "neu": neu} for n, ms, neu in self.lauf]
+        return zeilen, round(sum(z["ms"] for z in zeilen), 2)
+
+
+def rechen_graph():
+    """RechenGraph der aktuellen Session (überlebt Reruns)"""
+    graph = st.session_state.get("rechen_graph")
+    if graph is None:
+        graph = st.session_state["rechen_graph"] = RechenGraph()
+    return graph
+
+
+# ==========================================
+# 3c. KOSTENOPTIMALE KONFIGURATION — Multi-Split-Solver
+# ==========================================
+# Jede Zone bekommt ein IG (>= Zonen-Peak × Zuschlag) und hängt entweder an
+# einem eigenen RAC Single-Split-AG oder an einem FJM Multi-AG, den sie sich
+# mit anderen Zonen teilt. Das FJM-AG deckt den SIMULTANEN Gruppen-Peak
+# (Summenkurve, nicht Summe der Einzelpeaks) × Zuschlag, hat genug Anschlüsse
+# und hält das Kombinationsverhältnis Σ IG ≤ FJM_KOMBI_MAX × AG ein.
+FJM_KOMBI_MAX = 1.30
+
+
+def fjm_anschluesse(art_nr):
+    """Anzahl IG-Anschlüsse eines FJM Multi-AG aus der Artikelnummer (…TXJ<n>…)"""
+    import re
+    m = re.search(r"TXJ(\d)", str(art_nr))
+    return int(m.group(1)) if m else 1
+
+
+def _ig_optionen(req_kw, kat, serien):
+    """
+    Normgerechte IG je Serie (kleinstes >= req_kw), nach Preis sortiert,
+    plus Pareto-Front (Preis ↓, kW ↓). Passt keins: größtes je Serie,
+    dann ist zu_klein gesetzt → (alle, pareto, zu_klein)
+    """
+    alle = [e for e, over in (kat.ig[s].passend(req_kw) for s in serien) if not over]
+    zu_klein = not alle
+    if zu_klein:
+        alle = [kat.ig[s].eintraege[-1] for s in serien]
+    alle.sort(key=lambda e: (e["preis"], e["kw"]))
+    pareto, kw_min = [], np.inf
+    for e in alle:
+        if e["kw"] < kw_min:
+            pareto.append(e)
+            kw_min = e["kw"]
+    return alle, pareto, zu_klein
+
+
+def _rac_single(optionen, kat):
+    """Günstigstes IG + RAC-AG (kleinstes AG >= IG) → (preis, ig, ag) oder None"""
+    best = None
+    for ig in optionen:
+        reihe = kat.rac_ag.get(ig["serie"])
+        if not reihe:
+            continue
+        i = reihe.kleinstes_ab(ig["kw"])
+        if i < len(reihe) and (best is None or ig["preis"] + reihe.eintraege[i]["preis"] < best[0]):
+            best = (ig["preis"] + reihe.eintraege[i]["preis"], ig, reihe.eintraege[i])
+    return best
+
+
+def _ig_auswahl(pareto, kw_max):
+    """Je Zone ein IG (Pareto-Optionen) mit Σ kW ≤ kw_max, minimale Σ Preise → (preis, [ig]) | None"""
+    n = len(pareto)
+    rest_preis = np.append(np.cumsum([p[0]["preis"] for p in pareto][::-1])[::-1], 0.0)
+    rest_kw    = np.append(np.cumsum([p[-1]["kw"] for p in pareto][::-1])[::-1], 0.0)
+    best = [np.inf, None]
+    wahl = []
+
+    def suche(i, preis, kw):
+        if preis + rest_preis[i] >= best[0] or kw + rest_kw[i] > kw_max + 1e-9:
+            return
+        if i == n:
+            best[0], best[1] = preis, list(wahl)
+            return
+        for e in pareto[i]:
+            wahl.append(e)
+            suche(i + 1, preis + e["preis"], kw + e["kw"])
+            wahl.pop()
+
+    suche(0, 0.0, 0.0)
+    return None if best[1] is None else (best[0], best[1])
+
+
+@gemessen
+def optimiere_konfiguration(kurven, namen=None, methode="PRAK", ag_methode="VDI_N", safety=1.10,
+                            top_n=5, kombi_max=FJM_KOMBI_MAX, serien=None, zeit_limit_s=2.0):
+    """
+    Branch-and-Bound über alle Aufteilungen der Zonen in RAC-Singles und
+    FJM-Gruppen (Anschlussgrenze je AG), IG-Serie je Zone frei wählbar.
+    kurven: (N, 6, 24) aus calc_alle_methoden_batch(); methode: Spalte für
+    den IG-Peak je Zone (Standard Praktiker wie die UI-Vorbelegung),
+    ag_methode: stündliche Kurve für den simultanen Gruppen-Peak (wie g_sums).
+    Nach zeit_limit_s bricht die Suche ab und liefert die bis dahin besten
+    Konfigurationen (statistik["vollstaendig"] = False). Die Laufzeit hängt
+    stark von der Instanz ab: 5 Zonen brauchen wenige ms, ab ~15 Zonen
+    erreicht die Suche je nach Lastverteilung und Serienwahl das Zeitlimit.
+    Zonen, für die keine Serie groß genug ist, erhalten das größte Gerät
+    und sind mit "zu_klein" markiert (je Zone und in "unterdimensioniert").
+    Rückgabe: {"konfigurationen": [... top_n, aufsteigend nach Preis], "statistik": {...}}
+    """
+    import heapq
+    import time
+    t0 = time.perf_counter()
+    kat = geraete_katalog()
+    serien = list(kat.ig) if serien is None else [s for s in serien if s in kat.ig]
+    kurven = np.asarray(kurven, dtype=float)
+    profile = kurven[:, METHODEN_KEYS.index(methode)]
+    ag_profile = kurven[:, METHODEN_KEYS.index(ag_methode)]
+    n = len(profile)
+    namen = list(namen) if namen is not None else [f"Zone {i + 1}" for i in range(n)]
+
+    optionen = [_ig_optionen(p.max() * safety / 1000.0, kat, serien) for p in profile]
+    singles  = [_rac_single(alle, kat) for alle, _, _ in optionen]
+    ig_min   = [pareto[0]["preis"] for _, pareto, _ in optionen]
+    kw_min   = [pareto[-1]["kw"] for _, pareto, _ in optionen]
+    zu_klein = [namen[z] for z in range(n) if optionen[z][2]]
+    fjm_ags  = sorted(({**e, "ports": fjm_anschluesse(e["art_nr"])} for e in kat.fjm_ag.eintraege),
+                      key=lambda e: (e["preis"], e["kw"]))
+    max_ports = max(e["ports"] for e in fjm_ags)
+    # AG-Anteile je Zone (€ je Anschluss, € je IG-kW) mit Preis >= Anteil × Kapazität
+    # für jedes AG; jede Mischung ist eine gültige untere Schranke, es gilt die größte
+    je_port = min(e["preis"] / e["ports"] for e in fjm_ags)
+    je_kw   = min(e["preis"] / (e["kw"] * kombi_max) for e in fjm_ags)
+    anteile = [(0.0, 0.0), (je_port, 0.0), (je_port / 2, je_kw / 2), (0.0, je_kw)]
+    # große Zonen zuerst: frühe, enge Schranken
+    reihenfolge = [int(z) for z in np.argsort(-profile.max(axis=1), kind="stable")]
+    rest_lb = []
+    for ap, ak in anteile:
+        lb = [min(ig_min[z] + ap + ak * kw_min[z], singles[z][0]) if singles[z]
+              else ig_min[z] + ap + ak * kw_min[z] for z in reihenfolge]
+        rest_lb.append(np.append(np.cumsum(lb[::-1])[::-1], 0.0))
+    stat = {"knoten": 0, "abgeschnitten": 0, "gruppen_bewertet": 0, "vollstaendig": True,
+            "unterdimensioniert": zu_klein}
+
+    gruppen_memo, ag_lb_memo = {}, {}
+
+    def gruppen_peak_kw(g):
+        return ag_profile[list(g)].sum(axis=0).max() * safety / 1000.0
+
+    def ag_lb(g):
+        """
+        Untere Schranken der AG-Kosten einer offenen Gruppe, eine je Anteil:
+        billigstes AG mit genug Anschlüssen, kW für den Gruppen-Peak und
+        Kombi-Reserve für die kleinsten IG, abzüglich der Restkapazität,
+        die später beitretende Zonen über ihren Anteil in rest_lb tragen.
+        """
+        key = tuple(g)
+        if key not in ag_lb_memo:
+            req, ig_kw = gruppen_peak_kw(g), sum(kw_min[z] for z in g)
+            passend = [e for e in fjm_ags if e["ports"] >= len(g) and e["kw"] >= req
+                       and e["kw"] * kombi_max >= ig_kw - 1e-9]
+            ag_lb_memo[key] = [
+                min((e["preis"] - ap * (e["ports"] - len(g)) - ak * (e["kw"] * kombi_max - ig_kw)
+                     for e in passend), default=np.inf)
+                for ap, ak in anteile]
+        return ag_lb_memo[key]
+
+    def gruppe_bewerten(g):
+        """Exakte Kosten einer FJM-Gruppe → (preis, ag, [ig]) oder None"""
+        key = tuple(g)
+        if key in gruppen_memo:
+            return gruppen_memo[key]
+        stat["gruppen_bewertet"] += 1
+        req, best = gruppen_peak_kw(g), None
+        ig_lb = sum(ig_min[z] for z in g)
+        for ag in fjm_ags:                          # nach Preis sortiert
+            if best and ag["preis"] + ig_lb >= best[0]:
+                break
+            if ag["ports"] < len(g) or ag["kw"] < req:
+                continue
+            ig = _ig_auswahl([optionen[z][1] for z in g], ag["kw"] * kombi_max)
+            if ig and (best is None or ag["preis"] + ig[0] < best[0]):
+                best = (ag["preis"] + ig[0], ag, ig[1])
+        gruppen_memo[key] = best
+        return best
+
+    top = []                                        # Max-Heap über (-preis, nr, lösung)
+    gruppen, rac = [], []
+
+    def grenze():
+        return -top[0][0] if len(top) >= top_n else np.inf
+
+    def suche(i, rac_preis, ig_lb_gruppen):
+        stat["knoten"] += 1
+        if not stat["vollstaendig"] or (stat["knoten"] % 1024 == 0
+                                        and time.perf_counter() - t0 > zeit_limit_s):
+            stat["vollstaendig"] = False
+            return
+        if i == n:
+            bewertet = [gruppe_bewerten(g) for g in gruppen]
+            if any(b is None for b in bewertet):
+                return
+            preis = rac_preis + sum(b[0] for b in bewertet)
+            if preis < grenze():
+                loesung = ([list(g) for g in gruppen], list(rac), bewertet)
+                heapq.heappush(top, (-preis, stat["knoten"], loesung))
+                if len(top) > top_n:
+                    heapq.heappop(top)
+            return
+        lb = [ag_lb(g) for g in gruppen]
+        schranke = rac_preis + ig_lb_gruppen + max(sum(b[j] for b in lb) + rest_lb[j][i]
+                                                   for j in range(len(anteile)))
+        if schranke >= grenze():
+            stat["abgeschnitten"] += 1
+            return
+        z = reihenfolge[i]
+        if singles[z]:                              # a) eigenes RAC Single-Split
+            rac.append(z)
+            suche(i + 1, rac_preis + singles[z][0], ig_lb_gruppen)
+            rac.pop()
+        for g in gruppen:                           # b) bestehender FJM-Gruppe beitreten
+            if len(g) < max_ports:
+                g.append(z)
+                suche(i + 1, rac_preis, ig_lb_gruppen + ig_min[z])
+                g.pop()
+        gruppen.append([z])                         # c) neue FJM-Gruppe öffnen
+        suche(i + 1, rac_preis, ig_lb_gruppen + ig_min[z])
+        gruppen.pop()
+
+    suche(0, 0.0, 0.0)
+
+    def geraet(e):
+        return {"serie": e["serie"], "kw": e["kw"], "art_nr": e["art_nr"], "preis": e["preis"]}
+
+    konfigurationen = []
+    for neg_preis, _, (grp, rac_z, bewertet) in sorted(top, key=lambda t: -t[0]):
+        zonen = [None] * n
+        ig_preis = ag_preis = 0.0
+        for z in rac_z:
+            _, ig, ag = singles[z]
+            zonen[z] = {"zone": namen[z], "ig": geraet(ig), "ag_typ": "RAC", "ag": geraet(ag),
+                        "gruppe": None, "zu_klein": optionen[z][2]}
+            ig_preis += ig["preis"]
+            ag_preis += ag["preis"]
+        gruppen_out = []
+        for gi, (g, (_, ag, igs)) in enumerate(sorted(zip(grp, bewertet), key=lambda t: min(t[0]))):
+            for z, ig in zip(g, igs):
+                zonen[z] = {"zone": namen[z], "ig": geraet(ig), "ag_typ": "FJM", "ag": geraet(ag),
+                            "gruppe": gi + 1, "zu_klein": optionen[z][2]}
+                ig_preis += ig["preis"]
+            ag_preis += ag["preis"]
+            ig_summe = sum(ig["kw"] for ig in igs)
+            gruppen_out.append({
+                "gruppe": gi + 1, "zonen": [namen[z] for z in sorted(g)], "ag": geraet(ag),
+                "anschluesse": ag["ports"],
+                "simultan_peak_w": int(ag_profile[g].sum(axis=0).max()),
+                "summe_einzelpeaks_w": int(ag_profile[g].max(axis=1).sum()),
+                "ig_summe_kw": round(ig_summe, 2),
+                "kombi": round(ig_summe / ag["kw"], 2),
+            })
+        konfigurationen.append({"gesamt_preis": -neg_preis, "ig_preis": ig_preis,
+                                "ag_preis": ag_preis, "zonen": zonen, "gruppen": gruppen_out,
+                                "unterdimensioniert": zu_klein})
+    stat["zeit_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return {"konfigurationen": konfigurationen, "statistik": stat}
+
+
+# ==========================================
+# 3d. ZONEN-TABELLE — spaltenorientiertes Zonenmodell
+# ==========================================
+# Gebäude mit 80–300 Räumen: je Eingabefeld eine numpy-Spalte statt einer
+# Liste von Widgets/Dicts. Die UI rendert nur eine Seite, Rechnung und
+# Exporte lesen die Spalten direkt.
+ZONEN_MAX      = 500   # Zonen je Gebäude
+ZONEN_TABS_MAX = 8     # bis hier Eingabe als Tabs, darüber seitenweiser Tabellen-Editor
+ZONEN_SEITE    = 20    # Zonen je Seite (Editor, Geräteauslegung, Diagramme)
+ZONEN_SPALTEN  = 5     # Geräte-Karten je Zeile
+
+
+class ZonenTabelle:
+    """
+    Zonen eines Gebäudes spaltenweise: name, area, win_area, orient, glass,
+    shade, pers, tech, serie. Gebäudewerte (Standard, Masse, Raumhöhe)
+    kommen erst in zonen() dazu.
+    """
+    SPALTEN = {
+        "name":     (object, ""),
+        "area":     (float,  20.0),
+        "win_area": (float,  2.4),
+        "orient":   (object, "SUED"),
+        "glass":    (object, "Einfach"),
+        "shade":    (object, "Vorhang (Innen)"),
+        "pers":     (int,    2),
+        "tech":     (float,  200.0),
+        "serie":    (object, SAMSUNG_DEFAULT_SERIE),
+    }
+
+    def __init__(self, n=5):
+        self.spalten = {k: np.empty(0, dtype=t) for k, (t, _) in self.SPALTEN.items()}
+        self.anzahl_setzen(n)
+
+    def __len__(self):
+        return len(self.spalten["name"])
+
+    @property
+    def namen(self):
+        return list(self.spalten["name"])
+
+    def anzahl_setzen(self, n):
+        """Kürzen bzw. mit UI-Defaults auffüllen (Zone 1 = 50 m², sonst 20 m²)"""
+        alt = len(self)
+        if n == alt:
+            return
+        for k, (t, default) in self.SPALTEN.items():
+            neu = np.full(max(n - alt, 0), default, dtype=t)
+            self.spalten[k] = np.concatenate([self.spalten[k][:n], neu])
+        for i in range(alt, n):
+            self.spalten["name"][i] = f"Raum {i + 1}"
+        if alt == 0 and n > 0:
+            self.spalten["area"][0] = 50.0
+
+    def setzen(self, i, **werte):
+        for k, v in werte.items():
+            if k in self.spalten:
+                self.spalten[k][i] = v
+
+    def zeile(self, i):
+        return {k: spalte[i].item() if hasattr(spalte[i], "item") else spalte[i]
+                for k, spalte in self.spalten.items()}
+
+    def seite(self, start, stop, felder=None):
+        """Spalten-Ausschnitt [start:stop] als dict von Listen (Editor-Format)"""
+        return {k: self.spalten[k][start:stop].tolist() for k in (felder or self.SPALTEN)}
+
+    def seite_uebernehmen(self, start, daten):
+        """Editor-Ergebnis (dict von Listen) zurück in die Spalten schreiben"""
+        for k, werte in daten.items():
+            if k in self.spalten:
+                self.spalten[k][start:start + len(werte)] = werte
+
+    def zonen(self, standard, bau_m, raumhoehe):
+        """Zonen-Dicts für calc_zonen_cached() / simuliere_jahr()"""
+        s = self.spalten
+        return [{"area": float(s["area"][i]), "orient": s["orient"][i], "standard": standard,
+                 "glass": s["glass"][i], "shade": s["shade"][i], "pers": int(s["pers"][i]),
+                 "tech": float(s["tech"][i]), "win_area": float(s["win_area"][i]),
+                 "bau_m": bau_m, "raumhoehe": raumhoehe}
+                for i in range(len(self))]
+
+    def als_dicts(self):
+        return [self.zeile(i) for i in range(len(self))]
+
+    @classmethod
+    def aus_zonen(cls, zonen):
+        """Aus Zonen-Dicts (Archiv, CSV-Import über _batch_zone) aufbauen"""
+        tab = cls(len(zonen))
+        for i, z in enumerate(zonen):
+            tab.setzen(i, **{k: z[k] for k in cls.SPALTEN if z.get(k) not in (None, "")})
+        return tab
+
+
+# Widget-Keys je Zone (Eingabe-Tabs, Serie, Geräteauswahl): rn3, serie_col3, hw3 …
+_ZONEN_WIDGET_PRAEFIXE = ("rn", "ar", "wi", "or", "gl", "sh", "pe", "te", "serie_col", "hw", "agm", "ag")
+
+
+def _zonen_widgets_zuruecksetzen():
+    """Widget- und Geräteauswahl-Zustand je Zone verwerfen (neue Zonentabelle geladen)"""
+    for k in list(st.session_state):
+        k = str(k)
+        if k.startswith("zonen_editor_") or any(
+                k.startswith(p) and k[len(p):].isdigit() for p in _ZONEN_WIDGET_PRAEFIXE):
+            del st.session_state[k]
+    st.session_state.pop("geraete_wahl", None)
+
+
 # ==========================================
 
 
@@ -889,112 +2539,889 @@ def check_login():
 # ==========================================
 # 5. DATENBANK (SQLite lokal + Turso-ready)
 # ==========================================
-import sqlite3, json as _json, hashlib
+import sqlite3, json as _json, hashlib, queue
+from contextlib import contextmanager
 
 DB_PATH = "coolmath_projects.db"
 
-def _get_db():
-    """Gibt DB-Verbindung zurück. SQLite lokal (Turso deaktiviert)."""
-    # Turso deaktiviert - nutze lokale SQLite
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    return conn, "sqlite"
+# Verbindungs-Pool: mehrere Streamlit-Sessions (Threads) teilen sich wenige,
+# dauerhaft offene Verbindungen; WAL lässt Leser parallel zum Schreiber laufen.
+DB_POOL_GROESSE    = 8       # gleichzeitig ausgeliehene Verbindungen je DB-Datei
+DB_BUSY_TIMEOUT_MS = 5000    # Warten auf Schreibsperre statt sofort 'database is locked'
+DB_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous":  "NORMAL",       # in WAL sicher, deutlich weniger fsync
+    "busy_timeout": DB_BUSY_TIMEOUT_MS,
+    "temp_store":   "MEMORY",
+    "cache_size":   -8000,          # 8 MB Seiten-Cache je Verbindung
+    "foreign_keys": "ON",
+}
+
+# Schema-Versionen (PRAGMA user_version): db_migrieren() führt fehlende Schritte
+# der Reihe nach aus, jeden in einer eigenen Transaktion.
+_DB_SCHEMA_V1 = """
+    CREATE TABLE IF NOT EXISTS coolmath_projects (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        projekt_id  TEXT UNIQUE,
+        firma       TEXT,
+        username    TEXT,
+        projekt     TEXT,
+        kunde       TEXT,
+        bearbeiter  TEXT,
+        datum       TEXT,
+        room_data   TEXT,
+        results     TEXT,
+        devices     TEXT,
+        monday_id   TEXT,
+        created_at  TEXT
+    )"""
+
+# v2: Zonen, Methoden-Peaks und Geräte als Tabellen; room_data/results/devices
+# (JSON) bleiben nur als Altbestand stehen und werden nicht mehr geschrieben.
+# Peaks: zone = -1 → Gebäude (Simultanspitze), sonst Zonenindex.
+_DB_SCHEMA_V2 = (
+    "ALTER TABLE coolmath_projects ADD COLUMN standard TEXT",
+    "ALTER TABLE coolmath_projects ADD COLUMN bau_m TEXT",
+    "ALTER TABLE coolmath_projects ADD COLUMN raumhoehe REAL",
+    """CREATE TABLE projekt_zonen (
+        projekt_id TEXT NOT NULL REFERENCES coolmath_projects(projekt_id) ON DELETE CASCADE,
+        zone       INTEGER NOT NULL,
+        name TEXT, area REAL, win_area REAL, orient TEXT, glass TEXT, shade TEXT,
+        pers INTEGER, tech REAL, serie TEXT,
+        PRIMARY KEY (projekt_id, zone)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE projekt_peaks (
+        projekt_id TEXT NOT NULL REFERENCES coolmath_projects(projekt_id) ON DELETE CASCADE,
+        zone       INTEGER NOT NULL,
+        methode    TEXT NOT NULL,
+        peak_w     REAL NOT NULL,
+        PRIMARY KEY (projekt_id, zone, methode)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE projekt_geraete (
+        projekt_id TEXT NOT NULL REFERENCES coolmath_projects(projekt_id) ON DELETE CASCADE,
+        zone       INTEGER NOT NULL,
+        ig_kw REAL, ig_artnr TEXT, ag_typ TEXT, ag_kw REAL, ag_artnr TEXT,
+        PRIMARY KEY (projekt_id, zone)
+    ) WITHOUT ROWID""",
+    # projekt_id: eindeutiger Index über UNIQUE
+    "CREATE INDEX idx_projekte_firma_erstellt ON coolmath_projects(firma, created_at)",
+    "CREATE INDEX idx_projekte_erstellt ON coolmath_projects(created_at)",
+    "CREATE INDEX idx_peaks_methode ON projekt_peaks(methode, zone, peak_w)",
+)
+
+# v3: Projektarchiv seitenweise (Keyset über Sortierspalte + id) und Volltextsuche.
+# projekte_fts indiziert Projekt/Kunde/Bearbeiter (external content, Trigger halten
+# den Index aktuell); ohne FTS5 im SQLite-Build sucht das Archiv per LIKE.
+_DB_SCHEMA_V3 = (
+    "UPDATE coolmath_projects SET projekt=IFNULL(projekt,''), kunde=IFNULL(kunde,''), "
+    "created_at=IFNULL(created_at,'')",
+    "CREATE INDEX idx_projekte_firma_projekt ON coolmath_projects(firma, projekt)",
+    "CREATE INDEX idx_projekte_firma_kunde ON coolmath_projects(firma, kunde)",
+    "CREATE INDEX idx_projekte_projekt ON coolmath_projects(projekt)",
+    "CREATE INDEX idx_projekte_kunde ON coolmath_projects(kunde)",
+)
+_DB_FTS = (
+    """CREATE VIRTUAL TABLE projekte_fts USING fts5(
+        projekt, kunde, bearbeiter, content='coolmath_projects', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER projekte_fts_ai AFTER INSERT ON coolmath_projects BEGIN
+        INSERT INTO projekte_fts(rowid, projekt, kunde, bearbeiter)
+        VALUES (new.id, new.projekt, new.kunde, new.bearbeiter);
+    END""",
+    """CREATE TRIGGER projekte_fts_ad AFTER DELETE ON coolmath_projects BEGIN
+        INSERT INTO projekte_fts(projekte_fts, rowid, projekt, kunde, bearbeiter)
+        VALUES ('delete', old.id, old.projekt, old.kunde, old.bearbeiter);
+    END""",
+    """CREATE TRIGGER projekte_fts_au AFTER UPDATE OF projekt, kunde, bearbeiter
+       ON coolmath_projects BEGIN
+        INSERT INTO projekte_fts(projekte_fts, rowid, projekt, kunde, bearbeiter)
+        VALUES ('delete', old.id, old.projekt, old.kunde, old.bearbeiter);
+        INSERT INTO projekte_fts(rowid, projekt, kunde, bearbeiter)
+        VALUES (new.id, new.projekt, new.kunde, new.bearbeiter);
+    END""",
+    "INSERT INTO projekte_fts(projekte_fts) VALUES ('rebuild')",
+)
+
+# v4: 24-h-Lastprofile als float32-BLOB (little-endian, C-Reihenfolge, Methoden in
+# METHODEN_KEYS-Reihenfolge) — np.frombuffer liest sie ohne Kopie und ohne JSON.
+# gebaeude: [Methode][Stunde] (Simultansumme), zonen: [Zone][Methode][Stunde];
+# gebaeude steht vor zonen, Überlagerungen lesen die Zonen-BLOBs nicht mit.
+_DB_SCHEMA_V4 = """
+    CREATE TABLE projekt_kurven (
+        projekt_id TEXT PRIMARY KEY REFERENCES coolmath_projects(projekt_id) ON DELETE CASCADE,
+        stunden    INTEGER NOT NULL,
+        gebaeude   BLOB NOT NULL,
+        zonen      BLOB NOT NULL
+    )"""
+KURVEN_DTYPE = np.dtype("<f4")
+
+# v5: Ausgangs-Warteschlange für Monday-Uploads (MondayOutbox). Ein Auftrag je
+# Projekt — projekt_id ist der Idempotenzschlüssel, die Item-ID steht nach
+# create_item in coolmath_projects.monday_id. faellig: Unix-Zeit des nächsten
+# Versuchs, bei 'laeuft' Ende der Lease (danach übernimmt ein anderer Worker).
+_DB_SCHEMA_V5 = (
+    """CREATE TABLE monday_outbox (
+        projekt_id TEXT PRIMARY KEY REFERENCES coolmath_projects(projekt_id) ON DELETE CASCADE,
+        daten      TEXT NOT NULL,
+        dateiname  TEXT,
+        status     TEXT NOT NULL DEFAULT 'offen',
+        versuche   INTEGER NOT NULL DEFAULT 0,
+        faellig    REAL NOT NULL,
+        fehler     TEXT,
+        erstellt   REAL NOT NULL,
+        erledigt   REAL
+    ) WITHOUT ROWID""",
+    "CREATE INDEX idx_outbox_faellig ON monday_outbox(status, faellig)",
+)
+OUTBOX_STATUS = ("offen", "laeuft", "fertig", "fehler")
+
+# v6: Abgleich mit dem Monday-Board (monday_abgleich). Status und Änderungszeit
+# des Items stehen im Projektkopf; monday_snapshot hält je verknüpftem Item den
+# zuletzt bekannten Board-Stand ({spalte|"name": text}) — gesendet wird nur, was
+# davon abweicht. monday_sync: Stand (updated_at) des letzten Abgleichs je Board.
+_DB_SCHEMA_V6 = (
+    "ALTER TABLE coolmath_projects ADD COLUMN monday_status TEXT",
+    "ALTER TABLE coolmath_projects ADD COLUMN monday_aktualisiert TEXT",
+    "CREATE INDEX idx_projekte_monday ON coolmath_projects(monday_id)",
+    """CREATE TABLE monday_snapshot (
+        monday_id  TEXT PRIMARY KEY,
+        spalten    TEXT NOT NULL,
+        updated_at TEXT
+    ) WITHOUT ROWID""",
+    """CREATE TABLE monday_sync (
+        board_id TEXT PRIMARY KEY,
+        seit     TEXT,
+        lauf     REAL
+    ) WITHOUT ROWID""",
+)
+
+ZONEN_DB_FELDER = ("name", "area", "win_area", "orient", "glass", "shade", "pers", "tech", "serie")
+
+
+def _standard_aus_u(room_inputs):
+    """Baustandard älterer Einträge (ohne Gebäudewerte) aus dem gespeicherten U-Wert"""
+    u = room_inputs[0].get("u_wert") if room_inputs else None
+    return next((std for std, wert in U_WERTE.items() if wert == u), None)
+
+
+def _zonen_aus_room_inputs(room_inputs):
+    """Zonen älterer Einträge (nur room_inputs gespeichert) — fehlende Felder bleiben leer"""
+    return [{"name": r.get("name"), "area": r.get("flaeche"), "win_area": r.get("fenster"),
+             "orient": r.get("orientierung"), "glass": r.get("nutzung"), "pers": r.get("personen")}
+            for r in room_inputs]
+
+
+def _kurven_blob(kurven):
+    """Lastprofile → float32-Bytes (KURVEN_DTYPE)"""
+    return np.ascontiguousarray(kurven, dtype=KURVEN_DTYPE).tobytes()
+
+
+def _kurven_array(blob, stunden, zonen=False):
+    """BLOB → schreibgeschützte float32-Sicht ohne Kopie: Methoden × Stunden (bzw. Zonen × …)"""
+    form = (-1, len(METHODEN_KEYS), stunden) if zonen else (len(METHODEN_KEYS), stunden)
+    return np.frombuffer(blob, dtype=KURVEN_DTYPE).reshape(form)
+
+
+def _projekt_schreiben(conn, pid, kopf, gebaeude, zonen, zonen_peaks, gebaeude_peaks, geraete,
+                       kurven=None):
+    """
+    Ein Projekt normalisiert schreiben (Speichern und Migration).
+    kopf: firma, username, projekt, kunde, bearbeiter, datum, created_at
+    zonen_peaks: je Zone {methode: W}; geraete: je Zone (ig_kw, ig_artnr, ag_typ, ag_kw, ag_artnr)
+    kurven: Lastprofile Zonen × Methoden × Stunden (calc_zonen_cached) oder None → unverändert
+    """
+    conn.execute("""
+        INSERT INTO coolmath_projects
+        (projekt_id, firma, username, projekt, kunde, bearbeiter, datum, created_at,
+         standard, bau_m, raumhoehe)
+        VALUES (?,?,?,?,?,?,?,?,?,?,?)
+        ON CONFLICT(projekt_id) DO UPDATE SET
+            standard=excluded.standard, bau_m=excluded.bau_m, raumhoehe=excluded.raumhoehe""",
+        (pid, kopf.get("firma"), kopf.get("username"), kopf.get("projekt"), kopf.get("kunde"),
+         kopf.get("bearbeiter"), kopf.get("datum"), kopf.get("created_at"),
+         gebaeude.get("standard"), gebaeude.get("bau_m"), gebaeude.get("raumhoehe")))
+    for tabelle in ("projekt_zonen", "projekt_peaks", "projekt_geraete"):
+        conn.execute(f"DELETE FROM {tabelle} WHERE projekt_id=?", (pid,))
+    conn.executemany("INSERT INTO projekt_zonen VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                     [(pid, i, *(z.get(k) for k in ZONEN_DB_FELDER)) for i, z in enumerate(zonen)])
+    conn.executemany("INSERT INTO projekt_peaks VALUES (?,?,?,?)",
+                     [(pid, i, m, float(w)) for i, peaks in enumerate(zonen_peaks)
+                      for m, w in peaks.items()] +
+                     [(pid, -1, m, float(w)) for m, w in gebaeude_peaks.items()])
+    conn.executemany("INSERT INTO projekt_geraete VALUES (?,?,?,?,?,?,?)",
+                     [(pid, i, *g) for i, g in enumerate(geraete)])
+    if kurven is not None:
+        kurven = np.asarray(kurven)
+        conn.execute("INSERT OR REPLACE INTO projekt_kurven VALUES (?,?,?,?)",
+                     (pid, kurven.shape[-1], _kurven_blob(kurven.sum(axis=0)), _kurven_blob(kurven)))
+
+
+def _geraete_zeilen(selected_hw, selected_hw_ag, selected_ig_artnr=None):
+    """Geräteauswahl je Zone → (ig_kw, ig_artnr, ag_typ, ag_kw, ag_artnr)"""
+    zeilen = []
+    for i, ig_kw in enumerate(selected_hw):
+        ag = list(selected_hw_ag[i]) if i < len(selected_hw_ag) else []
+        ag += ["—", 0, "N.V."][len(ag):]
+        ig_artnr = selected_ig_artnr[i] if selected_ig_artnr and i < len(selected_ig_artnr) else None
+        zeilen.append((float(ig_kw or 0), ig_artnr, ag[0], float(ag[1] or 0), ag[2]))
+    return zeilen
+
+
+def _migration_2(conn):
+    """Normalisierte Tabellen anlegen und Altbestand aus den JSON-Spalten übernehmen"""
+    for sql in _DB_SCHEMA_V2:
+        conn.execute(sql)
+    alt = conn.execute("SELECT projekt_id, firma, username, projekt, kunde, bearbeiter, datum, "
+                       "created_at, room_data, results, devices FROM coolmath_projects").fetchall()
+    for pid, *kopf, room_data, results, devices in alt:
+        kopf = dict(zip(("firma", "username", "projekt", "kunde", "bearbeiter", "datum",
+                         "created_at"), kopf))
+        room_data = _json.loads(room_data or "{}")
+        results   = _json.loads(results or "{}")
+        devices   = _json.loads(devices or "{}")
+        ri = room_data.get("room_inputs") or []
+        zonen = room_data.get("zonen") or _zonen_aus_room_inputs(ri)
+        gebaeude = room_data.get("gebaeude") or {
+            "standard": _standard_aus_u(ri), "raumhoehe": ri[0].get("hoehe") if ri else None}
+        zonen_peaks = [{m: r[s] for m, s in METHODEN_RESULT_KEYS.items() if r.get(s) is not None}
+                       for r in results.get("room_results", [])]
+        geraete = _geraete_zeilen(devices.get("selected_hw", [])[:len(zonen)],
+                                  devices.get("selected_hw_ag", []))
+        _projekt_schreiben(conn, pid, kopf, gebaeude, zonen, zonen_peaks,
+                           results.get("peaks", {}), geraete)
+
+
+def _migration_3(conn):
+    """Sortier-Indizes und Volltextindex (falls FTS5 verfügbar) fürs Projektarchiv"""
+    for sql in _DB_SCHEMA_V3:
+        conn.execute(sql)
+    try:
+        conn.execute(_DB_FTS[0])
+    except sqlite3.OperationalError:         # SQLite ohne FTS5 → LIKE-Suche
+        return
+    for sql in _DB_FTS[1:]:
+        conn.execute(sql)
+
+
+_DB_MIGRATIONEN = [
+    (1, lambda conn: conn.execute(_DB_SCHEMA_V1)),
+    (2, _migration_2),
+    (3, _migration_3),
+    (4, lambda conn: conn.execute(_DB_SCHEMA_V4)),
+    (5, lambda conn: [conn.execute(sql) for sql in _DB_SCHEMA_V5]),
+    (6, lambda conn: [conn.execute(sql) for sql in _DB_SCHEMA_V6]),
+]
+DB_SCHEMA_VERSION = _DB_MIGRATIONEN[-1][0]
+
+
+def db_migrieren(conn):
+    """
+    Bringt die Datenbank auf DB_SCHEMA_VERSION. Jeder Schritt läuft mit
+    Schreibsperre (BEGIN IMMEDIATE) in einer eigenen Transaktion; die Version
+    wird unter der Sperre erneut gelesen (mehrere Prozesse gleichzeitig).
+    """
+    for ziel, schritt in _DB_MIGRATIONEN:
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= ziel:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] < ziel:
+                schritt(conn)
+                conn.execute(f"PRAGMA user_version={ziel}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+class DBPool:
+    """
+    Verbindungs-Pool je Datenbankdatei (thread-sicher). Eine Verbindung gehört
+    während eines Vorgangs exklusiv einem Thread und geht danach zurück in den
+    Pool. Pragmas einmal je Verbindung, Schema/Migration einmal je Prozess.
+    groesse=0 → keine Wiederverwendung, jede Verbindung wird nach Gebrauch geschlossen.
+    """
+
+    def __init__(self, pfad, groesse=DB_POOL_GROESSE, pragmas=None, warten=30.0):
+        self.pfad     = pfad
+        self.groesse  = int(groesse)
+        self.pragmas  = DB_PRAGMAS if pragmas is None else pragmas
+        self.warten   = warten                   # max. Wartezeit auf freie Verbindung [s]
+        self.erstellt = 0
+        self._frei    = queue.LifoQueue()
+        self._plaetze = threading.BoundedSemaphore(self.groesse) if self.groesse else None
+        self._lock    = threading.Lock()
+        self._schema_ok    = False
+        self._geschlossen  = False
+
+    def _neu(self):
+        conn = sqlite3.connect(self.pfad, timeout=DB_BUSY_TIMEOUT_MS / 1000,
+                               check_same_thread=False)
+        for name, wert in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={wert}")
+        with self._lock:
+            self.erstellt += 1
+        return conn
+
+    @contextmanager
+    def verbindung(self):
+        """Leiht eine Verbindung aus: commit bei Erfolg, rollback bei Fehler"""
+        if self._plaetze and not self._plaetze.acquire(timeout=self.warten):
+            raise sqlite3.OperationalError(f"DB-Pool: keine freie Verbindung nach {self.warten} s")
+        conn = None
+        try:
+            try:
+                conn = self._frei.get_nowait()
+            except queue.Empty:
+                conn = self._neu()
+            yield conn
+            conn.commit()
+        except BaseException:
+            if conn is not None:
+                conn.rollback()
+            raise
+        finally:
+            if conn is not None:
+                if self.groesse and not self._geschlossen:
+                    self._frei.put(conn)
+                else:
+                    conn.close()
+            if self._plaetze:
+                self._plaetze.release()
+
+    def einrichten(self, fn):
+        """fn(conn) einmal je Prozess ausführen, z.B. Migration (nicht bei jedem Rerun)"""
+        with self._lock:
+            if self._schema_ok:
+                return
+        with self.verbindung() as conn:
+            fn(conn)
+        with self._lock:
+            self._schema_ok = True
+
+    def schliessen(self):
+        """Alle freien Verbindungen schließen (WAL-Checkpoint); ausgeliehene beim Zurückgeben"""
+        self._geschlossen = True
+        while True:
+            try:
+                self._frei.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def stats(self):
+        return {"erstellt": self.erstellt, "frei": self._frei.qsize(), "groesse": self.groesse}
+
 
+def db_pool(pfad=None):
+    """Prozessweiter Pool für DB_PATH — gemeinsam für alle Sessions, überlebt Reruns"""
+    pfad = pfad or DB_PATH
+
+    def anlegen():
+        import atexit
+        pool = DBPool(pfad)
+        atexit.register(pool.schliessen)
+        return pool
+    return prozess_ressource(f"db_pool:{os.path.abspath(pfad)}", anlegen)
+
+
+def _db():
+    """Verbindung aus dem Pool als Kontextmanager: with _db() as conn: ..."""
+    return db_pool().verbindung()
+
+@gemessen
 def db_init():
-    """Erstellt Tabellen falls noch nicht vorhanden."""
+    """Erstellt/migriert das Schema auf DB_SCHEMA_VERSION (einmal je Prozess)."""
     try:
-        conn, _ = _get_db()
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS coolmath_projects (
-                id          INTEGER PRIMARY KEY AUTOINCREMENT,
-                projekt_id  TEXT UNIQUE,
-                firma       TEXT,
-                username    TEXT,
-                projekt     TEXT,
-                kunde       TEXT,
-                bearbeiter  TEXT,
-                datum       TEXT,
-                room_data   TEXT,
-                results     TEXT,
-                devices     TEXT,
-                monday_id   TEXT,
-                created_at  TEXT
-            )""")
-        conn.commit()
+        db_pool().einrichten(db_migrieren)
     except Exception as e:
         pass  # silent fail – app läuft auch ohne DB
 
+@gemessen
 def db_save_project(firma, username, proj, kunde, bearbeiter,
-                    room_inputs, room_results, g_sums, selected_hw, selected_hw_ag):
-    """Speichert Projekt in DB. Gibt projekt_id zurück."""
+                    room_inputs, room_results, g_sums, selected_hw, selected_hw_ag, zonen=None,
+                    gebaeude=None, selected_ig_artnr=None, kurven=None):
+    """
+    Speichert Projekt in DB: Kopf, Zonen (vollständige Zonentabelle), Peaks je
+    Zone und Gebäude sowie Geräteauswahl als eigene Tabellen. gebaeude: Standard,
+    Masse, Raumhöhe — damit Berichte später neu erzeugt werden können.
+    kurven: Lastprofile je Zone und Methode (Zonen × Methoden × Stunden).
+    Gibt projekt_id zurück.
+    """
     try:
-        conn, _ = _get_db()
         pid = hashlib.md5(f"{firma}{proj}{kunde}{datetime.now().isoformat()}".encode()).hexdigest()[:12]
-        conn.execute("""
-            INSERT OR REPLACE INTO coolmath_projects
-            (projekt_id, firma, username, projekt, kunde, bearbeiter, datum,
-             room_data, results, devices, created_at)
-            VALUES (?,?,?,?,?,?,?,?,?,?,?)""", (
-            pid, firma, username, proj, kunde, bearbeiter,
-            datetime.now().strftime("%d.%m.%Y %H:%M"),
-            _json.dumps({"room_inputs": room_inputs}, ensure_ascii=False),
-            _json.dumps({
-                "room_results": room_results,
-                "peaks": {k: float(v.max()) for k, v in g_sums.items()}
-            }, ensure_ascii=False),
-            _json.dumps({
-                "selected_hw": selected_hw,
-                "selected_hw_ag": [list(x) if isinstance(x, tuple) else x for x in selected_hw_ag],
-            }, ensure_ascii=False),
-            datetime.now().isoformat()
-        ))
-        conn.commit()
+        kopf = {"firma": firma, "username": username, "projekt": proj, "kunde": kunde,
+                "bearbeiter": bearbeiter, "datum": datetime.now().strftime("%d.%m.%Y %H:%M"),
+                "created_at": datetime.now().isoformat()}
+        zonen_peaks = [{m: r[s] for m, s in METHODEN_RESULT_KEYS.items() if s in r} for r in room_results]
+        with _db() as conn:
+            _projekt_schreiben(conn, pid, kopf, gebaeude or {},
+                               zonen or _zonen_aus_room_inputs(room_inputs), zonen_peaks,
+                               {k: float(np.max(v)) for k, v in g_sums.items()},
+                               _geraete_zeilen(selected_hw, selected_hw_ag, selected_ig_artnr),
+                               kurven)
         return pid
     except Exception as e:
         st.warning(f"⚠️ DB-Speicherung: {e}")
         return None
 
-def db_load_projects(firma, role="partner"):
-    """Lädt Projektliste. Admin sieht alle, Partner nur eigene Firma."""
-    try:
-        conn, _ = _get_db()
-        if role == "admin":
-            rows = conn.execute(
-                "SELECT projekt_id,firma,projekt,kunde,bearbeiter,datum FROM coolmath_projects ORDER BY created_at DESC"
-            ).fetchall()
-        else:
-            rows = conn.execute(
-                "SELECT projekt_id,firma,projekt,kunde,bearbeiter,datum FROM coolmath_projects WHERE firma=? ORDER BY created_at DESC",
-                (firma,)
-            ).fetchall()
-        return rows
+# Kopfspalten je Projekt (Laden, Sammel-Export)
+ARCHIV_SPALTEN = ("projekt_id", "firma", "username", "projekt", "kunde", "bearbeiter", "datum",
+                  "created_at", "monday_id", "standard", "bau_m", "raumhoehe")
+
+def _projekt_laden(conn, kopf):
+    """Kopfzeile (dict) + Zonen, Peaks und Geräte aus den Detailtabellen → Projekt-Dict"""
+    pid = kopf["projekt_id"]
+    zonen = [dict(zip(ZONEN_DB_FELDER, z)) for z in conn.execute(
+        f"SELECT {', '.join(ZONEN_DB_FELDER)} FROM projekt_zonen WHERE projekt_id=? ORDER BY zone",
+        (pid,))]
+    room_results = [{"ZONE": z["name"]} for z in zonen]
+    peaks = {}
+    for zone, methode, peak_w in conn.execute(
+            "SELECT zone, methode, peak_w FROM projekt_peaks WHERE projekt_id=?", (pid,)):
+        if zone < 0:
+            peaks[methode] = peak_w
+        elif zone < len(room_results):
+            room_results[zone][METHODEN_RESULT_KEYS[methode]] = int(peak_w)
+    geraete = conn.execute("SELECT ig_kw, ig_artnr, ag_typ, ag_kw, ag_artnr FROM projekt_geraete "
+                           "WHERE projekt_id=? ORDER BY zone", (pid,)).fetchall()
+    kurven = conn.execute("SELECT stunden, gebaeude, zonen FROM projekt_kurven WHERE projekt_id=?",
+                          (pid,)).fetchone()
+    if kurven:
+        stunden, g_blob, z_blob = kurven
+        kurven = (_kurven_array(g_blob, stunden), _kurven_array(z_blob, stunden, zonen=True))
+    if not kurven or len(kurven[1]) != len(zonen):     # ältere Projekte: ohne Profile
+        kurven = (None, None)
+    return {**kopf,
+            "gebaeude": {k: kopf.get(k) for k in ("standard", "bau_m", "raumhoehe")},
+            "zonen": zonen, "room_results": room_results, "peaks": peaks,
+            "gebaeude_kurven": kurven[0], "kurven": kurven[1],
+            "selected_hw": [g[0] for g in geraete],
+            "selected_ig_artnr": [g[1] or "—" for g in geraete],
+            "selected_hw_ag": [(g[2], g[3], g[4]) for g in geraete]}
+
+def _fts_aktiv(conn):
+    """Volltextindex vorhanden (Migration 3 mit FTS5)?"""
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name='projekte_fts'").fetchone() is not None
+
+def _fts_ausdruck(suche):
+    """Suchtext → FTS5-Abfrage: jedes Wort als Präfix, alle Wörter müssen vorkommen"""
+    import re
+    return " ".join(f'"{w}"*' for w in re.findall(r"\w+", suche))
+
+def _archiv_filter(firma, role="partner", von=None, bis=None, suche="", min_peak_w=None, fts=False):
+    """
+    WHERE-Klausel + Parameter: Firma je Rolle, Speicherdatum von/bis (inkl.),
+    Suchtext (Volltext über Wortanfänge, ohne FTS5 Teilstring per LIKE),
+    Gebäude-Simultanpeak VDI 6007 >= min_peak_w
+    """
+    where, args = ["1=1"], []
+    if role != "admin":
+        where.append("firma=?")
+        args.append(firma)
+    if von:
+        where.append("created_at >= ?")
+        args.append(str(von))
+    if bis:
+        where.append("created_at < date(?, '+1 day')")
+        args.append(str(bis))
+    if suche and fts:
+        if _fts_ausdruck(suche):
+            where.append("id IN (SELECT rowid FROM projekte_fts WHERE projekte_fts MATCH ?)")
+            args.append(_fts_ausdruck(suche))
+    elif suche:
+        where.append("(projekt LIKE ? OR kunde LIKE ? OR bearbeiter LIKE ?)")
+        args += [f"%{suche}%"] * 3
+    if min_peak_w:
+        where.append("projekt_id IN (SELECT projekt_id FROM projekt_peaks "
+                     "WHERE methode='VDI_N' AND zone=-1 AND peak_w >= ?)")
+        args.append(float(min_peak_w))
+    return " AND ".join(where), args
+
+@gemessen
+def db_projekte_zaehlen(firma, role="partner", von=None, bis=None, suche="", min_peak_w=None):
+    try:
+        with _db() as conn:
+            where, args = _archiv_filter(firma, role, von, bis, suche, min_peak_w, _fts_aktiv(conn))
+            return conn.execute(f"SELECT COUNT(*) FROM coolmath_projects WHERE {where}", args).fetchone()[0]
     except Exception:
-        return []
+        return 0
+
+# Projektarchiv: Sortierungen (Spalte, Richtung) — je Sortierung ein Index, id als Tie-Break
+ARCHIV_SORTIERUNGEN = {
+    "Neueste zuerst": ("created_at", "DESC"),
+    "Älteste zuerst": ("created_at", "ASC"),
+    "Projekt A–Z":    ("projekt", "ASC"),
+    "Kunde A–Z":      ("kunde", "ASC"),
+}
+ARCHIV_SEITE = 25            # Projekte je Seite
 
+@gemessen
+def db_projekte_seite(firma, role="partner", von=None, bis=None, suche="", min_peak_w=None,
+                      sortierung="Neueste zuerst", nach=None, limit=ARCHIV_SEITE):
+    """
+    Eine Seite des Projektarchivs (Keyset-Pagination): nach = Cursor der
+    vorherigen Seite (None → erste Seite). Gelesen werden nur limit + 1 Zeilen
+    über den Index der Sortierspalte, unabhängig von der Archivgröße.
+    Rückgabe: ([(projekt_id, firma, projekt, kunde, bearbeiter, datum, monday_status), ...],
+    Cursor der nächsten Seite oder None)
+    """
+    spalte, richtung = ARCHIV_SORTIERUNGEN[sortierung]
+    try:
+        with _db() as conn:
+            where, args = _archiv_filter(firma, role, von, bis, suche, min_peak_w, _fts_aktiv(conn))
+            if nach:
+                where += f" AND ({spalte}, id) {'<' if richtung == 'DESC' else '>'} (?, ?)"
+                args += list(nach)
+            zeilen = conn.execute(
+                f"SELECT projekt_id, firma, projekt, kunde, bearbeiter, datum, "
+                f"IFNULL(monday_status, ''), {spalte}, id "
+                f"FROM coolmath_projects WHERE {where} "
+                f"ORDER BY {spalte} {richtung}, id {richtung} LIMIT ?", args + [limit + 1]).fetchall()
+    except Exception:
+        return [], None
+    naechste = tuple(zeilen[limit - 1][-2:]) if len(zeilen) > limit else None
+    return [z[:7] for z in zeilen[:limit]], naechste
+
+def db_projekte_iter(firma, role="partner", von=None, bis=None, suche="", min_peak_w=None, block=100):
+    """
+    Gefilterte Projekte als Projekt-Dicts (wie db_load_project), Köpfe blockweise
+    per fetchmany — konstanter Speicher auch bei großen Archiven. Die
+    Pool-Verbindung bleibt bis zum Ende der Iteration ausgeliehen.
+    """
+    with _db() as conn:
+        where, args = _archiv_filter(firma, role, von, bis, suche, min_peak_w, _fts_aktiv(conn))
+        cur = conn.execute(f"SELECT {', '.join(ARCHIV_SPALTEN)} FROM coolmath_projects "
+                           f"WHERE {where} ORDER BY created_at", args)
+        while True:
+            zeilen = cur.fetchmany(block)
+            if not zeilen:
+                return
+            for z in zeilen:
+                yield _projekt_laden(conn, dict(zip(ARCHIV_SPALTEN, z)))
+
+@gemessen
 def db_load_project(projekt_id):
-    """Lädt ein Projekt vollständig."""
+    """Lädt ein Projekt vollständig (Projekt-Dict, siehe _projekt_laden)."""
     try:
-        conn, _ = _get_db()
-        row = conn.execute(
-            "SELECT * FROM coolmath_projects WHERE projekt_id=?", (projekt_id,)
-        ).fetchone()
-        return row
+        with _db() as conn:
+            kopf = conn.execute(f"SELECT {', '.join(ARCHIV_SPALTEN)} FROM coolmath_projects "
+                                f"WHERE projekt_id=?", (projekt_id,)).fetchone()
+            return _projekt_laden(conn, dict(zip(ARCHIV_SPALTEN, kopf))) if kopf else None
     except Exception:
         return None
 
+@gemessen
+def db_gebaeude_kurven(projekt_ids):
+    """
+    Gebäude-Simultankurven mehrerer Projekte (Überlagerung im Archiv), ohne
+    Zonen-BLOBs: {projekt_id: Methoden × Stunden} — Projekte ohne Profile fehlen.
+    """
+    if not projekt_ids:
+        return {}
+    try:
+        with _db() as conn:
+            return {pid: _kurven_array(blob, stunden) for pid, stunden, blob in conn.execute(
+                f"SELECT projekt_id, stunden, gebaeude FROM projekt_kurven "
+                f"WHERE projekt_id IN ({', '.join('?' * len(projekt_ids))})", list(projekt_ids))}
+    except Exception:
+        return {}
+
 def db_update_monday_id(projekt_id, monday_id):
     try:
-        conn, _ = _get_db()
+        with _db() as conn:
+            conn.execute("UPDATE coolmath_projects SET monday_id=? WHERE projekt_id=?",
+                         (monday_id, projekt_id))
+    except Exception:
+        pass
+
+
+# --- Monday-Outbox (Schema v5) — ohne try/except: Fehler behandelt MondayOutbox ---
+@gemessen
+def db_outbox_einreihen(projekt_id, daten, dateiname=None):
+    """
+    Monday-Auftrag für ein gespeichertes Projekt einreihen. Idempotent: ein
+    offener, laufender oder erledigter Auftrag bleibt unverändert, nur ein
+    fehlgeschlagener wird zurückgesetzt. Gibt True zurück, wenn der Auftrag
+    (neu oder zurückgesetzt) zur Abarbeitung ansteht.
+    """
+    jetzt = time.time()
+    with _db() as conn:
+        cur = conn.execute(
+            "INSERT INTO monday_outbox (projekt_id, daten, dateiname, faellig, erstellt) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT(projekt_id) DO UPDATE SET "
+            "status='offen', versuche=0, faellig=excluded.faellig, fehler=NULL "
+            "WHERE status='fehler'",
+            (projekt_id, _json.dumps(daten, ensure_ascii=False), dateiname, jetzt, jetzt))
+        return cur.rowcount > 0
+
+def db_outbox_uebernehmen(lease_s, n=1):
+    """
+    Bis zu n fällige Aufträge (älteste zuerst) exklusiv übernehmen — ein
+    UPDATE-Statement: die Schreibsperre gilt ab Statement-Beginn, auch über
+    Prozesse hinweg → [dict mit projekt_id, daten, dateiname, versuche, monday_id,
+    lease (Ablaufzeit, für db_outbox_verlaengern)]
+    """
+    jetzt = time.time()
+    with _db() as conn:
+        jobs = conn.execute(
+            "UPDATE monday_outbox SET status='laeuft', versuche=versuche+1, faellig=? "
+            "WHERE projekt_id IN (SELECT projekt_id FROM monday_outbox "
+            "                     WHERE status IN ('offen', 'laeuft') AND faellig<=? "
+            "                     ORDER BY faellig LIMIT ?) "
+            "RETURNING projekt_id, daten, dateiname, versuche",
+            (jetzt + lease_s, jetzt, int(n))).fetchall()
+        if not jobs:
+            return []
+        ids = dict(conn.execute(
+            f"SELECT projekt_id, monday_id FROM coolmath_projects "
+            f"WHERE projekt_id IN ({', '.join('?' * len(jobs))})", [j[0] for j in jobs]))
+    return [{"projekt_id": pid, "daten": _json.loads(daten), "dateiname": dateiname,
+             "versuche": versuche, "monday_id": ids.get(pid), "lease": jetzt + lease_s}
+            for pid, daten, dateiname, versuche in jobs]
+
+def db_outbox_verlaengern(job, lease_s):
+    """
+    Lease eines übernommenen Auftrags erneuern, nur wenn er noch mit unserer
+    Ablaufzeit läuft (sonst hat ihn nach Ablauf ein anderer Worker übernommen)
+    → True, job["lease"] fortgeschrieben
+    """
+    neu = time.time() + lease_s
+    with _db() as conn:
+        ok = conn.execute("UPDATE monday_outbox SET faellig=? WHERE projekt_id=? AND status='laeuft' "
+                          "AND faellig=?", (neu, job["projekt_id"], job["lease"])).rowcount > 0
+    if ok:
+        job["lease"] = neu
+    return ok
+
+def db_outbox_archiv(firma=None, mit_pdf=True):
+    """
+    Massen-Abgleich: archivierte Projekte ohne monday_id einreihen (Item-Spalten
+    aus Kopf und Gebäudepeak VDI 6007) → Anzahl neuer Aufträge
+    """
+    jetzt = time.time()
+    with _db() as conn:
+        return conn.execute(
+            "INSERT INTO monday_outbox (projekt_id, daten, dateiname, faellig, erstellt) "
+            "SELECT p.projekt_id, json_object('projekt', p.projekt, 'kunde', p.kunde, "
+            "       'bearbeiter', p.bearbeiter, 'peak_kw', round(IFNULL(g.peak_w, 0) / 1000.0, 2)), "
+            "       CASE WHEN ? THEN 'coolMATH_' || p.projekt || '.pdf' END, ?, ? "
+            "FROM coolmath_projects p LEFT JOIN projekt_peaks g "
+            "     ON g.projekt_id=p.projekt_id AND g.zone=-1 AND g.methode='VDI_N' "
+            "WHERE IFNULL(p.monday_id, '')='' AND (? IS NULL OR p.firma=?) "
+            "ORDER BY p.id ON CONFLICT(projekt_id) DO NOTHING",
+            (bool(mit_pdf), jetzt, jetzt, firma, firma)).rowcount
+
+def db_outbox_item(projekt_id, monday_id, snapshot=None):
+    """
+    Item-ID sofort nach create_item sichern — Wiederholungen legen kein zweites
+    Item an; snapshot: gesendete Felder als Texte (Basis für monday_abgleich)
+    """
+    with _db() as conn:
         conn.execute("UPDATE coolmath_projects SET monday_id=? WHERE projekt_id=?",
                      (monday_id, projekt_id))
-        conn.commit()
+        if snapshot:
+            _snapshot_schreiben(conn, monday_id, snapshot)
+
+def _snapshot_schreiben(conn, monday_id, texte, updated_at=None):
+    """Snapshot eines Items anlegen bzw. um texte ergänzen (json_patch)"""
+    conn.execute("INSERT INTO monday_snapshot (monday_id, spalten, updated_at) VALUES (?, ?, ?) "
+                 "ON CONFLICT(monday_id) DO UPDATE SET spalten=json_patch(spalten, excluded.spalten), "
+                 "updated_at=IFNULL(excluded.updated_at, updated_at)",
+                 (monday_id, _json.dumps(texte, ensure_ascii=False), updated_at))
+
+@gemessen
+def db_sync_stand(board_id):
+    """updated_at-Stand des letzten Abgleichs (None: noch nie → voller Abgleich)"""
+    with _db() as conn:
+        row = conn.execute("SELECT seit FROM monday_sync WHERE board_id=?", (str(board_id),)).fetchone()
+    return row[0] if row else None
+
+def db_sync_stand_setzen(board_id, seit):
+    """Stand nach vollständigem Abgleich fortschreiben"""
+    with _db() as conn:
+        conn.execute("INSERT INTO monday_sync (board_id, seit, lauf) VALUES (?, ?, ?) "
+                     "ON CONFLICT(board_id) DO UPDATE SET seit=excluded.seit, lauf=excluded.lauf",
+                     (str(board_id), seit, time.time()))
+
+def db_sync_uebernehmen(items):
+    """
+    Gelesene Board-Items (monday_id, {spalte|"name": text}, status, updated_at)
+    übernehmen: nur verknüpfte Projekte erhalten Status, Änderungszeit und
+    Snapshot (fremde Items des Boards werden nicht gespeichert).
+    → Anzahl aktualisierter Projekte
+    """
+    n = 0
+    with _db() as conn:
+        for monday_id, texte, status, updated_at in items:
+            treffer = conn.execute("UPDATE coolmath_projects SET monday_status=?, monday_aktualisiert=? "
+                                   "WHERE monday_id=?", (status, updated_at, monday_id)).rowcount
+            if treffer:
+                _snapshot_schreiben(conn, monday_id, texte, updated_at)
+                n += treffer
+    return n
+
+def db_sync_verknuepft():
+    """Verknüpfte Projekte mit Snapshot: [(projekt_id, monday_id, kunde, created_at, {spalte: text})]"""
+    with _db() as conn:
+        return [(pid, mid, kunde, created_at, _json.loads(spalten)) for pid, mid, kunde, created_at, spalten
+                in conn.execute("SELECT p.projekt_id, p.monday_id, p.kunde, p.created_at, s.spalten "
+                                "FROM coolmath_projects p JOIN monday_snapshot s USING (monday_id)")]
+
+def db_snapshot_setzen(monday_id, texte):
+    """Erfolgreich gesendete Felder in den Snapshot übernehmen"""
+    with _db() as conn:
+        _snapshot_schreiben(conn, monday_id, texte)
+
+def db_outbox_ergebnis(projekt_id, status, faellig=None, fehler=None):
+    """Auftrag abschließen ('fertig'/'fehler') oder für den nächsten Versuch planen ('offen')"""
+    with _db() as conn:
+        conn.execute("UPDATE monday_outbox SET status=?, faellig=IFNULL(?, faellig), fehler=?, "
+                     "erledigt=CASE WHEN ?='fertig' THEN ? END WHERE projekt_id=?",
+                     (status, faellig, fehler, status, time.time(), projekt_id))
+
+def db_outbox_naechster():
+    """Unix-Zeit des nächsten fälligen Auftrags (None: Warteschlange leer)"""
+    with _db() as conn:
+        return conn.execute("SELECT MIN(faellig) FROM monday_outbox "
+                            "WHERE status IN ('offen', 'laeuft')").fetchone()[0]
+
+@gemessen
+def db_outbox_status(projekt_id):
+    """Auftragsstatus eines Projekts inkl. monday_id (Anzeige) oder None"""
+    try:
+        with _db() as conn:
+            row = conn.execute(
+                "SELECT o.status, o.versuche, o.faellig, o.fehler, o.erledigt, p.monday_id "
+                "FROM monday_outbox o JOIN coolmath_projects p USING (projekt_id) "
+                "WHERE o.projekt_id=?", (projekt_id,)).fetchone()
+        return dict(zip(("status", "versuche", "faellig", "fehler", "erledigt", "monday_id"),
+                        row)) if row else None
     except Exception:
-        pass
+        return None
+
+@gemessen
+def db_outbox_zaehlen():
+    """Aufträge je Status: {status: anzahl}"""
+    try:
+        with _db() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM monday_outbox GROUP BY status"))
+    except Exception:
+        return {}
+
+def db_outbox_fehler(limit=20):
+    """Fehlgeschlagene Aufträge: [(projekt_id, projekt, versuche, fehler)], neueste zuerst"""
+    try:
+        with _db() as conn:
+            return conn.execute(
+                "SELECT o.projekt_id, p.projekt, o.versuche, o.fehler FROM monday_outbox o "
+                "JOIN coolmath_projects p USING (projekt_id) WHERE o.status='fehler' "
+                "ORDER BY o.faellig DESC LIMIT ?", (limit,)).fetchall()
+    except Exception:
+        return []
+
+def db_outbox_wiederholen():
+    """Alle fehlgeschlagenen Aufträge erneut einplanen → Anzahl"""
+    try:
+        with _db() as conn:
+            return conn.execute("UPDATE monday_outbox SET status='offen', versuche=0, faellig=?, "
+                                "fehler=NULL WHERE status='fehler'", (time.time(),)).rowcount
+    except Exception:
+        return 0
 
 
 # ==========================================
 # 6. MONDAY.COM INTEGRATION
 # ==========================================
-import requests as _requests
+def _http():
+    """requests erst bei der ersten Monday-Anfrage laden (Kaltstart)"""
+    import requests
+    return requests
+
+
+MONDAY_API_URL = "https://api.monday.com/v2"     # Datei-Uploads: {MONDAY_API_URL}/file
+# GraphQL-Fehlercodes, die Monday auch bei HTTP 200 für Lastgrenzen liefert → erneut versuchen
+MONDAY_FEHLER_VORLAEUFIG = {"ComplexityException", "RATE_LIMIT_EXCEEDED",
+                            "IP_RATE_LIMIT_EXCEEDED", "maxConcurrencyExceeded"}
+# Spaltenfehler beim Anlegen → einzeln ohne Dropdown-/Status-/Projekt-Spalte wiederholen
+MONDAY_FEHLER_SPALTEN = {"ColumnValueException", "InvalidColumnIdException"}
+MONDAY_BATCH        = 25     # create_item-Mutationen je Anfrage (Aliase i0, i1, …)
+MONDAY_VERBINDUNGEN = 8      # Keep-alive-Verbindungen je Host (gemeinsame Session)
+MONDAY_SYNC_SEITE   = 100    # Items je Seite beim Board-Abgleich (items_page, max. 500)
+MONDAY_STATUS_SPALTE = "color_mkncgyk5"       # pflegt Monday → coolmath_projects.monday_status
+MONDAY_SYNC_SPALTEN  = ("name", "date_mknqdvj8")  # pflegt coolMATH → Board (nur Abweichungen)
+MONDAY_PROJEKT_SPALTE = "text_projekt_id"     # Textspalte mit der projekt_id (Wiederfinden nach unklarem Fehler)
+
+
+def monday_session():
+    """
+    Prozessweite requests.Session: Keep-alive statt neuer TCP-/TLS-Verbindung
+    je Anfrage. Der urllib3-Pool ist thread-sicher (UI-Threads + Outbox-Worker);
+    Cookies nutzt die Monday-API nicht.
+    """
+    def anlegen():
+        import atexit
+        requests = _http()
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=MONDAY_VERBINDUNGEN)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        atexit.register(session.close)
+        return session
+    return prozess_ressource("monday_session", anlegen)
+
+
+class MondayBudget:
+    """
+    Complexity-Budget des API-Tokens (Monday: Punkte je Minute). Monday meldet den
+    Stand im complexity-Feld der Antwort (after, reset_in_x_seconds), nicht im
+    Header; Batch-Mutationen fragen es mit ab. Vor einer Anfrage wird bis zum
+    Reset gewartet, wenn das Restbudget für die geschätzten Kosten (gelernt aus
+    complexity.query je Item) nicht reicht. Retry-After/retry_in_seconds bei
+    Lastgrenzen sperrt das Budget ebenso bis zum genannten Zeitpunkt.
+    """
+
+    def __init__(self):
+        self.rest        = None      # Restpunkte laut letzter Antwort
+        self.reset_um    = 0.0       # time.monotonic() des nächsten Budget-Resets
+        self.kosten_item = None      # Punkte je create_item (gleitend)
+        self.gewartet_s  = 0.0
+        self._lock = threading.Lock()
+
+    def reservieren(self, n, schlafen=time.sleep):
+        """Vor einer Anfrage mit n Items: ggf. bis zum Reset warten"""
+        with self._lock:
+            jetzt = time.monotonic()
+            if jetzt >= self.reset_um:
+                return
+            gesperrt = self.rest is not None and self.rest < n * (self.kosten_item or 0)
+            warten = self.reset_um - jetzt if gesperrt or self.rest == 0 else 0.0
+            if warten:
+                self.gewartet_s += warten
+        if warten:
+            schlafen(warten)
+
+    def melden(self, complexity, n):
+        """complexity-Feld einer Antwort ({query, after, reset_in_x_seconds}) übernehmen"""
+        if not complexity:
+            return
+        with self._lock:
+            if complexity.get("after") is not None:
+                self.rest = complexity["after"]
+            if complexity.get("reset_in_x_seconds") is not None:
+                self.reset_um = time.monotonic() + float(complexity["reset_in_x_seconds"])
+            if complexity.get("query") and n:
+                k = complexity["query"] / n
+                self.kosten_item = k if self.kosten_item is None else 0.7 * self.kosten_item + 0.3 * k
+
+    def sperren(self, warten):
+        """Lastgrenze erreicht: keine Anfragen vor Ablauf von warten [s]"""
+        with self._lock:
+            self.rest = 0
+            self.reset_um = max(self.reset_um, time.monotonic() + warten)
+
+
+def monday_budget():
+    return prozess_ressource("monday_budget", MondayBudget)
 
 
 def get_monday_secrets():
@@ -1010,12 +3437,88 @@ def get_monday_secrets():
     except Exception:
         return "", ""
 
+
+def get_monday_api_url():
+    """API-Endpunkt: st.secrets MONDAY_API_URL (z. B. lokaler Test-Server) oder MONDAY_API_URL"""
+    try:
+        return st.secrets.get("MONDAY_API_URL", "") or MONDAY_API_URL
+    except Exception:
+        return MONDAY_API_URL
+
+
+class MondayFehler(Exception):
+    """
+    Fehlgeschlagene Monday-Anfrage. vorlaeufig: Netzwerk, HTTP 429/5xx oder
+    Lastgrenze → später erneut versuchen; sonst dauerhaft (Token, Board, Spalten).
+    warten: vom Server verlangte Pause [s] (Retry-After / retry_in_seconds).
+    """
+
+    def __init__(self, text, vorlaeufig=True, warten=None):
+        super().__init__(text)
+        self.vorlaeufig = vorlaeufig
+        self.warten = warten
+
+
+def monday_spalten_text(wert):
+    """Spaltenwert im Schreibformat (quote_spalten) → Text wie column_values.text"""
+    if isinstance(wert, dict):
+        if "date" in wert:
+            return wert["date"]
+        if "labels" in wert:
+            return ", ".join(wert["labels"])
+        if "label" in wert:
+            return wert["label"]
+    return "" if wert is None else str(wert)
+
+
+def monday_snapshot(item_name, column_values):
+    """Gesendete Felder → Snapshot-Texte {spalte|"name": text}"""
+    return {"name": str(item_name), **{k: monday_spalten_text(v) for k, v in column_values.items()}}
+
+
+def _monday_post(session, url, timeout, teilweise=False, **kwargs):
+    """
+    POST an die Monday-API → Antwort-JSON; wirft MondayFehler (auch bei GraphQL-Fehlern).
+    teilweise=True: Antworten mit Daten und Fehlern einzelner Aliase zurückgeben.
+    """
+    try:
+        response = session.post(url, timeout=timeout, **kwargs)
+    except Exception as e:
+        raise MondayFehler(f"API Error: {e}") from e
+    if response.status_code != 200:
+        try:
+            warten = float(response.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            warten = None
+        raise MondayFehler(f"HTTP Error: {response.status_code} - {response.text[:200]}",
+                           vorlaeufig=response.status_code == 429 or response.status_code >= 500,
+                           warten=warten)
+    try:
+        data = response.json()
+    except ValueError as e:
+        raise MondayFehler(f"keine JSON-Antwort: {e}") from e
+    if data.get("errors") and not (teilweise and data.get("data")):
+        ext = [err.get("extensions") or {} for err in data["errors"]]
+        codes = {e.get("code", "") for e in ext}
+        warten = max((e.get("retry_in_seconds") or 0 for e in ext), default=0) or None
+        fehler = MondayFehler(f"GraphQL Error: {data['errors']}",
+                              vorlaeufig=bool(codes & MONDAY_FEHLER_VORLAEUFIG), warten=warten)
+        fehler.codes = codes
+        raise fehler
+    return data
+
+
 class MondayIntegration:
     """Verwaltet die Kommunikation mit Monday.com"""
 
-    def __init__(self, api_token: str = None, board_id: str = None):
-        self.api_url = "https://api.monday.com/v2"
-        self.file_api_url = "https://api.monday.com/v2/file"
+    def __init__(self, api_token: str = None, board_id: str = None, api_url: str = None,
+                 session=None, batch: int = MONDAY_BATCH):
+        self.api_url = (api_url or get_monday_api_url()).rstrip("/")
+        self.file_api_url = f"{self.api_url}/file"
+        # session: Standard monday_session(); das requests-Modul selbst → neue Verbindung je Anfrage
+        self.session = session or monday_session()
+        self.batch = max(1, int(batch))
+        self.budget = monday_budget()
 
         if api_token is None or board_id is None:
             default_token, default_board = get_monday_secrets()
@@ -1033,13 +3536,16 @@ class MondayIntegration:
     def is_configured(self) -> bool:
         return bool(self.api_token and self.board_id)
 
-    def create_item(self, item_name: str, column_values: Dict) -> Optional[str]:
+    def create_item(self, item_name: str, column_values: Dict, strikt: bool = False) -> Optional[str]:
         """
         Erstellt ein neues Item in Monday.com.
-        Bei ColumnValueException (z.B. unbekannter Dropdown-Wert) →
-        automatischer Retry ohne die problematische Spalte.
+        Bei ColumnValueException (z.B. unbekannter Dropdown-Wert) oder fehlender
+        Spalte → automatischer Retry ohne Dropdown-, Status- und Projekt-Spalte.
+        strikt=True: Fehler als MondayFehler statt None (Outbox entscheidet über Wiederholung).
         """
         if not self.is_configured():
+            if strikt:
+                raise MondayFehler("API Token oder Board ID fehlt", vorlaeufig=False)
             return None
 
         def _try_create(cv: Dict) -> Optional[str]:
@@ -1058,109 +3564,270 @@ class MondayIntegration:
             }}
             '''
             try:
-                response = requests.post(
-                    self.api_url,
-                    headers=self.headers,
-                    json={"query": query},
-                    timeout=10
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    # Prüfe auf ColumnValueException
-                    if 'errors' in data:
-                        for err in data['errors']:
-                            code = err.get('extensions', {}).get('code', '')
-                            if code == 'ColumnValueException':
-                                return 'COLUMN_ERROR'
-                        print(f"Monday.com GraphQL Error: {data['errors']}")
-                        return None
-                    if 'data' in data and data['data'] and 'create_item' in data['data']:
-                        item = data['data']['create_item']
-                        if item:
-                            return item['id']
-                else:
-                    print(f"Monday.com HTTP Error: {response.status_code}")
-                return None
-            except Exception as e:
-                print(f"Monday.com API Error: {e}")
-                return None
-
-        # Versuch 1: Mit allen Feldern
-        result = _try_create(column_values)
+                data = _monday_post(self.session, self.api_url, 10, headers=self.headers,
+                                    json={"query": query})
+            except MondayFehler as e:
+                # Prüfe auf ColumnValueException / InvalidColumnIdException
+                if getattr(e, "codes", set()) & MONDAY_FEHLER_SPALTEN:
+                    return 'COLUMN_ERROR'
+                raise
+            item = (data.get('data') or {}).get('create_item')
+            if not item:
+                raise MondayFehler(f"Antwort ohne create_item: {str(data)[:200]}", vorlaeufig=False)
+            return item['id']
 
-        # Versuch 2: Bei Dropdown-Fehler → ohne Dropdown-Spalten wiederholen
-        if result == 'COLUMN_ERROR':
-            print("⚠️ ColumnValueException → Retry ohne Dropdown-Spalten")
-            cv_fallback = {k: v for k, v in column_values.items()
-                          if not k.startswith('dropdown_') and not k.startswith('color_')}
-            result = _try_create(cv_fallback)
+        try:
+            # Versuch 1: Mit allen Feldern
+            result = _try_create(column_values)
+
+            # Versuch 2: Bei Dropdown-Fehler → ohne Dropdown-Spalten wiederholen
+            if result == 'COLUMN_ERROR':
+                print("⚠️ ColumnValueException → Retry ohne Dropdown-Spalten")
+                cv_fallback = {k: v for k, v in column_values.items()
+                              if not k.startswith('dropdown_') and not k.startswith('color_')
+                              and k != MONDAY_PROJEKT_SPALTE}
+                result = _try_create(cv_fallback)
+            if result == 'COLUMN_ERROR':
+                raise MondayFehler("ColumnValueException", vorlaeufig=False)
+            return result
+        except MondayFehler as e:
+            if strikt:
+                raise
+            print(f"Monday.com {e}")
+            return None
 
-        return result if result and result != 'COLUMN_ERROR' else None
+    def create_items(self, items) -> list:
+        """
+        Mehrere Items mit wenigen Anfragen anlegen: je self.batch Items eine
+        Mutation mit Aliasen (i0: create_item(…), i1: …) und GraphQL-Variablen,
+        dazu das complexity-Feld für MondayBudget. items: [(item_name, column_values)]
+        → [item_id oder MondayFehler] in gleicher Reihenfolge; schlägt eine ganze
+        Anfrage fehl, erhalten alle ihre Items deren MondayFehler.
+        """
+        if not self.is_configured():
+            raise MondayFehler("API Token oder Board ID fehlt", vorlaeufig=False)
+        return self._batchweise(items, self._create_batch)
 
-    def upload_file_to_item(self, item_id: str, file_bytes: bytes, filename: str,
-                            column_id: str = "file_mkngj4yq") -> bool:
+    def change_items(self, aenderungen) -> list:
         """
-        Lädt eine Datei zu einem Monday Item hoch
+        Spalten bestehender Items ändern (change_multiple_column_values, Batch wie
+        create_items; Spalte "name" = Item-Name). aenderungen: [(item_id, column_values)]
+        → [item_id oder MondayFehler]. Legt nie Items an.
         """
         if not self.is_configured():
-            return False
+            raise MondayFehler("API Token oder Board ID fehlt", vorlaeufig=False)
+        return self._batchweise(aenderungen, self._change_batch)
 
+    def _batchweise(self, eintraege, fn):
+        ergebnis = []
+        for start in range(0, len(eintraege), self.batch):
+            teil = eintraege[start:start + self.batch]
+            try:
+                ergebnis += fn(teil)
+            except MondayFehler as e:
+                ergebnis += [e] * len(teil)
+        return ergebnis
+
+    def _mutation_batch(self, feld, argumente):
+        """
+        Eine Anfrage mit Aliasen: i0: feld(board_id, **argumente[0]) { id }, i1: …
+        plus complexity für MondayBudget. argumente: [{name: (graphql_typ, wert)}]
+        → [(item oder None, {fehlercodes}, [fehler])] je Eintrag
+        """
+        kopf, aufrufe, variables = ["$board: ID!"], [], {"board": str(self.board_id)}
+        for i, args in enumerate(argumente):
+            teile = ["board_id: $board"]
+            for name, (typ, wert) in args.items():
+                kopf.append(f"${name}{i}: {typ}")
+                teile.append(f"{name}: ${name}{i}")
+                variables[f"{name}{i}"] = wert
+            aufrufe.append(f"    i{i}: {feld}({', '.join(teile)}) {{ id }}")
+        query = (f"mutation ({', '.join(kopf)}) {{\n" + "\n".join(aufrufe) +
+                 "\n    complexity { query after reset_in_x_seconds }\n}")
+        self.budget.reservieren(len(argumente))
         try:
-            query = '''
-            mutation ($file: File!, $itemId: ID!, $columnId: String!) {
-                add_file_to_column (
-                    file: $file,
-                    item_id: $itemId,
-                    column_id: $columnId
-                ) {
-                    id
-                    name
-                }
-            }
-            '''
+            data = _monday_post(self.session, self.api_url, 30, teilweise=True,
+                                headers=self.headers, json={"query": query, "variables": variables})
+        except MondayFehler as e:
+            if e.warten:
+                self.budget.sperren(e.warten)
+            raise
+        antwort = data.get("data") or {}
+        self.budget.melden(antwort.get("complexity"), len(argumente))
+        fehler = {}
+        for err in data.get("errors") or []:
+            fehler.setdefault((err.get("path") or [None])[0], []).append(err)
+        ergebnis = []
+        for i in range(len(argumente)):
+            errs = fehler.get(f"i{i}", [])
+            ergebnis.append((antwort.get(f"i{i}"),
+                             {(e.get("extensions") or {}).get("code", "") for e in errs}, errs))
+        return ergebnis
+
+    @staticmethod
+    def _alias_fehler(codes, errs):
+        return MondayFehler(f"GraphQL Error: {errs or 'ohne Ergebnis'}",
+                            vorlaeufig=not errs or bool(codes & MONDAY_FEHLER_VORLAEUFIG))
+
+    def _create_batch(self, teil):
+        ids = []
+        for (name, cv), (item, codes, errs) in zip(teil, self._mutation_batch("create_item", [
+                {"item_name": ("String!", str(name)), "column_values": ("JSON", json.dumps(cv))}
+                for name, cv in teil])):
+            if item:
+                ids.append(item["id"])
+            elif codes & MONDAY_FEHLER_SPALTEN:
+                try:                                    # einzeln, mit Dropdown-Fallback
+                    ids.append(self.create_item(name, cv, strikt=True))
+                except MondayFehler as e:
+                    ids.append(e)
+            else:
+                ids.append(self._alias_fehler(codes, errs))
+        return ids
 
-            variables = {
-                "itemId": int(item_id),
-                "columnId": column_id
-            }
+    def _change_batch(self, teil):
+        return [item["id"] if item else self._alias_fehler(codes, errs)
+                for item, codes, errs in self._mutation_batch("change_multiple_column_values", [
+                    {"item_id": ("ID!", str(item_id)), "column_values": ("JSON!", json.dumps(cv))}
+                    for item_id, cv in teil])]
+
+    def items_seit(self, seit=None, spalten=None, limit=MONDAY_SYNC_SEITE):
+        """
+        Seit `seit` (updated_at, ISO) geänderte Items des Boards, seitenweise über
+        items_page/next_items_page mit Cursor — nie das ganze Board in einer
+        Antwort. Monday filtert per Regel auf __last_updated__, zusätzlich wird
+        lokal gefiltert. spalten: nur diese column_values (Complexity).
+        Generator über Seiten: [{"id", "name", "updated_at", "spalten": {id: text}}]
+        """
+        if not self.is_configured():
+            raise MondayFehler("API Token oder Board ID fehlt", vorlaeufig=False)
+        felder = "cursor items { id name updated_at column_values(ids: $spalten) { id text } }"
+        regeln = [{"column_id": "__last_updated__", "compare_value": ["EXACT", seit],
+                   "operator": "greater_than_or_equals", "compare_attribute": "UPDATED_AT"}] if seit else []
+        query = ("query ($board: [ID!], $limit: Int!, $regeln: [ItemsQueryRule!], $spalten: [String!]) {"
+                 " complexity { query after reset_in_x_seconds }"
+                 " boards(ids: $board) { items_page(limit: $limit, query_params: {rules: $regeln}) { "
+                 f"{felder} }} }} }}")
+        variables = {"board": [str(self.board_id)], "limit": limit, "regeln": regeln,
+                     "spalten": list(spalten) if spalten else None}
+        while True:
+            self.budget.reservieren(0)
+            try:
+                data = _monday_post(self.session, self.api_url, 30, headers=self.headers,
+                                    json={"query": query, "variables": variables})["data"]
+            except MondayFehler as e:
+                if e.warten:
+                    self.budget.sperren(e.warten)
+                raise
+            self.budget.melden(data.get("complexity"), 0)
+            seite = data["next_items_page"] if "next_items_page" in data else \
+                (data.get("boards") or [{}])[0].get("items_page") or {}
+            items = [{"id": str(i["id"]), "name": i["name"], "updated_at": i["updated_at"],
+                      "spalten": {c["id"]: c["text"] or "" for c in i.get("column_values") or []}}
+                     for i in seite.get("items") or [] if not seit or i["updated_at"] >= seit]
+            if items:
+                yield items
+            if not seite.get("cursor"):
+                return
+            query = ("query ($cursor: String!, $limit: Int!, $spalten: [String!]) {"
+                     " complexity { query after reset_in_x_seconds }"
+                     f" next_items_page(cursor: $cursor, limit: $limit) {{ {felder} }} }}")
+            variables = {"cursor": seite["cursor"], "limit": limit, "spalten": variables["spalten"]}
+
+    def items_nach_projekt(self, projekt_ids) -> Dict:
+        """
+        Items, deren MONDAY_PROJEKT_SPALTE eine der projekt_ids enthält
+        (items_page_by_column_values, seitenweise per Cursor) → {projekt_id: item_id}.
+        Findet Items, die Monday trotz Timeout/5xx angelegt hat.
+        """
+        if not self.is_configured():
+            raise MondayFehler("API Token oder Board ID fehlt", vorlaeufig=False)
+        query = ("query ($board: ID!, $limit: Int!, $cursor: String, "
+                 "$werte: [ItemsPageByColumnValuesQuery!], $ids: [String!]) {"
+                 " complexity { query after reset_in_x_seconds }"
+                 " items_page_by_column_values(board_id: $board, limit: $limit, cursor: $cursor,"
+                 " columns: $werte) { cursor items { id column_values(ids: $ids) { id text } } } }")
+        variables = {"board": str(self.board_id), "limit": MONDAY_SYNC_SEITE, "cursor": None,
+                     "werte": [{"column_id": MONDAY_PROJEKT_SPALTE,
+                                "column_values": [str(p) for p in projekt_ids]}],
+                     "ids": [MONDAY_PROJEKT_SPALTE]}
+        gesucht, gefunden = {str(p) for p in projekt_ids}, {}
+        while True:
+            self.budget.reservieren(0)
+            try:
+                data = _monday_post(self.session, self.api_url, 30, headers=self.headers,
+                                    json={"query": query, "variables": variables})["data"]
+            except MondayFehler as e:
+                if e.warten:
+                    self.budget.sperren(e.warten)
+                raise
+            self.budget.melden(data.get("complexity"), 0)
+            seite = data.get("items_page_by_column_values") or {}
+            for item in seite.get("items") or []:
+                pid = next((c["text"] for c in item.get("column_values") or []
+                            if c["id"] == MONDAY_PROJEKT_SPALTE), None)
+                if pid in gesucht:
+                    gefunden.setdefault(pid, str(item["id"]))
+            if not seite.get("cursor"):
+                return gefunden
+            variables = {**variables, "cursor": seite["cursor"], "werte": None}
 
-            map_data = {"image": ["variables.file"]}
+    def upload_file_to_item(self, item_id: str, file_bytes: bytes, filename: str,
+                            column_id: str = "file_mkngj4yq", strikt: bool = False) -> bool:
+        """
+        Lädt eine Datei zu einem Monday Item hoch
+        strikt=True: Fehler als MondayFehler statt False.
+        """
+        if not self.is_configured():
+            if strikt:
+                raise MondayFehler("API Token oder Board ID fehlt", vorlaeufig=False)
+            return False
 
-            files = {
-                'query': (None, query),
-                'variables': (None, json.dumps(variables)),
-                'map': (None, json.dumps(map_data)),
-                'image': (filename, file_bytes, 'application/pdf')
+        query = '''
+        mutation ($file: File!, $itemId: ID!, $columnId: String!) {
+            add_file_to_column (
+                file: $file,
+                item_id: $itemId,
+                column_id: $columnId
+            ) {
+                id
+                name
             }
+        }
+        '''
 
-            upload_headers = {"Authorization": self.api_token}
+        variables = {
+            "itemId": int(item_id),
+            "columnId": column_id
+        }
 
-            response = requests.post(
-                self.file_api_url,
-                headers=upload_headers,
-                files=files,
-                timeout=30
-            )
+        map_data = {"image": ["variables.file"]}
 
-            if response.status_code == 200:
-                data = response.json()
-                if 'data' in data and data['data'] and 'add_file_to_column' in data['data']:
-                    return True
-                elif 'errors' in data:
-                    print(f"Monday.com File Upload Error: {data['errors']}")
-            else:
-                print(f"Monday.com File Upload HTTP Error: {response.status_code} - {response.text}")
+        files = {
+            'query': (None, query),
+            'variables': (None, json.dumps(variables)),
+            'map': (None, json.dumps(map_data)),
+            'image': (filename, file_bytes, 'application/pdf')
+        }
 
-            return False
+        upload_headers = {"Authorization": self.api_token}
 
-        except Exception as e:
-            print(f"Monday.com File Upload Exception: {e}")
+        try:
+            data = _monday_post(self.session, self.file_api_url, 30, headers=upload_headers,
+                                files=files)
+            if not (data.get('data') or {}).get('add_file_to_column'):
+                raise MondayFehler(f"Antwort ohne add_file_to_column: {str(data)[:200]}",
+                                   vorlaeufig=False)
+            return True
+        except MondayFehler as e:
+            if strikt:
+                raise
+            print(f"Monday.com File Upload {e}")
             return False
 
-    def save_quote_to_monday(self, quote_data: Dict, pdf_bytes: bytes = None,
-                             filename: str = None) -> tuple:
+    def quote_spalten(self, quote_data: Dict) -> tuple:
         """
-        Speichert ein Angebot in Monday.com mit PDF.
+        Angebot → (item_name, column_values).
 
         FIX: Korrekte Column-Formate für alle Spaltentypen:
           - date   → {"date": "YYYY-MM-DD"}
@@ -1169,9 +3836,6 @@ class MondayIntegration:
           - status → {"label": "Wert"}         (⚠ war bisher 'status' als Column-ID)
           - text   → plain String
         """
-        if not self.is_configured():
-            return False, ""
-
         column_values = {}
 
         # ── Datum (date) ──
@@ -1208,9 +3872,19 @@ class MondayIntegration:
 
         # Item-Name
         item_name = quote_data.get('angebots_nr', quote_data.get('kunde', 'Neues Angebot'))
+        return item_name, column_values
+
+    def save_quote_to_monday(self, quote_data: Dict, pdf_bytes: bytes = None,
+                             filename: str = None) -> tuple:
+        """
+        Speichert ein Angebot in Monday.com mit PDF (synchron; die Oberfläche
+        nutzt die MondayOutbox). Spalten: siehe quote_spalten().
+        """
+        if not self.is_configured():
+            return False, ""
 
         # Item erstellen
-        item_id = self.create_item(item_name, column_values)
+        item_id = self.create_item(*self.quote_spalten(quote_data))
 
         if not item_id:
             return False, ""
@@ -1246,7 +3920,7 @@ class MondayIntegration:
         """
 
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.api_url,
                 headers=self.headers,
                 json={"query": query},
@@ -1273,7 +3947,7 @@ class MondayIntegration:
         """
 
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.api_url,
                 headers=self.headers,
                 json={"query": query},
@@ -1366,24 +4040,303 @@ API URL: {monday.api_url}
             | Status        | color_mkncgyk5      | status   |
             """)
 
+
+# ── Outbox: Monday-Uploads im Hintergrund ──
+MONDAY_OUTBOX_BASIS_S     = 5       # Wartezeit nach dem 1. Fehler, verdoppelt je Versuch
+MONDAY_OUTBOX_MAX_S       = 900     # Obergrenze der Wartezeit
+MONDAY_OUTBOX_VERSUCHE    = 8       # danach Status 'fehler' (Sidebar: erneut versuchen)
+MONDAY_OUTBOX_LEASE_S     = 300     # Auftrag in Arbeit; danach gilt der Worker als abgestürzt
+MONDAY_OUTBOX_INTERVALL_S = 60      # Ruhezeit ohne fällige Aufträge (Weckruf bei einreihen)
+MONDAY_SYNC_S             = 900     # Board-Abgleich (monday_abgleich) im Worker, None = aus
+MONDAY_SYNC_UEBERLAPPUNG_S = 300    # Abgleich-Stand so weit zurück: während des Laufs geänderte Items
+
+
+class MondayOutbox:
+    """
+    Arbeitet die Monday-Warteschlange (Tabelle monday_outbox) in einem
+    Hintergrund-Thread je Prozess ab — die Oberfläche reiht nur ein und wartet
+    nicht auf Monday. Je Auftrag: Item anlegen (übersprungen, wenn das Projekt
+    schon eine monday_id hat; bei Wiederholungen zuerst über die projekt_id
+    in MONDAY_PROJEKT_SPALTE gesucht), Technikübergabe aus dem Archiv erzeugen und
+    hochladen; Items mehrerer fälliger Aufträge entstehen mit einer
+    Batch-Mutation (create_items). Fehler → exponentielles Backoff mit Jitter; dauerhafte Fehler
+    und Aufträge nach `versuche` Versuchen enden mit Status 'fehler'.
+    client: Fabrik für MondayIntegration (Tests: lokaler Server über api_url),
+    bericht: projekt_id → PDF-Bytes. Alle sync_s Sekunden gleicht der Thread
+    außerdem das Board ab (monday_abgleich, nur wenn konfiguriert).
+    """
+
+    def __init__(self, client=None, bericht=None, basis_s=MONDAY_OUTBOX_BASIS_S,
+                 max_s=MONDAY_OUTBOX_MAX_S, versuche=MONDAY_OUTBOX_VERSUCHE,
+                 lease_s=MONDAY_OUTBOX_LEASE_S, intervall_s=MONDAY_OUTBOX_INTERVALL_S,
+                 batch=MONDAY_BATCH, sync_s=MONDAY_SYNC_S):
+        self.client      = client or MondayIntegration
+        self.bericht     = bericht
+        self.basis_s     = basis_s
+        self.max_s       = max_s
+        self.versuche    = versuche
+        self.lease_s     = lease_s
+        self.intervall_s = intervall_s
+        self.batch       = batch
+        self.sync_s      = sync_s
+        self._sync_um    = time.monotonic() + (sync_s or 0)
+        self._wecker = threading.Event()
+        self._stopp  = threading.Event()
+        self._thread = None
+        self._lock   = threading.Lock()
+
+    def wartezeit(self, versuch, fehler=None):
+        """Backoff vor Versuch versuch+1: basis·2^(versuch−1), gedeckelt, halb zufällig"""
+        import random
+        w = min(self.max_s, self.basis_s * 2 ** (versuch - 1))
+        w = w / 2 + random.uniform(0, w / 2)
+        return max(w, getattr(fehler, "warten", None) or 0)
+
+    def ausfuehren(self, job, mon=None):
+        """Ein übernommener Auftrag → Item (falls noch keins) + Datei; wirft bei Fehlern"""
+        mon = mon or self.client()
+        monday_id = job["monday_id"]
+        if not monday_id:
+            name, spalten = self._item(mon, job)
+            monday_id = mon.create_item(name, spalten, strikt=True)
+            db_outbox_item(job["projekt_id"], monday_id, monday_snapshot(name, spalten))
+        if job["dateiname"]:
+            pdf = (self.bericht or archiv_uebergabe_pdf)(job["projekt_id"])
+            mon.upload_file_to_item(monday_id, pdf, job["dateiname"], strikt=True)
+        return monday_id
+
+    @staticmethod
+    def _item(mon, job):
+        """(item_name, column_values) eines Auftrags, projekt_id in MONDAY_PROJEKT_SPALTE"""
+        name, spalten = mon.quote_spalten(job["daten"])
+        return name, {**spalten, MONDAY_PROJEKT_SPALTE: str(job["projekt_id"])}
+
+    def _wiederfinden(self, mon, jobs):
+        """
+        Wiederholte Aufträge ohne monday_id: ein früherer Versuch kann das Item
+        trotz Timeout/5xx/Absturz angelegt haben → per projekt_id suchen und
+        übernehmen statt ein zweites anzulegen. → {projekt_id: Fehler}
+        """
+        offen = {j["projekt_id"]: j for j in jobs if not j["monday_id"] and j["versuche"] > 1}
+        if not offen:
+            return {}
+        try:
+            gefunden = mon.items_nach_projekt(list(offen))
+        except MondayFehler as e:                   # ohne Suche nicht anlegen
+            return {pid: e for pid in offen}
+        for pid, item_id in gefunden.items():
+            db_outbox_item(pid, item_id, monday_snapshot(*self._item(mon, offen[pid])))
+            offen[pid]["monday_id"] = item_id
+        return {}
+
+    def _items_anlegen(self, mon, jobs):
+        """Items aller Aufträge ohne monday_id per Batch-Mutation anlegen → {projekt_id: Fehler}"""
+        neu = [j for j in jobs if not j["monday_id"]]
+        if len(neu) < 2:
+            return {}
+        fehler = {}
+        items = [self._item(mon, j) for j in neu]
+        for job, item, item_id in zip(neu, items, mon.create_items(items)):
+            if isinstance(item_id, Exception):
+                fehler[job["projekt_id"]] = item_id
+            else:
+                db_outbox_item(job["projekt_id"], item_id, monday_snapshot(*item))
+                job["monday_id"] = item_id
+        return fehler
+
+    def abarbeiten(self, limit=None):
+        """
+        Fällige Aufträge abarbeiten (auch synchron: CLI, Tests) → Anzahl. Je Runde
+        bis zu `batch` Aufträge: Items gemeinsam anlegen, Dateien einzeln hochladen.
+        Vor jedem Auftrag wird dessen Lease erneuert; ist sie inzwischen an einen
+        anderen Worker gegangen, wird der Auftrag hier übersprungen.
+        """
+        n = 0
+        while (limit is None or n < limit) and not self._stopp.is_set():
+            jobs = db_outbox_uebernehmen(self.lease_s,
+                                         self.batch if limit is None else min(self.batch, limit - n))
+            if not jobs:
+                break
+            n += len(jobs)
+            mon = self.client()
+            try:
+                fehler = self._wiederfinden(mon, jobs)
+                fehler.update(self._items_anlegen(mon, [j for j in jobs if j["projekt_id"] not in fehler]))
+            except MondayFehler as e:                  # z. B. nicht konfiguriert
+                fehler = {j["projekt_id"]: e for j in jobs}
+            for job in jobs:
+                try:
+                    if job["projekt_id"] in fehler:
+                        raise fehler[job["projekt_id"]]
+                    if not db_outbox_verlaengern(job, self.lease_s):
+                        continue
+                    self.ausfuehren(job, mon)
+                    db_outbox_ergebnis(job["projekt_id"], "fertig")
+                except Exception as e:
+                    text = f"{type(e).__name__}: {e}"[:500]
+                    # Monday: laut Fehlerart; DB gesperrt / Netz: vorübergehend; sonst (z. B.
+                    # Projekt ohne Zonendaten → kein PDF) dauerhaft
+                    vorlaeufig = (e.vorlaeufig if isinstance(e, MondayFehler)
+                                  else isinstance(e, (sqlite3.Error, OSError)))
+                    if vorlaeufig and job["versuche"] < self.versuche:
+                        db_outbox_ergebnis(job["projekt_id"], "offen",
+                                           time.time() + self.wartezeit(job["versuche"], e), text)
+                    else:
+                        db_outbox_ergebnis(job["projekt_id"], "fehler", fehler=text)
+        return n
+
+    def _abgleichen(self):
+        """Board-Abgleich, wenn fällig → Sekunden bis zum nächsten"""
+        if not self.sync_s:
+            return None
+        if time.monotonic() >= self._sync_um:
+            self._sync_um = time.monotonic() + self.sync_s
+            mon = self.client()
+            if mon.is_configured():
+                try:
+                    monday_abgleich(mon)
+                except Exception as e:
+                    print(f"Monday-Abgleich: {e}")
+        return self._sync_um - time.monotonic()
+
+    def _schleife(self):
+        while not self._stopp.is_set():
+            try:
+                self.abarbeiten()
+                naechster = db_outbox_naechster()
+            except Exception as e:                 # DB gesperrt o. ä. → später erneut
+                print(f"Monday-Outbox: {e}")
+                naechster = time.time() + self.basis_s
+            warten = self.intervall_s if naechster is None else naechster - time.time()
+            sync = self._abgleichen()
+            if sync is not None:
+                warten = min(warten, sync)
+            self._wecker.wait(min(max(warten, 0.05), self.intervall_s))
+            self._wecker.clear()
+
+    def starten(self):
+        """Hintergrund-Thread starten (idempotent)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopp.clear()
+                self._thread = threading.Thread(target=self._schleife, name="monday-outbox",
+                                                daemon=True)
+                self._thread.start()
+        return self
+
+    def wecken(self):
+        """Neuer Auftrag → sofort abarbeiten statt Ruhezeit abzuwarten"""
+        self._wecker.set()
+
+    def stoppen(self, timeout=None):
+        """Thread nach dem laufenden Auftrag beenden (nicht übernommene bleiben offen)"""
+        self._stopp.set()
+        self._wecker.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def monday_outbox():
+    """Prozessweiter Outbox-Worker (gestartet beim ersten Aufruf)"""
+    return prozess_ressource("monday_outbox", MondayOutbox).starten()
+
+
+def monday_abgleich(mon=None):
+    """
+    Inkrementeller Abgleich Board ↔ Projektdatenbank, legt nie Items an.
+    Pull: seit dem letzten Stand geänderte Items, seitenweise per Cursor →
+    Status (MONDAY_STATUS_SPALTE) und Änderungszeit der verknüpften Projekte,
+    Snapshot je Item. Push: von coolMATH gepflegte Felder (MONDAY_SYNC_SPALTEN)
+    nur, wo der Sollstand aus dem Projektkopf vom Snapshot abweicht — im Batch
+    (change_multiple_column_values); Items ohne Snapshot bleiben unberührt.
+    Der Stand wird erst nach vollständigem Lesen fortgeschrieben, mit
+    MONDAY_SYNC_UEBERLAPPUNG_S Sicherheitsabstand (Wiederholungen sind harmlos).
+    → {"gelesen", "aktualisiert", "gesendet", "fehler": [text]}
+    """
+    mon = mon or MondayIntegration()
+    start = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - MONDAY_SYNC_UEBERLAPPUNG_S))
+    seit = db_sync_stand(mon.board_id)
+    spalten = [MONDAY_STATUS_SPALTE] + [s for s in MONDAY_SYNC_SPALTEN if s != "name"]
+    gelesen = aktualisiert = 0
+    neuester = None
+    for seite in mon.items_seit(seit, spalten):
+        aktualisiert += db_sync_uebernehmen(
+            [(i["id"], {"name": i["name"], **i["spalten"]}, i["spalten"].get(MONDAY_STATUS_SPALTE),
+              i["updated_at"]) for i in seite])
+        gelesen += len(seite)
+        neuester = max([neuester or ""] + [i["updated_at"] for i in seite])
+    if neuester:
+        db_sync_stand_setzen(mon.board_id, min(neuester, start))
+
+    aenderungen = []
+    for pid, monday_id, kunde, created_at, snapshot in db_sync_verknuepft():
+        name, werte = mon.quote_spalten({"kunde": kunde, "datum": str(created_at or "")[:10]})
+        soll = {"name": name, **werte}
+        if not created_at:
+            soll.pop("date_mknqdvj8", None)
+        diff = {k: soll[k] for k in MONDAY_SYNC_SPALTEN
+                if soll.get(k) and monday_spalten_text(soll[k]) != snapshot.get(k)}
+        if diff:
+            aenderungen.append((monday_id, diff))
+    fehler = []
+    for (monday_id, diff), ergebnis in zip(aenderungen, mon.change_items(aenderungen)):
+        if isinstance(ergebnis, Exception):
+            fehler.append(f"{monday_id}: {ergebnis}")
+        else:
+            db_snapshot_setzen(monday_id, {k: monday_spalten_text(v) for k, v in diff.items()})
+    return {"gelesen": gelesen, "aktualisiert": aktualisiert,
+            "gesendet": len(aenderungen) - len(fehler), "fehler": fehler}
+
+
+def monday_outbox_text(status):
+    """Auftragsstatus (db_outbox_status) → Anzeigetext"""
+    if status is None:
+        return ""
+    if status["status"] == "fertig":
+        return f"✅ Übertragen — Monday-Item {status['monday_id']}"
+    if status["status"] == "fehler":
+        return f"❌ Fehlgeschlagen nach {status['versuche']} Versuch(en): {status['fehler']}"
+    if status["status"] == "laeuft":
+        return f"📤 Wird übertragen … (Versuch {status['versuche']})"
+    if status["versuche"]:
+        return (f"⏳ Versuch {status['versuche']} fehlgeschlagen, nächster in "
+                f"{max(status['faellig'] - time.time(), 0):.0f} s — {status['fehler']}")
+    return "⏳ In der Warteschlange"
+
 # ==========================================
 # 7. PDF ENGINE — reportlab
 # ==========================================
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.units import mm
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer, Table,
-                                 TableStyle, PageBreak, Image as RLImage, HRFlowable)
-from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
-import io as _io
+_PDF_ENGINE_GELADEN = False
+
+
+def _pdf_engine_laden():
+    """
+    reportlab (platypus, Styles, Farben) erst beim ersten PDF-Export laden.
+    Setzt die Modul-Globals, die alle PDF-Hilfsfunktionen verwenden.
+    """
+    global _PDF_ENGINE_GELADEN, A4, colors, mm, getSampleStyleSheet, ParagraphStyle
+    global SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, RLImage, HRFlowable
+    global TA_LEFT, TA_CENTER, TA_RIGHT, _BLUE, _DARK, _GREEN, _LGRAY, _WHITE, _A4W, _A4H, _S
+    if _PDF_ENGINE_GELADEN:
+        return
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.units import mm
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer, Table,
+                                     TableStyle, PageBreak, Image as RLImage, HRFlowable)
+    from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
+
+    _BLUE  = colors.HexColor('#36A9E1')
+    _DARK  = colors.HexColor('#3C3C3B')
+    _GREEN = colors.HexColor('#1b5e20')
+    _LGRAY = colors.HexColor('#F4F4F4')
+    _WHITE = colors.white
+    _A4W, _A4H = A4
+    _S = _make_styles()
+    _PDF_ENGINE_GELADEN = True
 
-_BLUE  = colors.HexColor('#36A9E1')
-_DARK  = colors.HexColor('#3C3C3B')
-_GREEN = colors.HexColor('#1b5e20')
-_LGRAY = colors.HexColor('#F4F4F4')
-_WHITE = colors.white
-_A4W, _A4H = A4
+import io as _io
 
 def _make_styles():
     return {
@@ -1406,7 +4359,6 @@ def _make_styles():
                                        alignment=TA_CENTER),
     }
 
-_S = _make_styles()
 
 
 _COPYRIGHT = "© 2026 °coolsulting — Michael Schäpers | coolMATH Pro 4.76.5"
@@ -1485,9 +4437,14 @@ def _section_hdr(title, subtitle=''):
     items.append(Spacer(1, 3*mm))
     return items
 
-def _chart(img_bytes, width=165*mm):
-    if not img_bytes:
+def _chart(img_bytes, width=None):
+    """PNG-Bytes (Breite skaliert) oder fertige Vektorgrafik (Drawing) → Story-Elemente"""
+    if img_bytes is None or (isinstance(img_bytes, bytes) and not img_bytes):
         return []
+    if not isinstance(img_bytes, (bytes, bytearray)):
+        return [img_bytes, Spacer(1, 4*mm)]
+    if width is None:
+        width = 165*mm
     try:
         img = RLImage(_io.BytesIO(img_bytes), width=width, height=width*0.44)
         return [img, Spacer(1, 4*mm)]
@@ -1638,9 +4595,8 @@ def _make_cover(story, proj, kunde, bearbeiter, firma,
 
 
 def _eingabe_tabelle(story, room_inputs, zone_names):
-    """Eingabedaten pro Raum als Tabelle"""
+    """Eingabedaten pro Raum als Tabelle (je 5 Zonen nebeneinander)"""
     story += _section_hdr('Eingabedaten', 'Raumparameter je Zone')
-    hdr = ['Parameter', 'Zone 1', 'Zone 2', 'Zone 3', 'Zone 4', 'Zone 5']
     params = [
         ('Bezeichnung',    'name',        lambda v: str(v)),
         ('Fläche [m²]',    'flaeche',     lambda v: f'{v:.1f}' if isinstance(v,(int,float)) else str(v)),
@@ -1651,28 +4607,30 @@ def _eingabe_tabelle(story, room_inputs, zone_names):
         ('Nutzung',        'nutzung',     lambda v: str(v)),
         ('U-Wert [W/m²K]', 'u_wert',      lambda v: f'{v:.2f}' if isinstance(v,(int,float)) else str(v)),
     ]
-    rows = [hdr]
-    for param_label, key, fmt in params:
-        row = [param_label]
-        for zi in range(5):
-            ri = room_inputs[zi] if isinstance(room_inputs, list) and zi < len(room_inputs) else {}
-            val = ri.get(key, '—') if isinstance(ri, dict) else '—'
-            try:
-                row.append(fmt(val))
-            except Exception:
-                row.append(str(val))
-        rows.append(row)
-    widths = [38*mm, 25*mm, 25*mm, 25*mm, 25*mm, 25*mm]
-    t = Table(rows, colWidths=widths, repeatRows=1)
-    t.setStyle(_tbl_style_fn(total_row=False))
-    story += [t, Spacer(1, 5*mm)]
+    for start in range(0, len(zone_names), 5):
+        block = range(start, min(len(zone_names), start + 5))
+        rows = [['Parameter'] + [f'Zone {zi+1}' for zi in block]]
+        for param_label, key, fmt in params:
+            row = [param_label]
+            for zi in block:
+                ri = room_inputs[zi] if isinstance(room_inputs, list) and zi < len(room_inputs) else {}
+                val = ri.get(key, '—') if isinstance(ri, dict) else '—'
+                try:
+                    row.append(fmt(val))
+                except Exception:
+                    row.append(str(val))
+            rows.append(row)
+        widths = [38*mm] + [25*mm] * len(block)
+        t = Table(rows, colWidths=widths, repeatRows=1)
+        t.setStyle(_tbl_style_fn(total_row=False))
+        story += [t, Spacer(1, 5*mm)]
 
 
 def _geraete_tabelle(story, room_results, selected_hw, selected_hw_ag, zone_names, 
                      show_prices=True, show_artnr=True, selected_ig_artnr=None):
     """IG + AG Gerätetabelle - AUFGETEILT IN ZWEI SEPARATE TABELLEN"""
     if selected_ig_artnr is None:
-        selected_ig_artnr = ['—'] * 5
+        selected_ig_artnr = ['—'] * len(zone_names)
     
     # ===== TABELLE 1: INNENGERÄTE =====
     story += _section_hdr('Innengeräte', 'Übersicht Innengeräte je Zone')
@@ -1685,13 +4643,12 @@ def _geraete_tabelle(story, room_results, selected_hw, selected_hw_ag, zone_name
         widths_ig = [50*mm, 35*mm, 65*mm]
     
     rows_ig = [hdr_ig]
-    for zi in range(5):
+    for zi in range(len(zone_names)):
         ig_kw = selected_hw[zi] if zi < len(selected_hw) else 0
         ig_artnr = selected_ig_artnr[zi] if zi < len(selected_ig_artnr) else '—'
         zone_n = zone_names[zi] if zi < len(zone_names) else f'Zone {zi+1}'
         
-        # IG-Preis (TODO: aus Daten holen wenn verfügbar)
-        ig_preis_str = '—'
+        ig_preis_str = katalog_preis_text(ig_artnr)
         
         if show_prices:
             rows_ig.append([zone_n, f'{ig_kw:.1f} kW' if ig_kw else 'N.V.', 
@@ -1714,21 +4671,15 @@ def _geraete_tabelle(story, room_results, selected_hw, selected_hw_ag, zone_name
         widths_ag = [50*mm, 35*mm, 65*mm]
     
     rows_ag = [hdr_ag]
-    for zi in range(5):
+    for zi in range(len(zone_names)):
         ag_inf = selected_hw_ag[zi] if zi < len(selected_hw_ag) else ('—', 0, 'N.V.')
         ag_typ = ag_inf[0] if isinstance(ag_inf,(list,tuple)) and len(ag_inf)>0 else '—'
         ag_kw = ag_inf[1] if isinstance(ag_inf,(list,tuple)) and len(ag_inf)>1 else 0
         ag_artnr = ag_inf[2] if isinstance(ag_inf,(list,tuple)) and len(ag_inf)>2 else 'N.V.'
         zone_n = zone_names[zi] if zi < len(zone_names) else f'Zone {zi+1}'
         
-        # AG-Preis ermitteln
-        ag_preis_str = '—'
-        if ag_kw and ag_kw > 0 and ag_typ == 'FJM':
-            try:
-                if ag_kw in FJM_AG_PRICES:
-                    ag_preis_str = f"{fmt_number(FJM_AG_PRICES[ag_kw]['preis'])} EUR"
-            except Exception:
-                pass
+        # AG-Preis aus dem Katalog (FJM + RAC)
+        ag_preis_str = katalog_preis_text(ag_artnr) if ag_kw else '—'
         
         if show_prices:
             rows_ag.append([zone_n, ag_typ, f'{ag_kw:.1f} kW' if ag_kw else 'N.V.', 
@@ -1742,16 +4693,45 @@ def _geraete_tabelle(story, room_results, selected_hw, selected_hw_ag, zone_name
 
 
 
-def make_pdf_chart(profiles, total, title, mode_key, hours=HOURS):
+def _pyplot():
+    """matplotlib (Agg-Backend, kein Display nötig) erst beim ersten PDF-Chart laden"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+PDF_LEGENDE_ZONEN = 10  # Zonen mit eigenem Legendeneintrag, weitere als graue Schar
+DIAGRAMM_DPI      = 150
+PDF_ZONEN_FARBEN  = ['#36A9E1', '#E74C3C', '#2ECC71', '#F39C12', '#9B59B6']
+PDF_REST_FARBE    = '#9AA5B1'
+# Methodenvergleich: (Legende, Methode, Farbe, Linienbreite [pt], Linienstil)
+PDF_METHODEN_STIL = [
+    ("VDI NEU (VDI 6007)",  "VDI_N", '#36A9E1', 3.5, '-'),
+    ("VDI ALT (2078-1996)", "VDI_A", '#F39C12', 2.0, '--'),
+    ("Recknagel",           "RECK",  '#3C3C3B', 2.0, ':'),
+    ("Praktiker",           "PRAK",  '#E74C3C', 2.5, '-.'),
+    ("Kaltluftsee",         "KLTS",  '#9B59B6', 2.0, '--'),
+    ("KI-Hybrid",           "KI",    '#1ABC9C', 2.5, '-'),
+]
+
+
+def make_pdf_chart(profiles, total, title, mode_key, hours=HOURS, dpi=DIAGRAMM_DPI):
     """Erstellt Matplotlib-Chart für PDF-Export"""
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=(10, 4.5))
     fig.patch.set_facecolor('white')
     ax.set_facecolor('#fafafa')
     
-    colors = ['#36A9E1', '#E74C3C', '#2ECC71', '#F39C12', '#9B59B6']
-    for idx, p in enumerate(profiles):
-        ax.plot(hours, p[mode_key], alpha=0.6, linewidth=1.5, 
-                label=p["name"], color=colors[idx % len(colors)], linestyle='--')
+    for idx, p in enumerate(profiles[:PDF_LEGENDE_ZONEN]):
+        ax.plot(hours, p[mode_key], alpha=0.6, linewidth=1.5, label=p["name"],
+                color=PDF_ZONEN_FARBEN[idx % len(PDF_ZONEN_FARBEN)], linestyle='--')
+    rest = profiles[PDF_LEGENDE_ZONEN:]
+    if rest:
+        # ein plot()-Aufruf für alle übrigen Zonen, ein gemeinsamer Legendeneintrag
+        linien = ax.plot(hours, np.array([p[mode_key] for p in rest]).T, alpha=0.35,
+                         linewidth=0.8, color=PDF_REST_FARBE, linestyle='--')
+        linien[0].set_label(f'+ {len(rest)} weitere Zonen')
     
     ax.plot(hours, total, color='#3C3C3B', linewidth=3.5, label='GESAMT SIMULTAN', zorder=5)
     
@@ -1763,36 +4743,19 @@ def make_pdf_chart(profiles, total, title, mode_key, hours=HOURS):
     ax.set_xlim(0, 23)
     
     buf = io.BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight', dpi=150)
+    plt.savefig(buf, format='png', bbox_inches='tight', dpi=dpi)
     plt.close(fig)
     return buf.getvalue()
 
 
-def make_comparison_chart(g_sums, hours=HOURS):
+def make_comparison_chart(g_sums, hours=HOURS, dpi=DIAGRAMM_DPI):
     """Erstellt Vergleichs-Chart aller Methoden für PDF"""
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=(10, 5))
     fig.patch.set_facecolor('white')
     ax.set_facecolor('#fafafa')
     
-    method_colors = {
-        "VDI NEU (VDI 6007)": ('#36A9E1', 3.5, '-'),
-        "VDI ALT (2078-1996)": ('#F39C12', 2.0, '--'),
-        "Recknagel":           ('#3C3C3B', 2.0, ':'),
-        "Praktiker":           ('#E74C3C', 2.5, '-.'),
-        "Kaltluftsee":         ('#9B59B6', 2.0, '--'),
-        "KI-Hybrid":           ('#1ABC9C', 2.5, '-'),
-    }
-    key_map = {
-        "VDI NEU (VDI 6007)": "VDI_N",
-        "VDI ALT (2078-1996)": "VDI_A",
-        "Recknagel":           "RECK",
-        "Praktiker":           "PRAK",
-        "Kaltluftsee":         "KLTS",
-        "KI-Hybrid":           "KI",
-    }
-    
-    for name, (color, lw, ls) in method_colors.items():
-        key = key_map[name]
+    for name, key, color, lw, ls in PDF_METHODEN_STIL:
         ax.plot(hours, g_sums[key], color=color, linewidth=lw, linestyle=ls, label=name)
     
     ax.set_title('METHODENVERGLEICH - SIMULTAN-TRENDKURVEN', fontweight='bold', 
@@ -1804,17 +4767,299 @@ def make_comparison_chart(g_sums, hours=HOURS):
     ax.set_xlim(0, 23)
     
     buf = io.BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight', dpi=150)
+    plt.savefig(buf, format='png', bbox_inches='tight', dpi=dpi)
     plt.close(fig)
     return buf.getvalue()
 
 
+# --- Diagramm-Rendering im Prozess-Pool ---
+# Matplotlib ist nicht thread-sicher → je Diagramm ein Job in einem eigenen Prozess.
+# Start per 'spawn' (kein fork aus dem mehrthreadigen Streamlit-Server); der Pool
+# bleibt prozessweit bestehen, damit matplotlib je Worker nur einmal geladen wird.
+DIAGRAMM_WORKERS = min(4, os.cpu_count() or 1)
+
+PDF_DIAGRAMME = [
+    ('VDI 6007 Neu',   'vdi_n', 'VDI_N'),
+    ('VDI 2078 Alt',   'vdi_a', 'VDI_A'),
+    ('Praktiker',      'prak',  'PRAK'),
+    ('Recknagel',      'reck',  'RECK'),
+    ('Kaltluftsee',    'klts',  'KLTS'),
+    ('KI-Hybrid',      'ki',    'KI'),
+]
+
+
+class BerichtAbgebrochen(Exception):
+    """Berichtserstellung wurde vor Abschluss der Diagramme abgebrochen"""
+
+
+def diagramm_jobs(individual_profiles, g_sums, vergleich=False, dpi=DIAGRAMM_DPI):
+    """
+    Jobs für alle PDF-Diagramme eines Berichts: [(art, args, dpi), ...] in
+    Berichtsreihenfolge. Je Job nur die benötigten Kurven (kleines Pickle, kurzer Hash).
+    """
+    jobs = []
+    for title, mode_key, sum_key in PDF_DIAGRAMME:
+        profile = [{"name": p["name"], mode_key: np.asarray(p[mode_key], dtype=float)}
+                   for p in individual_profiles]
+        jobs.append(("zonen", (profile, np.asarray(g_sums[sum_key], dtype=float), title, mode_key), dpi))
+    if vergleich:
+        jobs.append(("vergleich", ({k: np.asarray(g_sums[k], dtype=float) for k in METHODEN_KEYS},), dpi))
+    return jobs
+
+
+def diagramm_schluessel(job):
+    """
+    Inhaltsadresse eines Diagramms: SHA-256 über Art, dpi, Titel, mode_key,
+    Zonennamen und die Kurven-Bytes — gleiche Daten → gleiches PNG.
+    """
+    import hashlib
+    h = hashlib.sha256()
+
+    def einspeisen(x):
+        if isinstance(x, np.ndarray):
+            h.update(f"a{x.dtype}{x.shape}".encode())
+            h.update(np.ascontiguousarray(x).tobytes())
+        elif isinstance(x, dict):
+            h.update(b"{")
+            for k in sorted(x):
+                einspeisen(k)
+                einspeisen(x[k])
+            h.update(b"}")
+        elif isinstance(x, (list, tuple)):
+            h.update(f"[{len(x)}".encode())
+            for v in x:
+                einspeisen(v)
+        else:
+            h.update(f"{type(x).__name__}:{x!r};".encode())
+
+    art, args, dpi = job
+    einspeisen((art, dpi, args))
+    return h.hexdigest()
+
+
+def _diagramm_job(job):
+    """Worker: ein Diagramm als PNG-Bytes"""
+    art, args, dpi = job
+    if art == "vergleich":
+        return make_comparison_chart(*args, dpi=dpi)
+    return make_pdf_chart(*args, dpi=dpi)
+
+
+def _diagramm_pool():
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+    return prozess_ressource("diagramm_pool", lambda: ProcessPoolExecutor(
+        max_workers=DIAGRAMM_WORKERS, mp_context=multiprocessing.get_context("spawn")))
+
+
+def _worker_fn(name):
+    """
+    Modulfunktion 'name' über den importierbaren Modulnamen: unter Streamlit läuft
+    das Skript als '__main__', Spawn-Worker müssen die Funktion aber importieren können.
+    """
+    if __name__ != "__main__":
+        return globals()[name]
+    import importlib
+    modul_dir = os.path.dirname(os.path.abspath(__file__))
+    if modul_dir not in sys.path:
+        sys.path.insert(0, modul_dir)
+    return getattr(importlib.import_module(os.path.splitext(os.path.basename(__file__))[0]), name)
+
+
+@gemessen
+def render_diagramme(jobs, workers=None, progress=None, abbrechen=None, cache=True):
+    """
+    Rendert alle Diagramm-Jobs parallel → Liste PNG-Bytes in Job-Reihenfolge.
+    Bereits gerenderte Diagramme kommen aus diagramm_cache() (Inhaltsadresse),
+    nur fehlende gehen an den Pool. workers=1 → seriell im aufrufenden Thread.
+    progress(fertig, gesamt) nach jedem Diagramm; liefert abbrechen() True, werden
+    offene Jobs storniert und BerichtAbgebrochen ausgelöst. Ist kein Pool
+    verfügbar, wird seriell gerendert.
+    """
+    from concurrent.futures import FIRST_COMPLETED, wait
+    from concurrent.futures.process import BrokenProcessPool
+    total = len(jobs)
+    workers = DIAGRAMM_WORKERS if workers is None else workers
+    speicher = diagramm_cache() if cache else None
+    if speicher is not None:
+        schluessel = [diagramm_schluessel(j) for j in jobs]
+        ergebnisse = [speicher.get(k) for k in schluessel]
+    else:
+        schluessel, ergebnisse = [None] * total, [None] * total
+    fehlend = [i for i, e in enumerate(ergebnisse) if e is None]
+    gemeldet = [-1]
+
+    def melden(fertig):
+        if progress and fertig != gemeldet[0]:
+            gemeldet[0] = fertig
+            progress(fertig, total)
+        if abbrechen and abbrechen():
+            raise BerichtAbgebrochen(f"Abbruch nach {fertig}/{total} Diagrammen")
+
+    def ablegen(i, png):
+        ergebnisse[i] = png
+        if speicher is not None:
+            speicher.put(schluessel[i], png)
+
+    if workers <= 1 or len(fehlend) <= 1:
+        for n, i in enumerate(fehlend):
+            melden(total - len(fehlend) + n)
+            ablegen(i, _diagramm_job(jobs[i]))
+        melden(total)
+        return ergebnisse
+
+    try:
+        pool = _diagramm_pool()
+        fn = _worker_fn("_diagramm_job")
+        futures = {pool.submit(fn, jobs[i]): i for i in fehlend}
+    except (OSError, RuntimeError, BrokenProcessPool):
+        _prozess_ressourcen().pop("diagramm_pool", None)
+        return render_diagramme(jobs, workers=1, progress=progress, abbrechen=abbrechen, cache=cache)
+
+    offen = set(futures)
+    try:
+        melden(total - len(offen))
+        while offen:
+            fertig, offen = wait(offen, timeout=0.2, return_when=FIRST_COMPLETED)
+            for f in fertig:
+                ablegen(futures[f], f.result())
+            melden(total - len(offen))
+    except BrokenProcessPool:
+        _prozess_ressourcen().pop("diagramm_pool", None)
+        raise
+    finally:
+        # Abbruch/Fehler (auch Streamlit-Rerun): noch nicht gestartete Jobs verwerfen
+        for f in offen:
+            f.cancel()
+    return ergebnisse
+
+
+# --- Vektor-Diagramme: 24h-Kurven direkt als ReportLab-Grafik (ohne Matplotlib) ---
+PDF_DIAGRAMM_SEITENVERHAELTNIS = 0.44          # wie _chart() für PNG
+_PDF_STRICHE = {'-': None, '--': [4, 2], ':': [1, 2], '-.': [4, 2, 1, 2]}
+_PDF_LINIEN_SKALA = 0.6                          # Matplotlib-pt (10-Zoll-Figur) → Berichtsbreite
+
+
+def _achsen_teilung(y_max, schritte=5):
+    """'Runde' y-Teilung wie Matplotlib: Schritt aus 1/2/2.5/5 × 10^n → (schritt, oben)"""
+    roh = max(float(y_max), 1.0) / schritte
+    basis = 10 ** np.floor(np.log10(roh))
+    schritt = next(f * basis for f in (1, 2, 2.5, 5, 10) if f * basis >= roh)
+    return schritt, schritt * np.ceil(max(float(y_max), 1.0) * 1.05 / schritt)
+
+
+def _vektor_diagramm(kurven, titel, x_label, breite, legende_spalten=3):
+    """
+    Liniendiagramm 0–23 h als reportlab Drawing.
+    kurven: [(werte, farbe, linienbreite_pt, stil, deckkraft, legende|None), ...]
+    in Zeichenreihenfolge (letzte Kurve oben).
+    """
+    from reportlab.graphics.shapes import Drawing, Group, Line, PolyLine, Rect, String
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    hoehe = breite * PDF_DIAGRAMM_SEITENVERHAELTNIS
+    links, rechts, unten, oben = 38, 6, 24, 16
+    pw, ph = breite - links - rechts, hoehe - unten - oben
+    dunkel, grau = colors.HexColor('#3C3C3B'), colors.HexColor('#B0B0B0')
+
+    schritt, y_max = _achsen_teilung(max(float(np.max(k[0])) for k in kurven))
+    x = lambda h: links + pw * h / 23.0
+    y = lambda w: unten + ph * w / y_max
+
+    d = Drawing(breite, hoehe)
+    d.add(Rect(links, unten, pw, ph, fillColor=colors.HexColor('#fafafa'),
+               strokeColor=grau, strokeWidth=0.5))
+    for h in range(0, 24, 5):
+        d.add(Line(x(h), unten, x(h), unten + ph, strokeColor=grau, strokeWidth=0.3,
+                   strokeDashArray=[1, 2]))
+        d.add(String(x(h), unten - 8, str(h), fontName='Helvetica', fontSize=6,
+                     fillColor=dunkel, textAnchor='middle'))
+    for w in np.arange(0, y_max + schritt / 2, schritt):
+        d.add(Line(links, y(w), links + pw, y(w), strokeColor=grau, strokeWidth=0.3,
+                   strokeDashArray=[1, 2]))
+        d.add(String(links - 3, y(w) - 2, fmt_number(w), fontName='Helvetica', fontSize=6,
+                     fillColor=dunkel, textAnchor='end'))
+
+    for werte, farbe, lw, stil, deckkraft, _ in kurven:
+        punkte = [v for h, w in enumerate(werte) for v in (x(h), y(float(w)))]
+        d.add(PolyLine(punkte, strokeColor=colors.HexColor(farbe), strokeWidth=lw * _PDF_LINIEN_SKALA,
+                       strokeDashArray=_PDF_STRICHE[stil], strokeOpacity=deckkraft,
+                       strokeLineJoin=1, strokeLineCap=1))
+
+    d.add(String(links + pw / 2, hoehe - 11, titel, fontName='Helvetica-Bold', fontSize=8.5,
+                 fillColor=dunkel, textAnchor='middle'))
+    d.add(String(links + pw / 2, 4, x_label, fontName='Helvetica', fontSize=6.5,
+                 fillColor=dunkel, textAnchor='middle'))
+    y_titel = Group(String(0, 0, 'Kühllast [W]', fontName='Helvetica', fontSize=6.5,
+                           fillColor=dunkel, textAnchor='middle'))
+    y_titel.transform = (0, 1, -1, 0, 8, unten + ph / 2)
+    d.add(y_titel)
+
+    # Legende oben links im Diagramm (wie loc='upper left')
+    eintraege = [k for k in kurven if k[5]]
+    if eintraege:
+        spalten = min(legende_spalten, len(eintraege))
+        zeilen = -(-len(eintraege) // spalten)
+        sw = max(stringWidth(k[5], 'Helvetica', 5.5) for k in eintraege) + 22
+        lx, ly = links + 4, unten + ph - 4 - zeilen * 8 - 2
+        d.add(Rect(lx, ly, spalten * sw + 2, zeilen * 8 + 3, fillColor=colors.white,
+                   fillOpacity=0.85, strokeColor=colors.HexColor('#DDDDDD'), strokeWidth=0.4))
+        for n, (_, farbe, lw, stil, deckkraft, label) in enumerate(eintraege):
+            ex = lx + 3 + (n % spalten) * sw
+            ey = ly + zeilen * 8 - 4 - (n // spalten) * 8
+            d.add(Line(ex, ey + 2, ex + 14, ey + 2, strokeColor=colors.HexColor(farbe),
+                       strokeWidth=lw * _PDF_LINIEN_SKALA, strokeDashArray=_PDF_STRICHE[stil],
+                       strokeOpacity=deckkraft))
+            d.add(String(ex + 17, ey, label, fontName='Helvetica', fontSize=5.5, fillColor=dunkel))
+    return d
+
+
+def vektor_pdf_chart(profiles, total, title, mode_key, breite=None):
+    """Wie make_pdf_chart(), aber als Vektorgrafik (reportlab Drawing)"""
+    _pdf_engine_laden()
+    kurven = [(p[mode_key], PDF_ZONEN_FARBEN[i % len(PDF_ZONEN_FARBEN)], 1.5, '--', 0.6, p["name"])
+              for i, p in enumerate(profiles[:PDF_LEGENDE_ZONEN])]
+    rest = profiles[PDF_LEGENDE_ZONEN:]
+    kurven += [(p[mode_key], PDF_REST_FARBE, 0.8, '--', 0.35,
+                f'+ {len(rest)} weitere Zonen' if i == 0 else None) for i, p in enumerate(rest)]
+    kurven.append((total, '#3C3C3B', 3.5, '-', 1.0, 'GESAMT SIMULTAN'))
+    return _vektor_diagramm(kurven, title, 'Stunde', breite or 165*mm)
+
+
+def vektor_comparison_chart(g_sums, breite=None):
+    """Wie make_comparison_chart(), aber als Vektorgrafik (reportlab Drawing)"""
+    _pdf_engine_laden()
+    kurven = [(g_sums[key], farbe, lw, stil, 1.0, name)
+              for name, key, farbe, lw, stil in PDF_METHODEN_STIL]
+    return _vektor_diagramm(kurven, 'METHODENVERGLEICH - SIMULTAN-TRENDKURVEN',
+                            'Tagesstunde [h]', breite or 165*mm, legende_spalten=1)
+
+
+@gemessen
+def vektor_diagramme(jobs, breite=None, progress=None, abbrechen=None):
+    """
+    Diagramm-Jobs (diagramm_jobs) als Vektorgrafiken — gleiche Schnittstelle wie
+    render_diagramme(), aber ohne Matplotlib/Pool (Millisekunden je Diagramm).
+    """
+    ergebnisse = []
+    for i, (art, args, _) in enumerate(jobs):
+        if progress:
+            progress(i, len(jobs))
+        if abbrechen and abbrechen():
+            raise BerichtAbgebrochen(f"Abbruch nach {i}/{len(jobs)} Diagrammen")
+        ergebnisse.append(vektor_comparison_chart(*args, breite=breite) if art == "vergleich"
+                          else vektor_pdf_chart(*args, breite=breite))
+    if progress:
+        progress(len(jobs), len(jobs))
+    return ergebnisse
+
+
 # ==========================================
 # 7. PDF REPORT: KUNDENVERSION
 # ==========================================
 
 
 
+@gemessen
 def build_transfer_report(proj, kunde, bearbeiter, firma, room_results, g_sums,
                           samsung_recommendations, selected_hw, total_kw, selected_hw_ag):
     """Erstellt JSON-Datensatz für coolMATCH-Übergabe"""
@@ -1862,13 +5107,22 @@ def build_transfer_report(proj, kunde, bearbeiter, firma, room_results, g_sums,
     return json.dumps(data, ensure_ascii=False, indent=2)
 
 
+@gemessen
 def generate_kunden_pdf(proj, kunde, bearbeiter, firma, room_results, g_sums,
                          individual_profiles, samsung_recommendations,
                          selected_hw, total_installed_kw, selected_hw_ag=None,
-                         room_inputs=None, partner_firma="", selected_ig_artnr=None):
+                         room_inputs=None, partner_firma="", selected_ig_artnr=None,
+                         vektor=True, workers=None, progress=None, abbrechen=None):
+    _pdf_engine_laden()
+    # Diagramme zuerst (Vektor, oder PNG parallel + Cache), danach die Story
+    jobs = diagramm_jobs(individual_profiles, g_sums)
+    if vektor:
+        bilder = vektor_diagramme(jobs, breite=165*mm, progress=progress, abbrechen=abbrechen)
+    else:
+        bilder = render_diagramme(jobs, workers=workers, progress=progress, abbrechen=abbrechen)
     if selected_hw_ag is None: selected_hw_ag = []
-    if selected_ig_artnr is None: selected_ig_artnr = ['—'] * 5
-    if room_inputs is None:    room_inputs = [{} for _ in range(5)]
+    if selected_ig_artnr is None: selected_ig_artnr = ['—'] * len(room_results)
+    if room_inputs is None:    room_inputs = [{} for _ in room_results]
     zone_names = [r.get('ZONE', f'Zone {i+1}') for i, r in enumerate(room_results)]
 
     buf = _io.BytesIO()
@@ -1923,19 +5177,10 @@ def generate_kunden_pdf(proj, kunde, bearbeiter, firma, room_results, g_sums,
     # Alle 6 Einzelzonen-Diagramme
     story.append(PageBreak())
     story += _section_hdr('Simultan-Diagramme', 'Alle 6 Berechnungsverfahren — Einzelzonen')
-    diagramme = [
-        ('VDI 6007 Neu',   'vdi_n', 'VDI_N'),
-        ('VDI 2078 Alt',   'vdi_a', 'VDI_A'),
-        ('Praktiker',      'prak',  'PRAK'),
-        ('Recknagel',      'reck',  'RECK'),
-        ('Kaltluftsee',    'klts',  'KLTS'),
-        ('KI-Hybrid',      'ki',    'KI'),
-    ]
-    for i, (title, mode_key, sum_key) in enumerate(diagramme):
+    for i, ((title, _, _), img_b) in enumerate(zip(PDF_DIAGRAMME, bilder)):
         if i > 0 and i % 2 == 0:
             story.append(PageBreak())
         story.append(Paragraph(title, _S['h2']))
-        img_b = make_pdf_chart(individual_profiles, g_sums[sum_key], title, mode_key)
         story += _chart(img_b, width=165*mm)
 
     # Disclaimer Footer-Seite
@@ -1947,14 +5192,23 @@ def generate_kunden_pdf(proj, kunde, bearbeiter, firma, room_results, g_sums,
     return buf.getvalue()
 
 
+@gemessen
 def generate_uebergabe_pdf(proj, kunde, bearbeiter, firma, room_results, g_sums,
                             individual_profiles, samsung_recommendations,
                             selected_hw, total_installed_kw, selected_hw_ag=None,
                             room_inputs=None, partner_firma="", selected_ig_artnr=None,
-                            liefertermin="—"):
+                            liefertermin="—", vektor=True, workers=None, progress=None,
+                            abbrechen=None):
+    _pdf_engine_laden()
+    # Diagramme zuerst (Vektor, oder PNG parallel + Cache), danach die Story
+    jobs = diagramm_jobs(individual_profiles, g_sums, vergleich=True)
+    if vektor:
+        bilder = vektor_diagramme(jobs, breite=165*mm, progress=progress, abbrechen=abbrechen)
+    else:
+        bilder = render_diagramme(jobs, workers=workers, progress=progress, abbrechen=abbrechen)
     if selected_hw_ag is None: selected_hw_ag = []
-    if selected_ig_artnr is None: selected_ig_artnr = ['—'] * 5
-    if room_inputs is None:    room_inputs = [{} for _ in range(5)]
+    if selected_ig_artnr is None: selected_ig_artnr = ['—'] * len(room_results)
+    if room_inputs is None:    room_inputs = [{} for _ in room_results]
     zone_names = [r.get('ZONE', f'Zone {i+1}') for i, r in enumerate(room_results)]
 
     buf = _io.BytesIO()
@@ -1994,25 +5248,16 @@ def generate_uebergabe_pdf(proj, kunde, bearbeiter, firma, room_results, g_sums,
     # Alle 6 Einzelzonen-Diagramme
     story.append(PageBreak())
     story += _section_hdr('Simultan-Diagramme', 'Alle 6 Berechnungsverfahren — Einzelzonen')
-    diagramme = [
-        ('VDI 6007 Neu',   'vdi_n', 'VDI_N'),
-        ('VDI 2078 Alt',   'vdi_a', 'VDI_A'),
-        ('Praktiker',      'prak',  'PRAK'),
-        ('Recknagel',      'reck',  'RECK'),
-        ('Kaltluftsee',    'klts',  'KLTS'),
-        ('KI-Hybrid',      'ki',    'KI'),
-    ]
-    for i, (title, mode_key, sum_key) in enumerate(diagramme):
+    for i, ((title, _, _), img_b) in enumerate(zip(PDF_DIAGRAMME, bilder)):
         if i > 0 and i % 2 == 0:
             story.append(PageBreak())
         story.append(Paragraph(title, _S['h2']))
-        img_b = make_pdf_chart(individual_profiles, g_sums[sum_key], title, mode_key)
         story += _chart(img_b, width=165*mm)
 
     # Methodenvergleich
     story.append(PageBreak())
     story += _section_hdr('Methodenvergleich', 'Alle Methoden überlagert')
-    story += _chart(make_comparison_chart(g_sums), width=165*mm)
+    story += _chart(bilder[-1], width=165*mm)
 
     # Haftungsausschluss
     story.append(PageBreak())
@@ -2023,13 +5268,14 @@ def generate_uebergabe_pdf(proj, kunde, bearbeiter, firma, room_results, g_sums,
     return buf.getvalue()
 
 
+@gemessen
 def generate_word_report(proj, kunde, bearbeiter, firma, room_results, g_sums,
                           selected_hw, total_installed_kw, selected_hw_ag=None,
                           room_inputs=None, partner_firma="", selected_ig_artnr=None):
     """Word-Dokument mit python-docx — vollständiger Bericht"""
     if selected_hw_ag is None: selected_hw_ag = []
-    if selected_ig_artnr is None: selected_ig_artnr = ['—'] * 5
-    if room_inputs is None:    room_inputs = [{} for _ in range(5)]
+    if selected_ig_artnr is None: selected_ig_artnr = ['—'] * len(room_results)
+    if room_inputs is None:    room_inputs = [{} for _ in room_results]
     try:
         from docx import Document as DocxDoc
     except ImportError:
@@ -2107,17 +5353,19 @@ def generate_word_report(proj, kunde, bearbeiter, firma, room_results, g_sums,
     # Eingabedaten
     _h('Eingabedaten', level=1)
     zone_names = [r.get('ZONE', f'Zone {zi+1}') for zi, r in enumerate(room_results)]
-    hdr_e = ['Parameter'] + zone_names
     params_e = [('Fläche [m²]','flaeche'), ('Höhe [m]','hoehe'), ('Personen','personen'),
                 ('Fenster [m²]','fenster'), ('Orientierung','orientierung')]
-    rows_e = []
-    for lbl, key in params_e:
-        row = [lbl]
-        for zi in range(5):
-            ri = room_inputs[zi] if zi < len(room_inputs) else {}
-            row.append(str(ri.get(key,'—')) if isinstance(ri,dict) else '—')
-        rows_e.append(row)
-    _tbl(hdr_e, rows_e, [3.5,2.5,2.5,2.5,2.5,2.5])
+    for start in range(0, len(zone_names), 5):   # je 5 Zonen nebeneinander
+        block = range(start, min(len(zone_names), start + 5))
+        hdr_e = ['Parameter'] + [zone_names[zi] for zi in block]
+        rows_e = []
+        for lbl, key in params_e:
+            row = [lbl]
+            for zi in block:
+                ri = room_inputs[zi] if zi < len(room_inputs) else {}
+                row.append(str(ri.get(key,'—')) if isinstance(ri,dict) else '—')
+            rows_e.append(row)
+        _tbl(hdr_e, rows_e, [3.5] + [2.5] * len(block))
 
     # Ergebnismatrix
     _h('Ergebnis-Matrix', level=1)
@@ -2137,14 +5385,14 @@ def generate_word_report(proj, kunde, bearbeiter, firma, room_results, g_sums,
     _h('Innengeräte', level=1)
     hdr_ig = ['Zone', 'Leistung', 'Artikelnummer', 'Listenpreis']
     rows_ig = []
-    for zi in range(5):
+    for zi in range(len(zone_names)):
         ig_kw = selected_hw[zi] if zi < len(selected_hw) else 0
         ig_artnr = selected_ig_artnr[zi] if zi < len(selected_ig_artnr) else '—'
         rows_ig.append([
             zone_names[zi],
             f'{ig_kw:.1f} kW' if ig_kw else 'N.V.',
             ig_artnr,
-            '(s. Angebot)'
+            katalog_preis_text(ig_artnr, '(s. Angebot)')
         ])
     _tbl(hdr_ig, rows_ig, [3.0, 2.5, 6.0, 3.5])
     
@@ -2152,7 +5400,7 @@ def generate_word_report(proj, kunde, bearbeiter, firma, room_results, g_sums,
     _h('Außengeräte', level=1)
     hdr_ag = ['Zone', 'Typ', 'Leistung', 'Artikelnummer', 'Listenpreis']
     rows_ag = []
-    for zi in range(5):
+    for zi in range(len(zone_names)):
         ag_inf = selected_hw_ag[zi] if zi < len(selected_hw_ag) else ('—', 0, 'N.V.')
         ag_typ = ag_inf[0] if isinstance(ag_inf, (list, tuple)) else '—'
         ag_kw = ag_inf[1] if isinstance(ag_inf, (list, tuple)) and len(ag_inf) > 1 else 0
@@ -2162,7 +5410,7 @@ def generate_word_report(proj, kunde, bearbeiter, firma, room_results, g_sums,
             ag_typ,
             f'{ag_kw:.1f} kW' if ag_kw else 'N.V.',
             ag_artnr,
-            '(s. Angebot)'
+            katalog_preis_text(ag_artnr, '(s. Angebot)') if ag_kw else '(s. Angebot)'
         ])
     _tbl(hdr_ag, rows_ag, [2.8, 2.0, 2.5, 5.5, 3.0])
     _p(f'Gesamt: {sum(selected_hw):.1f} kW', bold=True, size=11)
@@ -2177,122 +5425,1308 @@ def generate_word_report(proj, kunde, bearbeiter, firma, room_results, g_sums,
     return buf.getvalue()
 
 
+@gemessen
 def generate_excel_anfrage(proj, kunde, bearbeiter, firma, selected_hw, selected_hw_ag, 
                            zone_names, selected_ig_artnr=None, liefertermin="—"):
     """
     Generiert Excel-Anfrage für °coolsulting
     ALLES IN EINEM SHEET mit übersichtlicher Struktur
+    Zeilen werden direkt ins Sheet gestreamt (openpyxl write_only) — auch bei Hunderten Zonen
     """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
     if selected_ig_artnr is None:
-        selected_ig_artnr = ['—'] * 5
-    
-    # Sammle alle Daten in einer Liste (Zeilen)
-    rows = []
-    
-    # ===== PROJEKTINFORMATIONEN =====
-    rows.append(['PROJEKTINFORMATIONEN', '', '', '', ''])
-    rows.append(['Projekt', proj, '', '', ''])
-    rows.append(['Kunde', kunde, '', '', ''])
-    rows.append(['Bearbeiter', bearbeiter, '', '', ''])
-    rows.append(['Firma', firma, '', '', ''])
-    rows.append(['Datum', datetime.now().strftime('%d.%m.%Y'), '', '', ''])
-    rows.append(['Liefertermin', liefertermin, '', '', ''])
-    rows.append(['', '', '', '', ''])  # Leerzeile
-    
-    # ===== INNENGERÄTE =====
-    rows.append(['INNENGERÄTE', '', '', '', ''])
-    rows.append(['Zone', 'Leistung [kW]', 'Artikelnummer', 'Menge', ''])
-    
-    for zi in range(5):
-        if zi < len(selected_hw) and selected_hw[zi] > 0:
-            rows.append([
-                zone_names[zi] if zi < len(zone_names) else f'Zone {zi+1}',
-                selected_hw[zi],
-                selected_ig_artnr[zi] if zi < len(selected_ig_artnr) else '—',
-                1,
-                ''
-            ])
-    
-    rows.append(['', '', '', '', ''])  # Leerzeile
-    
-    # ===== AUSSENGERÄTE =====
-    rows.append(['AUSSENGERÄTE', '', '', '', ''])
-    rows.append(['Zone', 'Typ', 'Leistung [kW]', 'Artikelnummer', 'Menge'])
-    
-    for zi in range(5):
-        if zi < len(selected_hw_ag):
-            ag_inf = selected_hw_ag[zi]
+        selected_ig_artnr = ['—'] * len(zone_names)
+
+    def zeilen():
+        # ===== PROJEKTINFORMATIONEN =====
+        yield ['PROJEKTINFORMATIONEN', '', '', '', '']
+        yield ['Projekt', proj, '', '', '']
+        yield ['Kunde', kunde, '', '', '']
+        yield ['Bearbeiter', bearbeiter, '', '', '']
+        yield ['Firma', firma, '', '', '']
+        yield ['Datum', datetime.now().strftime('%d.%m.%Y'), '', '', '']
+        yield ['Liefertermin', liefertermin, '', '', '']
+        yield ['', '', '', '', '']  # Leerzeile
+
+        # ===== INNENGERÄTE =====
+        yield ['INNENGERÄTE', '', '', '', '']
+        yield ['Zone', 'Leistung [kW]', 'Artikelnummer', 'Menge', '']
+        for zi in range(len(zone_names)):
+            if zi < len(selected_hw) and selected_hw[zi] > 0:
+                yield [
+                    zone_names[zi],
+                    selected_hw[zi],
+                    selected_ig_artnr[zi] if zi < len(selected_ig_artnr) else '—',
+                    1,
+                    ''
+                ]
+        yield ['', '', '', '', '']  # Leerzeile
+
+        # ===== AUSSENGERÄTE =====
+        yield ['AUSSENGERÄTE', '', '', '', '']
+        yield ['Zone', 'Typ', 'Leistung [kW]', 'Artikelnummer', 'Menge']
+        for zi in range(len(zone_names)):
+            ag_inf = selected_hw_ag[zi] if zi < len(selected_hw_ag) else None
             if isinstance(ag_inf, (list, tuple)) and len(ag_inf) >= 3:
-                ag_typ = ag_inf[0]
-                ag_kw = ag_inf[1]
-                ag_artnr = ag_inf[2]
-                
+                ag_typ, ag_kw, ag_artnr = ag_inf[:3]
                 if ag_kw > 0 and ag_artnr != 'N.V.':
-                    rows.append([
-                        zone_names[zi] if zi < len(zone_names) else f'Zone {zi+1}',
-                        ag_typ,
-                        ag_kw,
-                        ag_artnr,
-                        1
-                    ])
-    
-    # Erstelle DataFrame und Excel
-    df = pd.DataFrame(rows)
-    
+                    yield [zone_names[zi], ag_typ, ag_kw, ag_artnr, 1]
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Anfrage')
+
+    # Spaltenbreiten anpassen
+    for col, breite in zip('ABCDE', (20, 18, 25, 25, 10)):
+        ws.column_dimensions[col].width = breite
+
+    # Überschriften fett machen (PROJEKTINFORMATIONEN, INNENGERÄTE, AUSSENGERÄTE)
+    bold_font = Font(bold=True, size=12)
+    header_font = Font(bold=True, size=10)
+    for row in zeilen():
+        font = (bold_font if row[0] in ('PROJEKTINFORMATIONEN', 'INNENGERÄTE', 'AUSSENGERÄTE') else
+                header_font if row[0] in ('Zone', 'Projekt', 'Kunde', 'Bearbeiter', 'Firma',
+                                          'Datum', 'Liefertermin') else None)
+        zellen = [v if v != '' else None for v in row]
+        if font is not None:
+            zellen[0] = WriteOnlyCell(ws, value=row[0])
+            zellen[0].font = font
+        ws.append(zellen)
+
     output = _io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Anfrage', index=False, header=False)
-        
-        # Formatierung
-        workbook = writer.book
-        worksheet = writer.sheets['Anfrage']
-        
-        # Spaltenbreiten anpassen
-        worksheet.column_dimensions['A'].width = 20
-        worksheet.column_dimensions['B'].width = 18
-        worksheet.column_dimensions['C'].width = 25
-        worksheet.column_dimensions['D'].width = 25
-        worksheet.column_dimensions['E'].width = 10
-        
-        # Überschriften fett machen (PROJEKTINFORMATIONEN, INNENGERÄTE, AUSSENGERÄTE)
-        from openpyxl.styles import Font, Alignment
-        bold_font = Font(bold=True, size=12)
-        header_font = Font(bold=True, size=10)
-        
-        for row in worksheet.iter_rows():
-            cell_value = str(row[0].value) if row[0].value else ''
-            if cell_value in ['PROJEKTINFORMATIONEN', 'INNENGERÄTE', 'AUSSENGERÄTE']:
-                row[0].font = bold_font
-            elif cell_value in ['Zone', 'Projekt', 'Kunde', 'Bearbeiter', 'Firma', 'Datum', 'Liefertermin']:
-                row[0].font = header_font
-    
-    output.seek(0)
+    wb.save(output)
     return output.getvalue()
 
 
-def main():
-    setup_page()
-    db_init()
+# ==========================================
+# 8. HEADLESS BATCH / CLI
+# ==========================================
+# Aufruf: python coolMATH.py batch projekte.csv|json --out ordner [--workers N]
+# Rechnet alle 6 Methoden + Standard-Geräteauswahl ohne Streamlit-Oberfläche
+# und schreibt je Projekt den coolMATCH-Übergabe-JSON (build_transfer_report).
+
+# Vorbelegung fehlender Zonen-Felder (= UI-Defaults)
+BATCH_ZONEN_DEFAULTS = {
+    "orient": "SUED", "standard": "Altbau", "glass": "Einfach",
+    "shade": "Vorhang (Innen)", "pers": 2, "tech": 200.0, "win_area": 2.4,
+    "bau_m": "Mittel (Ziegel/Holz-Beton)", "raumhoehe": 2.5,
+    "serie": SAMSUNG_DEFAULT_SERIE,
+}
+_BATCH_PROJEKT_FELDER = ("projekt", "kunde", "bearbeiter", "firma")
 
-    # --- LOGIN DISABLED ---
-    # auth_ok, auth_user = check_login()
-    # if not auth_ok:
-    #     return
-    auth_role     = "admin"
-    auth_username = "demo"
-    partner_firma = "°coolsulting"  # Wird später aus Input überschrieben
 
+def _batch_zahl(wert, typ=float):
+    """'12,5' / '12.5' / 12.5 → Zahl (CSV-tolerant)"""
+    if isinstance(wert, str):
+        wert = wert.strip().replace(",", ".")
+    return typ(float(wert))
 
-    # --- HEADER (Bug-freier Aufbau) ---
-    # Logout in Sidebar
-    with st.sidebar:
-        st.markdown(f"**👤 {auth_username}**")
+
+# Zulässige Werte einer importierten Zone (= Auswahllisten und Grenzen der Eingabe)
+ZONEN_AUSWAHL = {"orient": SOLAR_DB, "glass": G_WERTE, "shade": FC_WERTE, "standard": U_WERTE}
+ZONEN_GRENZEN = {"area": (5.0, 500.0), "win_area": (0.0, 150.0), "pers": (0, 15), "tech": (0.0, 10000.0)}
+
+
+def _zone_pruefen(zone, idx):
+    """Auswahlfelder und Wertebereiche einer Zone prüfen, sonst ValueError('Zone n: …')"""
+    for k, erlaubt in ZONEN_AUSWAHL.items():
+        if zone[k] not in erlaubt:
+            raise ValueError(f"Zone {idx + 1}: {k} '{zone[k]}' unbekannt "
+                             f"(erlaubt: {', '.join(erlaubt)})")
+    for k, (lo, hi) in ZONEN_GRENZEN.items():
+        if not lo <= zone[k] <= hi:
+            raise ValueError(f"Zone {idx + 1}: {k} = {zone[k]} außerhalb {lo:g}–{hi:g}")
+    return zone
+
+
+def _batch_zone(z, idx):
+    """Zonen-Eintrag aus CSV/JSON → vollständiges, geprüftes Zonen-Dict (_zone_pruefen)"""
+    zone = {k: (z.get(k) if z.get(k) not in (None, "") else v)
+            for k, v in BATCH_ZONEN_DEFAULTS.items()}
+    if z.get("area") in (None, ""):
+        raise ValueError(f"Zone {idx + 1}: Feld 'area' fehlt")
+    try:
+        zone["area"]      = _batch_zahl(z["area"])
+        zone["pers"]      = _batch_zahl(zone["pers"], int)
+        for k in ("tech", "win_area", "raumhoehe"):
+            zone[k] = _batch_zahl(zone[k])
+    except ValueError as e:
+        raise ValueError(f"Zone {idx + 1}: {e}") from None
+    zone["name"] = z.get("name") or f"Raum {idx + 1}"
+    return _zone_pruefen(zone, idx)
+
+
+def load_batch_projekte(path):
+    """
+    Liest Projekte für den Batch-Lauf.
+    JSON: Liste von Projekten (oder {"projekte": [...]} / Einzelprojekt),
+          je Projekt projekt/kunde/bearbeiter/firma + "zonen": [...]
+    CSV:  eine Zeile je Zone, gruppiert über Spalte 'projekt'
+    """
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get("projekte", [data])
+        return [{**{k: p.get(k, "") for k in _BATCH_PROJEKT_FELDER},
+                 "zonen": [_batch_zone(z, i) for i, z in enumerate(p.get("zonen", []))]}
+                for p in data]
+    projekte = {}
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for row in _csv_zeilen(f):
+            pid = row.get("projekt", "")
+            p = projekte.setdefault(pid, {**{k: row.get(k, "") for k in _BATCH_PROJEKT_FELDER},
+                                          "zonen": []})
+            p["zonen"].append(_batch_zone(row, len(p["zonen"])))
+    return list(projekte.values())
+
+
+def _csv_zeilen(f):
+    """CSV-Zeilen (Trennzeichen , ; Tab erkannt) als dicts, Spaltennamen klein"""
+    import csv
+    sample = f.read(4096)
+    f.seek(0)
+    dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    for row in csv.DictReader(f, dialect=dialect):
+        yield {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+
+
+def load_zonenliste(datei):
+    """
+    Zonenliste eines Gebäudes (CSV, eine Zeile je Raum, Spalten wie im
+    Batch-Format; 'projekt' wird ignoriert) → ZonenTabelle. Unbekannte
+    Auswahlwerte oder Werte außerhalb der Eingabegrenzen → ValueError.
+    """
+    text = io.TextIOWrapper(datei, encoding="utf-8-sig", newline="") if hasattr(datei, "read") \
+        else open(datei, encoding="utf-8-sig", newline="")
+    with text:
+        zonen = [_batch_zone(row, i) for i, row in enumerate(_csv_zeilen(text))]
+    if len(zonen) > ZONEN_MAX:
+        raise ValueError(f"{len(zonen)} Zonen — maximal {ZONEN_MAX} je Gebäude")
+    return ZonenTabelle.aus_zonen(zonen)
+
+
+def projekt_auswerten(projekt):
+    """
+    Ein Projekt headless rechnen: 6 Methoden, Samsung-Empfehlung und
+    Standard-Geräteauswahl wie im UI (IG = Praktiker +10 % in Zonen-Serie,
+    AG = FJM Multi). Rückgabe: Übergabe-JSON (str)
+    """
+    zonen = projekt["zonen"]
+    namen = [z["name"] for z in zonen]
+    kurven = calc_zonen_cached(zonen)
+    g_sums, _, room_results, samsung_recs = zonen_ergebnisse(kurven, namen)
+
+    selected_hw, selected_hw_ag = [], []
+    for zi, (z, r) in enumerate(zip(zonen, room_results)):
+        serie = z["serie"] if z["serie"] in geraete_katalog().ig else SAMSUNG_DEFAULT_SERIE
+        ig_kw = device_label(r["PRAKTIKER"], safety=1.10, serie=serie)[0]
+        ag_kw = default_fjm_ag(zi, ig_kw)
+        selected_hw.append(ig_kw)
+        selected_hw_ag.append(("FJM", 0, "N.V.") if ag_kw is None
+                              else ("FJM", ag_kw, geraete_katalog().fjm_ag.passend(ag_kw)[0]["art_nr"]))
+
+    return build_transfer_report(
+        projekt["projekt"], projekt["kunde"], projekt["bearbeiter"], projekt["firma"],
+        room_results, g_sums, samsung_recs, selected_hw, sum(selected_hw), selected_hw_ag)
+
+
+def _slug(name, leer="projekt"):
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in str(name)).strip("_") or leer
+
+
+def _batch_dateiname(idx, name):
+    return f"{idx:05d}_{_slug(name)}.json"
+
+
+def _batch_job(args):
+    """Worker: ein Projekt rechnen und schreiben → (idx, pfad, fehler)"""
+    idx, projekt, out_dir = args
+    pfad = os.path.join(out_dir, _batch_dateiname(idx, projekt["projekt"]))
+    try:
+        report = projekt_auswerten(projekt)
+        with open(pfad, "w", encoding="utf-8") as f:
+            f.write(report)
+        return idx, pfad, None
+    except Exception as e:
+        return idx, pfad, f"{type(e).__name__}: {e}"
+
+
+def run_batch(projekte, out_dir, workers=None, progress=None):
+    """
+    Rechnet alle Projekte über einen Prozess-Pool (workers=1 → seriell).
+    progress(done, total) wird nach jedem Projekt aufgerufen.
+    Rückgabe: Liste (idx, pfad, fehler) in Eingabereihenfolge
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    os.makedirs(out_dir, exist_ok=True)
+    jobs  = [(i, p, out_dir) for i, p in enumerate(projekte)]
+    total = len(jobs)
+    workers = workers or os.cpu_count() or 1
+    ergebnisse = []
+    if workers <= 1 or total <= 1:
+        laeufer = map(_batch_job, jobs)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=min(workers, total))
+        laeufer = pool.map(_batch_job, jobs, chunksize=max(1, total // (workers * 8)))
+    try:
+        for res in laeufer:
+            ergebnisse.append(res)
+            if progress:
+                progress(len(ergebnisse), total)
+    finally:
+        if pool:
+            pool.shutdown()
+    return ergebnisse
+
+
+# --- Sammel-Export: archivierte Projekte → ZIP (PDFs, Excel, Übergabe-JSON) ---
+ARCHIV_EXPORT_DATEIEN = ("Kundenbericht.pdf", "Technikuebergabe.pdf", "Anfrage.xlsx", "Uebergabe.json")
+
+
+def archiv_projekt(rec):
+    """
+    Archiv-Projekt (db_projekte_iter) → Projekt für die Berichte: Zonen-Dicts
+    inkl. Gebäudewerten, gespeicherte Lastprofile und Geräteauswahl. Fehlende Felder
+    (z. B. aus room_inputs migrierte Alt-Einträge) erhalten die UI-Vorbelegung
+    (wie im Batch).
+    """
+    if not rec.get("zonen"):
+        raise ValueError("keine Zonendaten gespeichert")
+    gebaeude = {k: v for k, v in rec.get("gebaeude", {}).items() if v is not None}
+    zonen = [_batch_zone({**z, **gebaeude}, i) for i, z in enumerate(rec["zonen"])]
+    n = len(zonen)
+    hw = list(rec.get("selected_hw", []))[:n]
+    ag = list(rec.get("selected_hw_ag", []))[:n]
+    ig = list(rec.get("selected_ig_artnr", []))[:n]
+    return {**{k: rec.get(k) or "" for k in ("projekt_id", "firma", "projekt", "kunde",
+                                             "bearbeiter", "created_at")},
+            "zonen": zonen, "kurven": rec.get("kurven"),
+            "selected_hw": hw + [0.0] * (n - len(hw)),
+            "selected_hw_ag": ag + [("FJM", 0, "N.V.")] * (n - len(ag)),
+            "selected_ig_artnr": ig + ["—"] * (n - len(ig))}
+
+
+def archiv_kurven(projekt_ids):
+    """
+    Gebäudekurven für die Überlagerung im Archiv: gespeicherte Profile;
+    ältere Projekte ohne Profile werden aus den Zonen neu berechnet.
+    """
+    kurven = db_gebaeude_kurven(projekt_ids)
+    for pid in projekt_ids:
+        if pid not in kurven:
+            try:
+                kurven[pid] = calc_zonen_cached(archiv_projekt(db_load_project(pid) or {})["zonen"]).sum(axis=0)
+            except Exception:
+                pass                                   # ohne Zonendaten: keine Kurve
+    return kurven
+
+
+def archiv_bericht(rec):
+    """
+    Archiv-Projekt → (p, kopf, ergebnis, bericht) für die Berichtsgeneratoren:
+    ergebnis = (room_results, g_sums, profiles, recs) aus den gespeicherten
+    Lastprofilen (ältere Projekte ohne Profile: neu gerechnet), bericht = kwargs.
+    """
+    p = archiv_projekt(rec)
+    namen = [z["name"] for z in p["zonen"]]
+    kurven = p["kurven"] if p["kurven"] is not None else calc_zonen_cached(p["zonen"])
+    g_sums, profiles, room_results, recs = zonen_ergebnisse(kurven, namen)
+    kopf = (p["projekt"], p["kunde"], p["bearbeiter"], p["firma"])
+    bericht = dict(selected_hw_ag=p["selected_hw_ag"],
+                   room_inputs=room_inputs_aus_zonen(p["zonen"], namen),
+                   selected_ig_artnr=p["selected_ig_artnr"], partner_firma=p["firma"], workers=1)
+    return p, kopf, (room_results, g_sums, profiles, recs), bericht
+
+
+def archiv_uebergabe_pdf(projekt_id):
+    """Technikübergabe-PDF eines gespeicherten Projekts (Anhang der Monday-Outbox)"""
+    rec = db_load_project(projekt_id)
+    if rec is None:
+        raise LookupError(f"Projekt {projekt_id} nicht im Archiv")
+    p, kopf, ergebnis, bericht = archiv_bericht(rec)
+    return generate_uebergabe_pdf(*kopf, *ergebnis, p["selected_hw"], sum(p["selected_hw"]), **bericht)
+
+
+def _archiv_export_job(rec):
+    """Worker: ein Archiv-Projekt → (ordner, [(dateiname, bytes)], fehler)"""
+    ordner = f"{str(rec.get('created_at') or '')[:10]}_{_slug(rec.get('projekt'))}_{rec.get('projekt_id')}"
+    try:
+        p, kopf, (room_results, g_sums, profiles, recs), bericht = archiv_bericht(rec)
+        hw, ag = p["selected_hw"], p["selected_hw_ag"]
+        namen = [z["name"] for z in p["zonen"]]
+        daten = (
+            generate_kunden_pdf(*kopf, room_results, g_sums, profiles, recs, hw, sum(hw), **bericht),
+            generate_uebergabe_pdf(*kopf, room_results, g_sums, profiles, recs, hw, sum(hw), **bericht),
+            generate_excel_anfrage(*kopf, hw, ag, namen),
+            build_transfer_report(*kopf, room_results, g_sums, recs, hw, sum(hw), ag).encode("utf-8"),
+        )
+        return ordner, list(zip(ARCHIV_EXPORT_DATEIEN, daten)), None
+    except Exception as e:
+        return ordner, [], f"{type(e).__name__}: {e}"
+
+
+def run_archiv_export(projekte, ziel, workers=None, progress=None, abbrechen=None, total=None):
+    """
+    Schreibt für alle Projekte (Iterator von Archiv-Datensätzen) die Berichte in
+    ein ZIP (ziel: Pfad oder Binär-Stream). Die Projekte werden erst beim
+    Einreichen gelesen und höchstens 2 × workers Ergebnisse gleichzeitig
+    gehalten; jedes fertige Projekt geht sofort ins ZIP (begrenzter Speicher).
+    workers=1 → seriell. progress(fertig, total) nach jedem Projekt; liefert
+    abbrechen() True, werden offene Jobs storniert und BerichtAbgebrochen ausgelöst.
+    Rückgabe: {"projekte": Anzahl, "fehler": [..]} — Fehler zusätzlich als FEHLER.txt
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    import multiprocessing
+    import zipfile
+    workers = workers or os.cpu_count() or 1
+    stand = {"fertig": 0, "fehler": []}
+
+    with zipfile.ZipFile(ziel, "w", zipfile.ZIP_DEFLATED) as zf:
+        def ablegen(ergebnis):
+            ordner, dateien, fehler = ergebnis
+            for name, daten in dateien:
+                zf.writestr(f"{ordner}/{name}", daten)
+            if fehler:
+                stand["fehler"].append(f"{ordner}: {fehler}")
+            stand["fertig"] += 1
+            if progress:
+                progress(stand["fertig"], total)
+            if abbrechen and abbrechen():
+                raise BerichtAbgebrochen(f"Abbruch nach {stand['fertig']} Projekten")
+
+        if workers <= 1:
+            for rec in projekte:
+                ablegen(_archiv_export_job(rec))
+        else:
+            # spawn: kein fork aus dem mehrthreadigen Streamlit-Server
+            pool = ProcessPoolExecutor(max_workers=workers,
+                                       mp_context=multiprocessing.get_context("spawn"))
+            fn, offen = _worker_fn("_archiv_export_job"), set()
+            try:
+                for rec in projekte:
+                    while len(offen) >= 2 * workers:
+                        fertig, offen = wait(offen, return_when=FIRST_COMPLETED)
+                        for f in fertig:
+                            ablegen(f.result())
+                    offen.add(pool.submit(fn, rec))
+                while offen:
+                    fertig, offen = wait(offen, return_when=FIRST_COMPLETED)
+                    for f in fertig:
+                        ablegen(f.result())
+            finally:
+                pool.shutdown(wait=not offen, cancel_futures=True)
+        if stand["fehler"]:
+            zf.writestr("FEHLER.txt", "\n".join(stand["fehler"]) + "\n")
+    return {"projekte": stand["fertig"], "fehler": stand["fehler"]}
+
+
+def archiv_export(ziel, firma=None, role="partner", von=None, bis=None, suche="", min_peak_w=None,
+                  workers=None, progress=None, abbrechen=None):
+    """
+    Sammel-Export der gefilterten Archiv-Projekte (db_projekte_iter) → ZIP.
+    Schlägt der Export fehl (z. B. DB-Abfrage), bleibt keine Zieldatei zurück.
+    """
+    total = db_projekte_zaehlen(firma, role, von, bis, suche, min_peak_w)
+    try:
+        return run_archiv_export(db_projekte_iter(firma, role, von, bis, suche, min_peak_w), ziel,
+                                 workers=workers, progress=progress, abbrechen=abbrechen, total=total)
+    except BaseException:
+        if isinstance(ziel, (str, os.PathLike)) and os.path.exists(ziel):
+            os.remove(ziel)
+        raise
+
+
+def _alle_stacks_laden():
+    """Lädt alle lazy Stacks auf einmal (= Importkosten bis v44.15)"""
+    import pandas, plotly.graph_objects, requests  # noqa: F401
+    _pyplot()
+    _pdf_engine_laden()
+    kompiliere_katalog(_preisliste_finden())   # Excel-Parse wie früher beim Import
+
+
+def startzeit_benchmark(wiederholungen=5):
+    """
+    Kaltstart-Messung in frischen Interpretern: 'import coolMATH' lazy gegen
+    Import + alle Stacks (entspricht dem früheren eager Import). Median [s].
+    """
+    import subprocess
+    import statistics
+    code = ("import time; t0 = time.perf_counter(); import coolMATH; {extra}"
+            "print(time.perf_counter() - t0)")
+    modul_dir = os.path.dirname(os.path.abspath(__file__))
+
+    def messen(extra):
+        zeiten = []
+        for _ in range(wiederholungen + 1):         # 1. Lauf = Aufwärmen (.pyc, Disk-Cache)
+            out = subprocess.run([sys.executable, "-c", code.format(extra=extra)],
+                                 cwd=modul_dir, capture_output=True, text=True, check=True)
+            zeiten.append(float(out.stdout.strip().splitlines()[-1]))
+        return statistics.median(zeiten[1:])
+
+    lazy, eager = messen(""), messen("coolMATH._alle_stacks_laden(); ")
+    return {"lazy_s": round(lazy, 3), "eager_s": round(eager, 3),
+            "ersparnis_s": round(eager - lazy, 3)}
+
+
+def db_benchmark(sessions=8, runden=25):
+    """
+    N Sessions (Threads) speichern und laden gleichzeitig, je Runde
+    db_save_project + db_projekte_seite + db_load_project. Verglichen wird das
+    frühere Verhalten (neue Verbindung je Aufruf, Rollback-Journal) mit dem
+    Pool (WAL, Pragmas), jeweils auf einer frischen Temp-Datenbank.
+    Rückgabe: {variante: {"s", "ops_s", "fehler", "verbindungen"}}
+    """
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    global DB_PATH
+    room_results, _, g_sums, selected_hw, selected_hw_ag = _benchmark_profil(5)
+    tab = ZonenTabelle(5)
+    zonen = tab.zonen("Altbau", "Mittel (Ziegel/Holz-Beton)", 2.5)
+    room_inputs = room_inputs_aus_zonen(zonen, tab.namen)
+    varianten = (("einzeln", lambda p: DBPool(p, groesse=0, pragmas={})), ("pool", DBPool))
+    ergebnis, db_path_alt = {}, DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            for variante, pool_fn in varianten:
+                DB_PATH = os.path.join(tmp, f"{variante}.db")
+                pool = pool_fn(DB_PATH)
+                _prozess_ressourcen()[f"db_pool:{os.path.abspath(DB_PATH)}"] = pool
+                db_init()
+                fehler = []
+
+                def session(s):
+                    for r in range(runden):
+                        firma = f"Firma {s % 3}"
+                        pid = db_save_project(firma, f"user{s}", f"Projekt {s}-{r}", "Kunde", "—",
+                                              room_inputs, room_results, g_sums, selected_hw,
+                                              selected_hw_ag, zonen=tab.als_dicts())
+                        db_projekte_seite(firma)
+                        if pid is None or db_load_project(pid) is None:
+                            fehler.append((s, r))
+
+                t0 = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=sessions) as ex:
+                    list(ex.map(session, range(sessions)))
+                dauer = time.perf_counter() - t0
+                ergebnis[variante] = {"s": round(dauer, 3),
+                                      "ops_s": round(3 * sessions * runden / dauer, 1),
+                                      "fehler": len(fehler), "verbindungen": pool.erstellt}
+                pool.schliessen()
+                _prozess_ressourcen().pop(f"db_pool:{os.path.abspath(DB_PATH)}", None)
+        finally:
+            DB_PATH = db_path_alt
+    return ergebnis
+
+
+def monday_testserver(rtt_s=0.02, item_s=0.002, budget=10_000_000, kosten_item=10_000, fenster_s=60):
+    """
+    Lokaler Stand-in für die Monday-API (Benchmark, Tests über api_url):
+    HTTP/1.1 mit Keep-alive; je Anfrage rtt_s Latenz, je neuer Verbindung
+    zusätzlich 2 × rtt_s (TCP- + TLS-Handshake), je geschriebenem Item item_s
+    Bearbeitungszeit. Hält ein Board im Speicher (server.board: id → {"name",
+    "spalten": {id: text}, "updated_at"}) und beantwortet create_item und
+    change_multiple_column_values (auch mit Aliasen), items_page /
+    next_items_page (Cursor, Regel auf __last_updated__),
+    items_page_by_column_values, complexity (budget Punkte je fenster_s
+    Sekunden, danach ComplexityException mit retry_in_seconds) und
+    Datei-Uploads. server.aendern(id, **texte) simuliert eine Änderung auf dem
+    Board; server.unklar = n: die nächsten n schreibenden Anfragen werden
+    ausgeführt, enden aber mit HTTP 502 (wie ein Timeout nach dem Anlegen).
+    → (server, api_url); server.anfragen /
+    server.verbindungen zählen mit, server.shutdown() beendet.
+    """
+    import re
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    lock = threading.Lock()
+    stand = {"id": 0, "rest": budget, "reset": time.monotonic() + fenster_s, "cursor": {}}
+
+    def jetzt_iso():
+        return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+    def schreiben(item_id, name, werte):
+        item = server.board.setdefault(item_id, {"name": "", "spalten": {}})
+        if name is not None:
+            item["name"] = name
+        item["spalten"].update({k: monday_spalten_text(v) for k, v in werte.items()})
+        item["updated_at"] = jetzt_iso()
+
+    def aendern(item_id, name=None, **texte):
+        with lock:
+            schreiben(str(item_id), name, texte)
+
+    def seite(ids, limit, spalten):
+        if len(ids) > limit:
+            cursor = f"c{len(stand['cursor']) + 1}"
+            stand["cursor"][cursor] = ids[limit:]
+        else:
+            cursor = None
+        return {"cursor": cursor, "items": [
+            {"id": i, "name": server.board[i]["name"], "updated_at": server.board[i]["updated_at"],
+             "column_values": [{"id": k, "text": t} for k, t in server.board[i]["spalten"].items()
+                               if not spalten or k in spalten]} for i in ids[:limit]]}
+
+    def graphql(query, v):
+        """→ (data, errors, Anzahl geschriebener Items)"""
+        data, errors = {}, []
+        aufrufe = re.findall(r"(\w+)\s*:\s*(create_item|change_multiple_column_values)\(", query)
+        if not aufrufe and "create_item" in query:            # create_item ohne Aliase/Variablen
+            name = re.search(r'item_name:\s*"((?:[^"\\]|\\.)*)"', query)
+            werte = re.search(r'column_values:\s*"((?:[^"\\]|\\.)*)"', query)
+            stand["id"] += 1
+            schreiben(str(stand["id"]), _json.loads(f'"{name.group(1)}"') if name else "",
+                      _json.loads(_json.loads(f'"{werte.group(1)}"')) if werte else {})
+            return {"create_item": {"id": str(stand["id"])}}, [], 1
+        for alias, feld in aufrufe:
+            i = alias[1:]
+            werte = _json.loads(v.get(f"column_values{i}") or "{}")
+            if feld == "create_item":
+                stand["id"] += 1
+                schreiben(str(stand["id"]), v[f"item_name{i}"], werte)
+                data[alias] = {"id": str(stand["id"])}
+            elif str(v[f"item_id{i}"]) in server.board:
+                schreiben(str(v[f"item_id{i}"]), werte.pop("name", None), werte)
+                data[alias] = {"id": str(v[f"item_id{i}"])}
+            else:
+                data[alias] = None
+                errors.append({"message": "Item not found", "path": [alias],
+                               "extensions": {"code": "InvalidItemIdException"}})
+        if "next_items_page" in query:
+            data["next_items_page"] = seite(stand["cursor"].pop(v["cursor"], []), v["limit"], v.get("spalten"))
+        elif "items_page_by_column_values" in query:
+            if v.get("cursor"):
+                ids = stand["cursor"].pop(v["cursor"], [])
+            else:
+                ids = sorted((i for i, item in server.board.items()
+                              if all(item["spalten"].get(r["column_id"]) in r["column_values"]
+                                     for r in v.get("werte") or [])), key=int)
+            data["items_page_by_column_values"] = seite(ids, v.get("limit", 25), v.get("ids"))
+        elif "items_page" in query:
+            seit = next((r["compare_value"][1] for r in v.get("regeln") or []
+                         if r["column_id"] == "__last_updated__"), "")
+            ids = sorted((i for i, item in server.board.items() if item["updated_at"] >= seit), key=int)
+            data["boards"] = [{"name": "coolMATH Test", "items_page": seite(ids, v.get("limit", 25), v.get("spalten"))}]
+        return data, errors, len(aufrufe)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True      # Kopf + Rumpf sofort (kein Delayed-ACK-Stau)
+
+        def log_message(self, *args):
+            pass
+
+        def setup(self):
+            super().setup()
+            with lock:
+                server.verbindungen += 1
+            time.sleep(2 * rtt_s)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            antwort = {"data": {"add_file_to_column": {"id": "1", "name": "datei"}}}
+            n = 0
+            if not self.path.endswith("/file"):
+                anfrage = _json.loads(body)
+                query, v = anfrage["query"], anfrage.get("variables") or {}
+                n = len(re.findall(r"create_item|change_multiple_column_values", query))
+                with lock:
+                    jetzt = time.monotonic()
+                    if jetzt >= stand["reset"]:
+                        stand["rest"], stand["reset"] = budget, jetzt + fenster_s
+                    kosten, reset = max(n, 1) * kosten_item, stand["reset"] - jetzt
+                    if kosten > stand["rest"]:
+                        antwort, n = {"errors": [{"message": "Complexity budget exhausted",
+                                                  "extensions": {"code": "ComplexityException",
+                                                                 "retry_in_seconds": round(reset, 3)}}]}, 0
+                    else:
+                        stand["rest"] -= kosten
+                        data, errors, n = graphql(query, v)
+                        if "complexity" in query:
+                            data["complexity"] = {"query": kosten, "after": stand["rest"],
+                                                  "reset_in_x_seconds": round(reset, 3)}
+                        antwort = {"data": data, **({"errors": errors} if errors else {})}
+            with lock:
+                server.anfragen += 1
+                status = 200
+                if n and server.unklar > 0:
+                    server.unklar -= 1
+                    status, antwort = 502, {"error": "Bad Gateway"}
+            time.sleep(rtt_s + n * item_s)
+            raw = _json.dumps(antwort).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.anfragen = server.verbindungen = server.unklar = 0
+    server.board = {}
+    server.aendern = aendern
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/v2"
+
+
+def monday_benchmark(items=200, batch=MONDAY_BATCH, rtt_ms=20.0, item_ms=2.0):
+    """
+    Items je Sekunde gegen monday_testserver(): neue Verbindung je Anfrage
+    (requests.post, Verhalten bis v44.31) / Keep-alive-Session mit einer
+    Mutation je Item / Session mit Batch-Mutationen (create_items).
+    Rückgabe: {variante: {"s", "items_s", "anfragen", "verbindungen"}}
+    """
+    requests = _http()
+    ergebnis = {}
+    for variante in ("einzeln", "session", "batch"):
+        server, url = monday_testserver(rtt_ms / 1000, item_ms / 1000)
+        session = requests if variante == "einzeln" else requests.Session()
+        mon = MondayIntegration("benchmark", "1", api_url=url, session=session, batch=batch)
+        mon.budget = MondayBudget()
+        spalten = [(f"Projekt {i}", {"color_mkncgyk5": {"label": "Angebot"}}) for i in range(items)]
+        try:
+            t0 = time.perf_counter()
+            if variante == "batch":
+                ids = mon.create_items(spalten)
+            else:
+                ids = [mon.create_item(name, cv, strikt=True) for name, cv in spalten]
+            dauer = time.perf_counter() - t0
+        finally:
+            if session is not requests:
+                session.close()
+            server.shutdown()
+            server.server_close()
+        ok = sum(isinstance(i, str) for i in ids)
+        ergebnis[variante] = {"s": round(dauer, 3), "items_s": round(ok / dauer, 1),
+                              "anfragen": server.anfragen, "verbindungen": server.verbindungen}
+    return ergebnis
+
+
+def pdf_benchmark(zonen=(5, 50), wiederholungen=3, workers=None):
+    """
+    Wandzeit je Technikübergabe-PDF (Median [s]) und Dateigröße [kB] für
+    verschiedene Zonenzahlen: PNG-Diagramme seriell / Prozess-Pool (jeweils leerer
+    Diagramm-Cache) / warmer Cache gegen Vektor-Diagramme (Standard). Der Pool
+    wird vorab gestartet (im Betrieb bleibt er prozessweit bestehen).
+    """
+    import statistics
+    import time
+    workers = workers or DIAGRAMM_WORKERS
+    render_diagramme(diagramm_jobs(*_benchmark_profil(2)[1:3]), workers=workers)  # Pool + Worker-Importe
+    ergebnis = []
+    for n in zonen:
+        room_results, individual_profiles, g_sums, selected_hw, selected_hw_ag = _benchmark_profil(n)
+        zeiten = {}
+        for modus, w, vektor in (("seriell", 1, False), ("parallel", workers, False),
+                                 ("cache", workers, False), ("vektor", 1, True)):
+            laeufe = []
+            for _ in range(wiederholungen):
+                if modus in ("seriell", "parallel"):
+                    diagramm_cache().clear()
+                t0 = time.perf_counter()
+                pdf = generate_uebergabe_pdf("Benchmark", "—", "—", "—", room_results, g_sums,
+                                             individual_profiles, [{}] * n, selected_hw,
+                                             sum(selected_hw), selected_hw_ag=selected_hw_ag,
+                                             vektor=vektor, workers=w)
+                laeufe.append(time.perf_counter() - t0)
+            zeiten[modus] = round(statistics.median(laeufe), 3)
+            zeiten["kb_vektor" if vektor else "kb_png"] = round(len(pdf) / 1024)
+        ergebnis.append({"zonen": n, "workers": workers, **zeiten})
+    return ergebnis
+
+
+def _benchmark_profil(n):
+    """Synthetisches Projekt mit n Standardzonen → Eingaben für die Berichtsgeneratoren"""
+    tab = ZonenTabelle(n)
+    zonen = tab.zonen("Altbau", "Mittel (Ziegel/Holz-Beton)", 2.5)
+    g_sums, individual_profiles, room_results, _ = zonen_ergebnisse(
+        calc_zonen_cached(zonen), tab.namen)
+    selected_hw = [device_label(r["PRAKTIKER"], safety=1.10)[0] for r in room_results]
+    return room_results, individual_profiles, g_sums, selected_hw, [("FJM", 0, "N.V.")] * n
+
+
+# Benchmark-Suite: Zeit je Aufruf gegen eine JSON-Baseline (CLI: bench)
+BENCH_BASELINE    = "coolmath_bench.json"
+BENCH_SCHWELLE    = 0.25       # Regression: > +25 % gegenüber der Baseline …
+BENCH_RAUSCHEN_MS = 0.02       # … und mindestens so viel langsamer (Mikro-Fälle)
+BENCH_PROBE_S     = 0.05       # Mindestdauer je Messprobe (kurze Fälle in Schleife)
+BENCH_REFERENZ_N  = 3          # Referenzläufe vor jeder Probe (Maschinentempo)
+
+
+def _bench_zonen(n):
+    """n unterschiedliche Zonen (Fläche, Fenster, Orientierung variieren → keine Cache-Duplikate)"""
+    tab = ZonenTabelle(n)
+    orient = list(Q_ORI_PRAK)
+    for i in range(n):
+        tab.setzen(i, area=12.0 + (i * 7) % 60, win_area=1.2 + (i % 9) * 0.4,
+                   orient=orient[i % len(orient)], pers=1 + i % 4, tech=100.0 + (i % 5) * 50)
+    return tab
+
+
+def _pipeline_lauf(tab):
+    """main() ohne Oberfläche bei leeren Caches: Kurven → Summen → Geräte → Auswahl → Preise"""
+    zonen_cache().clear()
+    geraete_cache().clear()
+    zonen = tab.zonen("Altbau", "Mittel (Ziegel/Holz-Beton)", 2.5)
+    room_inputs_aus_zonen(zonen, tab.namen)
+    g_sums, _, room_results, _ = zonen_ergebnisse(calc_zonen_cached(zonen), tab.namen)
+    spalten = ("VDI NEU", "VDI ALT", "RECKNAGEL", "PRAKTIKER", "KALTLUFTSEE", "KI HYBRID")
+    dim = geraete_dimensionieren([[r[m] for m in spalten] for r in room_results], safety=1.10)
+    guenstigste_serien(dim, spalten.index("PRAKTIKER"))
+    kat = geraete_katalog()
+    preis = 0.0
+    for zi, (r, serie) in enumerate(zip(room_results, tab.spalten["serie"])):
+        ig_kw, _, art_nr, _ = device_label(r["PRAKTIKER"], safety=1.10, serie=serie)
+        find_samsung_device(r["PRAKTIKER"], 1.10, serie)
+        ag_kw = default_fjm_ag(zi, ig_kw)
+        preis += kat.preis(art_nr, 0) + (kat.preis(kat.fjm_ag.passend(ag_kw)[0]["art_nr"], 0)
+                                         if ag_kw else 0)
+    return preis
+
+
+def _bench_physik():
+    z = _bench_zonen(1).zonen("Altbau", "Mittel (Ziegel/Holz-Beton)", 2.5)[0]
+    basis = (z["area"], z["orient"], z["standard"], z["glass"], z["shade"], z["pers"], z["tech"])
+    reck = calc_recknagel(*basis, z["win_area"])
+    zonen_50 = _bench_zonen(50).zonen("Altbau", "Mittel (Ziegel/Holz-Beton)", 2.5)
+    yield "physik.calc_praktiker", lambda: calc_praktiker(*basis), 1
+    yield "physik.calc_recknagel", lambda: calc_recknagel(*basis, z["win_area"]), 1
+    yield "physik.calc_vdi_alt", lambda: calc_vdi_alt(reck), 1
+    yield "physik.calc_vdi_neu", lambda: calc_vdi_neu(*basis, z["win_area"], z["bau_m"]), 1
+    yield "physik.calc_kaltluftsee", lambda: calc_kaltluftsee(*basis, z["win_area"], z["bau_m"],
+                                                              z["raumhoehe"]), 1
+    yield "physik.calc_ki_hybrid", lambda: calc_ki_hybrid(*basis, z["win_area"], z["bau_m"]), 1
+    yield "physik.calc_alle_methoden_batch_50", lambda: calc_alle_methoden_batch(zonen_50), 1
+
+    def zonen_kalt():
+        zonen_cache().clear()
+        return calc_zonen_cached(zonen_50)
+    yield "physik.calc_zonen_cached_50", zonen_kalt, 1
+    yield "physik.calc_zonen_cached_50_warm", lambda: calc_zonen_cached(zonen_50), 1
+
+
+def _bench_geraete():
+    peaks = np.linspace(500.0, 20000.0, 100)
+
+    def suche_kalt():
+        geraete_cache().clear()
+        for p in peaks:
+            find_samsung_device(p)
+    yield "geraete.find_samsung_device", suche_kalt, len(peaks)
+    yield "geraete.find_samsung_device_warm", lambda: [find_samsung_device(p) for p in peaks], len(peaks)
+    yield "geraete.device_label", lambda: [device_label(p) for p in peaks], len(peaks)
+
+
+def _bench_pipeline(zonen=(5, 50, 500)):
+    for n in zonen:
+        tab = _bench_zonen(n)
+        yield f"pipeline.zonen_{n}", lambda tab=tab: _pipeline_lauf(tab), 1
+
+
+def _bench_db(zeilen=10_000):
+    """Temp-Datenbank mit 'zeilen' Projekten (5 Zonen, mit Kurven), Pool wie im Betrieb"""
+    global DB_PATH
+    tab = _bench_zonen(5)
+    zonen = tab.zonen("Altbau", "Mittel (Ziegel/Holz-Beton)", 2.5)
+    kurven = calc_zonen_cached(zonen)
+    g_sums, _, room_results, _ = zonen_ergebnisse(kurven, tab.namen)
+    room_inputs = room_inputs_aus_zonen(zonen, tab.namen)
+    selected_hw = [device_label(r["PRAKTIKER"])[0] for r in room_results]
+    selected_hw_ag = [("FJM", 0, "N.V.")] * len(zonen)
+    zonen_peaks = [{m: r[s] for m, s in METHODEN_RESULT_KEYS.items() if s in r} for r in room_results]
+    gebaeude_peaks = {k: float(np.max(v)) for k, v in g_sums.items()}
+    geraete = _geraete_zeilen(selected_hw, selected_hw_ag)
+    db_path_alt, tmp = DB_PATH, tempfile.TemporaryDirectory()
+    DB_PATH = os.path.join(tmp.name, "bench.db")
+    try:
+        db_init()
+        t0 = datetime(2024, 1, 1)
+        with _db() as conn:
+            for i in range(zeilen):
+                erstellt = t0 + timedelta(minutes=37 * i)
+                _projekt_schreiben(conn, f"b{i:011d}", {
+                    "firma": f"Firma {i % 20}", "username": f"user{i % 50}",
+                    "projekt": f"Projekt {i}", "kunde": f"Kunde {i % 997}", "bearbeiter": "Bench",
+                    "datum": erstellt.strftime("%d.%m.%Y %H:%M"), "created_at": erstellt.isoformat()},
+                    {"standard": "Altbau"}, tab.als_dicts(), zonen_peaks, gebaeude_peaks, geraete, kurven)
+        seite, cursor = db_projekte_seite("Firma 3")
+        for _ in range(5):                          # Cursor der 6. Seite (Keyset, nicht OFFSET)
+            seite, cursor = db_projekte_seite("Firma 3", nach=cursor)
+        pid = seite[0][0]
+        yield "db.save_project", lambda: db_save_project(
+            "Firma 1", "bench", "Neu", "Kunde", "Bench", room_inputs, room_results, g_sums,
+            selected_hw, selected_hw_ag, zonen=tab.als_dicts(), kurven=kurven), 1
+        yield "db.projekte_seite", lambda: db_projekte_seite("Firma 3"), 1
+        yield "db.projekte_seite_tief", lambda: db_projekte_seite("Firma 3", nach=cursor), 1
+        yield "db.projekte_zaehlen", lambda: db_projekte_zaehlen("Firma 3"), 1
+        yield "db.projekte_suche", lambda: db_projekte_seite("", "admin", suche="Kunde 42"), 1
+        yield "db.load_project", lambda: db_load_project(pid), 1
+        yield "db.projekte_iter_alle", lambda: sum(1 for _ in db_projekte_iter("", "admin")), zeilen
+    finally:
+        pool = _prozess_ressourcen().pop(f"db_pool:{os.path.abspath(DB_PATH)}", None)
+        if pool is not None:
+            pool.schliessen()
+        DB_PATH = db_path_alt
+        tmp.cleanup()
+
+
+def _bench_export():
+    room_results, individual_profiles, g_sums, selected_hw, selected_hw_ag = _benchmark_profil(5)
+    tab = ZonenTabelle(5)
+    room_inputs = room_inputs_aus_zonen(tab.zonen("Altbau", "Mittel (Ziegel/Holz-Beton)", 2.5),
+                                        tab.namen)
+    recs = [{}] * len(room_results)
+    kopf = ("Benchmark", "Kunde", "Bearbeiter", "Firma")
+
+    def kalt(fn):
+        def lauf():
+            diagramm_cache().clear()
+            return fn()
+        return lauf
+    yield "export.kunden_pdf", kalt(lambda: generate_kunden_pdf(
+        *kopf, room_results, g_sums, individual_profiles, recs, selected_hw, sum(selected_hw),
+        selected_hw_ag=selected_hw_ag, room_inputs=room_inputs)), 1
+    yield "export.uebergabe_pdf", kalt(lambda: generate_uebergabe_pdf(
+        *kopf, room_results, g_sums, individual_profiles, recs, selected_hw, sum(selected_hw),
+        selected_hw_ag=selected_hw_ag, room_inputs=room_inputs)), 1
+    if is_docx_available():
+        yield "export.word_report", kalt(lambda: generate_word_report(
+            *kopf, room_results, g_sums, selected_hw, sum(selected_hw),
+            selected_hw_ag=selected_hw_ag, room_inputs=room_inputs)), 1
+    yield "export.excel_anfrage", lambda: generate_excel_anfrage(
+        *kopf, selected_hw, selected_hw_ag, tab.namen), 1
+
+
+def _bench_katalog():
+    yield "katalog.load_samsung_prices", load_samsung_prices, 1
+    yield "katalog.load_katalog", load_katalog, 1
+
+
+BENCH_GRUPPEN = {"physik": _bench_physik, "geraete": _bench_geraete, "pipeline": _bench_pipeline,
+                 "db": _bench_db, "export": _bench_export, "katalog": _bench_katalog}
+
+
+def _bench_referenz():
+    """Feste Referenzlast (Python-Schleife + numpy, ca. 1–2 ms) als Maßstab für das Maschinentempo"""
+    s = 0
+    for i in range(10_000):
+        s += i * i
+    a = np.arange(50_000.0)
+    return s + float(np.sort(a[::-1] * 0.5)[-1])
+
+
+def _bench_messen(fn, je=1, wiederholungen=7):
+    """
+    [ms je Operation] über 'wiederholungen' Proben nach einem Aufwärmlauf
+    (Lazy-Importe, Katalog); kurze Fälle laufen je Probe so oft, bis
+    BENCH_PROBE_S erreicht ist. Vor jeder Probe läuft die Referenzlast:
+    "rel" = Median von Probe / Referenz ist unabhängig davon, wie schnell die
+    (geteilte) Maschine gerade ist, und wird gegen die Baseline verglichen.
+    """
+    import statistics
+    t0 = time.perf_counter()
+    fn()
+    schleife = max(1, int(BENCH_PROBE_S / max(time.perf_counter() - t0, 1e-7)))
+    proben, relativ = [], []
+    for _ in range(wiederholungen):
+        t0 = time.perf_counter()
+        for _ in range(BENCH_REFERENZ_N):
+            _bench_referenz()
+        referenz = (time.perf_counter() - t0) / BENCH_REFERENZ_N
+        t0 = time.perf_counter()
+        for _ in range(schleife):
+            fn()
+        proben.append((time.perf_counter() - t0) * 1000 / (schleife * je))
+        relativ.append(proben[-1] / (referenz * 1000))
+    return {"ms": float(f"{statistics.median(proben):.4g}"), "min_ms": float(f"{min(proben):.4g}"),
+            "rel": float(f"{statistics.median(relativ):.4g}"), "n": schleife * wiederholungen * je}
+
+
+def benchmark_suite(nur=None, wiederholungen=7, zonen=(5, 50, 500), db_zeilen=10_000, progress=None):
+    """
+    Alle Fälle aus BENCH_GRUPPEN messen. nur: Gruppen oder Fallnamen als
+    Muster ("db", "export.*_pdf"); Gruppen ohne passenden Fall werden gar
+    nicht aufgebaut. → {fall: {"ms" (Median), "min_ms", "rel", "n"}}
+    """
+    import fnmatch
+    muster = list(nur or ["*"])
+
+    def passt(name):
+        return any(fnmatch.fnmatch(name, m) or fnmatch.fnmatch(name, f"{m}.*") for m in muster)
+
+    argumente = {"pipeline": (tuple(zonen),), "db": (db_zeilen,)}
+    ergebnis = {}
+    for gruppe, faelle in BENCH_GRUPPEN.items():
+        if not any(fnmatch.fnmatch(gruppe, m.split(".")[0]) for m in muster):
+            continue
+        for name, fn, je in faelle(*argumente.get(gruppe, ())):
+            if passt(name):
+                ergebnis[name] = _bench_messen(fn, je, wiederholungen)
+                if progress:
+                    progress(name, ergebnis[name])
+    return ergebnis
+
+
+def bench_umgebung():
+    import platform
+    return {"python": platform.python_version(), "numpy": np.__version__,
+            "plattform": platform.platform(), "cpus": os.cpu_count(), "app": APP_VERSION}
+
+
+def bench_baseline_laden(pfad=BENCH_BASELINE):
+    """Gespeicherte Baseline oder None (Datei fehlt/ungültig)"""
+    try:
+        with open(pfad, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def bench_baseline_speichern(ergebnisse, pfad=BENCH_BASELINE, schwelle=BENCH_SCHWELLE):
+    """Ergebnisse als Baseline sichern; bestehende Fälle, die nicht gemessen wurden, bleiben"""
+    alt = bench_baseline_laden(pfad) or {}
+    daten = {"erstellt": datetime.now().isoformat(timespec="seconds"), "umgebung": bench_umgebung(),
+             "schwelle": schwelle, "ergebnisse": {**alt.get("ergebnisse", {}), **ergebnisse}}
+    tmp = f"{pfad}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(daten, f, indent=2, sort_keys=True)
+    os.replace(tmp, pfad)
+
+
+def bench_vergleichen(ergebnisse, baseline, schwelle=None):
+    """
+    Gegen die Baseline: Regression, wenn der Faktor (rel, ohne Referenz ms)
+    über 1 + schwelle liegt und das mindestens BENCH_RAUSCHEN_MS ausmacht.
+    schwelle None → aus der Baseline.
+    → [(fall, ms, baseline_ms oder None, faktor oder None, "ok"|"neu"|"besser"|"REGRESSION")]
+    """
+    alt = (baseline or {}).get("ergebnisse", {})
+    schwelle = (baseline or {}).get("schwelle", BENCH_SCHWELLE) if schwelle is None else schwelle
+    zeilen = []
+    for name, r in ergebnisse.items():
+        a = alt.get(name, {})
+        b = a.get("ms")
+        if not b:
+            zeilen.append((name, r["ms"], None, None, "neu"))
+            continue
+        faktor = r["rel"] / a["rel"] if r.get("rel") and a.get("rel") else r["ms"] / b
+        if faktor > 1 + schwelle and b * (faktor - 1) > BENCH_RAUSCHEN_MS:
+            status = "REGRESSION"
+        elif faktor < 1 / (1 + schwelle):
+            status = "besser"
+        else:
+            status = "ok"
+        zeilen.append((name, r["ms"], b, faktor, status))
+    return zeilen
+
+
+def cli(argv=None):
+    """Kommandozeile (ohne Streamlit-Oberfläche)"""
+    import argparse
+    import time
+    ap = argparse.ArgumentParser(prog="coolMATH.py",
+                                 description="coolMATH Pro — headless Berechnung")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("batch", help="Projekte aus CSV/JSON rechnen → Übergabe-JSON je Projekt")
+    b.add_argument("eingabe", help="Projekte als .csv (eine Zeile je Zone) oder .json")
+    b.add_argument("--out", default="coolmath_batch", help="Ausgabeordner")
+    b.add_argument("--workers", type=int, default=None, help="Prozesse (Standard: alle Kerne)")
+    z = sub.add_parser("startzeit", help="Kaltstart-Benchmark: Importzeit lazy vs. eager")
+    z.add_argument("-n", type=int, default=5, help="Wiederholungen je Variante")
+    pb = sub.add_parser("pdfbench", help="Wandzeit/Größe je Technikübergabe-PDF: PNG seriell/Pool/Cache vs. Vektor")
+    pb.add_argument("--zonen", type=int, nargs="+", default=[5, 50], help="Zonenzahlen")
+    pb.add_argument("-n", type=int, default=3, help="Wiederholungen je Variante")
+    pb.add_argument("--workers", type=int, default=None,
+                    help=f"Render-Prozesse (Standard: {DIAGRAMM_WORKERS})")
+    db = sub.add_parser("dbbench", help="Nebenläufigkeit: N Sessions speichern/laden gleichzeitig")
+    db.add_argument("--sessions", type=int, default=8, help="gleichzeitige Sessions (Threads)")
+    db.add_argument("--runden", type=int, default=25, help="Speichern+Laden je Session")
+    ax = sub.add_parser("archiv", help="Sammel-Export archivierter Projekte → ZIP (PDFs, Excel, JSON)")
+    ax.add_argument("ziel", help="ZIP-Datei")
+    ax.add_argument("--firma", default=None, help="nur Projekte dieser Firma (Standard: alle)")
+    ax.add_argument("--von", default=None, help="gespeichert ab (JJJJ-MM-TT)")
+    ax.add_argument("--bis", default=None, help="gespeichert bis einschließlich (JJJJ-MM-TT)")
+    ax.add_argument("--suche", default="", help="Text in Projekt/Kunde/Bearbeiter")
+    ax.add_argument("--min-kw", type=float, default=None,
+                    help="nur Projekte mit Gebäude-Simultanpeak VDI 6007 ab x kW")
+    ax.add_argument("--workers", type=int, default=None, help="Prozesse (Standard: alle Kerne)")
+    mb = sub.add_parser("mondaybench", help="Items/s gegen lokalen Monday-Stand-in: je Anfrage / Session / Batch")
+    mb.add_argument("--items", type=int, default=200, help="anzulegende Items je Variante")
+    mb.add_argument("--batch", type=int, default=MONDAY_BATCH, help="Items je Batch-Mutation")
+    mb.add_argument("--rtt-ms", type=float, default=20.0, help="simulierte Latenz je Anfrage [ms]")
+    mb.add_argument("--item-ms", type=float, default=2.0, help="Bearbeitungszeit je Item [ms]")
+    ob = sub.add_parser("outbox", help="Monday-Warteschlange: Status, fällige Aufträge abarbeiten")
+    ob.add_argument("--abarbeiten", action="store_true", help="fällige Aufträge jetzt senden")
+    ob.add_argument("--wiederholen", action="store_true", help="fehlgeschlagene erneut einplanen")
+    ob.add_argument("--archiv", action="store_true",
+                    help="archivierte Projekte ohne Monday-Item einreihen (Massen-Abgleich)")
+    ob.add_argument("--firma", default=None, help="mit --archiv: nur Projekte dieser Firma")
+    ob.add_argument("--ohne-pdf", action="store_true", help="mit --archiv: nur Items, keine PDFs")
+    ob.add_argument("--abgleich", action="store_true",
+                    help="Board ↔ Projektdatenbank jetzt inkrementell abgleichen")
+    bs = sub.add_parser("bench", help="Benchmark-Suite (Physik, Geräte, Pipeline, DB, Exporte, Katalog) "
+                                      "gegen JSON-Baseline, Exit 1 bei Regression")
+    bs.add_argument("--nur", nargs="+", default=None,
+                    help="Gruppen/Fälle als Muster, z. B. physik db.projekte_* export.*_pdf")
+    bs.add_argument("-n", type=int, default=7, help="Messproben je Fall (verglichen wird der Median Probe / Referenzlast, rel)")
+    bs.add_argument("--zonen", type=int, nargs="+", default=[5, 50, 500], help="Zonenzahlen der Pipeline")
+    bs.add_argument("--db-zeilen", type=int, default=10_000, help="Projekte in der Benchmark-Datenbank")
+    bs.add_argument("--baseline", default=BENCH_BASELINE, help="Baseline-Datei (JSON)")
+    bs.add_argument("--schwelle", type=float, default=None,
+                    help=f"zulässige Verlangsamung, z. B. 0.25 = +25 %% (Standard: aus Baseline, "
+                         f"sonst {BENCH_SCHWELLE})")
+    bs.add_argument("--speichern", action="store_true",
+                    help="Ergebnisse als neue Baseline übernehmen (kein Fehlerstatus)")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "batch":
+        t0 = time.perf_counter()
+        try:
+            projekte = load_batch_projekte(args.eingabe)
+        except ValueError as e:
+            print(f"FEHLER {args.eingabe}: {e}", file=sys.stderr)
+            return 2
+        ergebnisse = run_batch(projekte, args.out, args.workers)
+        fehler = [(i, pfad, err) for i, pfad, err in ergebnisse if err]
+        for i, pfad, err in fehler:
+            print(f"FEHLER Projekt {i + 1} ({pfad}): {err}", file=sys.stderr)
+        print(f"{len(ergebnisse) - len(fehler)}/{len(ergebnisse)} Projekte → {args.out} "
+              f"({time.perf_counter() - t0:.1f} s)")
+        return 1 if fehler else 0
+    if args.cmd == "startzeit":
+        r = startzeit_benchmark(args.n)
+        print(f"Import lazy:  {r['lazy_s']:.3f} s\n"
+              f"Import eager: {r['eager_s']:.3f} s (alle Stacks wie bis v44.15)\n"
+              f"Ersparnis:    {r['ersparnis_s']:.3f} s")
+        return 0
+    if args.cmd == "pdfbench":
+        print(f"{'Zonen':>6} {'Workers':>8} {'PNG ser.':>9} {'PNG Pool':>9} {'PNG Cache':>10} "
+              f"{'Vektor':>9} {'kB PNG':>8} {'kB Vektor':>10}")
+        for r in pdf_benchmark(args.zonen, args.n, args.workers):
+            print(f"{r['zonen']:>6} {r['workers']:>8} {r['seriell']:>8.2f}s {r['parallel']:>8.2f}s "
+                  f"{r['cache']:>9.2f}s {r['vektor']:>8.2f}s {r['kb_png']:>8} {r['kb_vektor']:>10}")
+        return 0
+    if args.cmd == "dbbench":
+        print(f"{'Variante':>9} {'Dauer':>8} {'Ops/s':>8} {'Fehler':>7} {'Verbindungen':>13}")
+        for name, r in db_benchmark(args.sessions, args.runden).items():
+            print(f"{name:>9} {r['s']:>7.2f}s {r['ops_s']:>8.1f} {r['fehler']:>7} {r['verbindungen']:>13}")
+        return 0
+    if args.cmd == "archiv":
+        t0 = time.perf_counter()
+        db_init()                            # Schema anlegen / migrieren wie im UI
+        r = archiv_export(args.ziel, args.firma, "partner" if args.firma else "admin",
+                          args.von, args.bis, args.suche,
+                          args.min_kw * 1000 if args.min_kw else None, args.workers)
+        for f in r["fehler"]:
+            print(f"FEHLER {f}", file=sys.stderr)
+        print(f"{r['projekte'] - len(r['fehler'])}/{r['projekte']} Projekte → {args.ziel} "
+              f"({time.perf_counter() - t0:.1f} s)")
+        return 1 if r["fehler"] else 0
+    if args.cmd == "mondaybench":
+        print(f"{'Variante':>9} {'Dauer':>8} {'Items/s':>8} {'Anfragen':>9} {'Verbindungen':>13}")
+        for name, r in monday_benchmark(args.items, args.batch, args.rtt_ms, args.item_ms).items():
+            print(f"{name:>9} {r['s']:>7.2f}s {r['items_s']:>8.1f} {r['anfragen']:>9} {r['verbindungen']:>13}")
+        return 0
+    if args.cmd == "bench":
+        baseline = bench_baseline_laden(args.baseline)
+        print(f"{'Fall':<36} {'ms':>10} {'Baseline':>10} {'Faktor':>7}  Status")
+
+        def zeile(name, r):
+            _, ms, b, faktor, status = bench_vergleichen({name: r}, baseline, args.schwelle)[0]
+            print(f"{name:<36} {ms:>10.4g} {b if b else '—':>10} "
+                  f"{f'{faktor:.2f}' if faktor else '—':>7}  {status}", flush=True)
+        ergebnisse = benchmark_suite(args.nur, args.n, args.zonen, args.db_zeilen, progress=zeile)
+        regressionen = [z for z in bench_vergleichen(ergebnisse, baseline, args.schwelle)
+                        if z[-1] == "REGRESSION"]
+        if regressionen and not args.speichern:
+            # Bestätigen: auffällige Fälle ein zweites Mal messen, der bessere Lauf zählt
+            print(f"{len(regressionen)} auffällige(r) Fall/Fälle — Wiederholung …")
+            erneut = benchmark_suite([z[0] for z in regressionen], args.n, args.zonen,
+                                     args.db_zeilen, progress=zeile)
+            for name, r in erneut.items():
+                if r["rel"] < ergebnisse[name]["rel"]:
+                    ergebnisse[name] = r
+            regressionen = [z for z in bench_vergleichen(ergebnisse, baseline, args.schwelle)
+                            if z[-1] == "REGRESSION"]
+        if baseline and baseline.get("umgebung") != bench_umgebung():
+            print(f"Hinweis: Baseline aus anderer Umgebung ({baseline.get('umgebung')})", file=sys.stderr)
+        if args.speichern or baseline is None:
+            bench_baseline_speichern(ergebnisse, args.baseline,
+                                     args.schwelle if args.schwelle is not None else BENCH_SCHWELLE)
+            print(f"Baseline {'aktualisiert' if baseline else 'angelegt'}: {args.baseline}")
+            return 0
+        for name, ms, b, faktor, _ in regressionen:
+            print(f"REGRESSION {name}: {ms:.4g} ms statt {b:.4g} ms (×{faktor:.2f})", file=sys.stderr)
+        return 1 if regressionen else 0
+    if args.cmd == "outbox":
+        db_init()
+        if args.wiederholen:
+            print(f"{db_outbox_wiederholen()} Auftrag/Aufträge erneut eingeplant")
+        if args.archiv:
+            print(f"{db_outbox_archiv(args.firma, not args.ohne_pdf)} Projekt(e) eingereiht")
+        if args.abarbeiten:
+            print(f"{MondayOutbox().abarbeiten()} Auftrag/Aufträge bearbeitet")
+        if args.abgleich:
+            r = monday_abgleich()
+            print(f"Abgleich: {r['gelesen']} gelesen, {r['aktualisiert']} Projekt(e) aktualisiert, "
+                  f"{r['gesendet']} Item(s) korrigiert")
+            for text in r["fehler"]:
+                print(f"FEHLER {text}", file=sys.stderr)
+        zaehler = db_outbox_zaehlen()
+        print("  ".join(f"{s}: {zaehler.get(s, 0)}" for s in OUTBOX_STATUS))
+        for pid, projekt, versuche, fehler in db_outbox_fehler():
+            print(f"FEHLER {pid} {projekt} ({versuche} Versuche): {fehler}", file=sys.stderr)
+        return 0
+    return 2
+
+
+CLI_BEFEHLE = ("batch", "startzeit", "pdfbench", "dbbench", "archiv", "outbox", "mondaybench", "bench")
+
+
+def bericht_erstellen(schluessel, label, gestartet, erzeugen, einheit="Diagramm"):
+    """
+    Führt erzeugen(progress=...) mit Fortschrittsbalken und Abbrechen-Button aus,
+    wenn gestartet (Button-Klick). Ein Klick auf 'Abbrechen' löst einen Rerun aus:
+    Streamlit unterbricht das Skript beim nächsten Fortschritts-Update und
+    render_diagramme() verwirft die offenen Jobs; der Folgelauf zeigt einen Hinweis.
+    Rückgabe: Ergebnis von erzeugen() oder None
+    """
+    marker = f"bericht_laeuft_{schluessel}"
+    if not gestartet:
+        if st.session_state.pop(marker, False):
+            st.info("⏹️ Berichtserstellung abgebrochen.")
+        return None
+    platz = st.empty()
+    with platz.container():
+        balken = st.progress(0.0, text=label)
+        st.button("✖ ABBRECHEN", key=f"abbruch_{schluessel}", width="stretch")
+
+    def progress(fertig, gesamt):
+        balken.progress(min(fertig / gesamt, 1.0) if gesamt else 1.0,
+                        text=f"{label} — {einheit} {fertig}/{gesamt}")
+
+    st.session_state[marker] = True
+    try:
+        daten = erzeugen(progress=progress)
+    except Exception:
+        st.session_state.pop(marker, None)
+        platz.empty()
+        raise
+    # Rerun-Abbruch (BaseException) lässt den Marker stehen → Hinweis im Folgelauf
+    st.session_state.pop(marker, None)
+    platz.empty()
+    return daten
+
+
+def zeitspuren_wasserfall(lauf, details=True):
+    """Plotly-Wasserfall eines Laufs: je Span ein Balken ab Startzeit (Tiefe eingerückt, × = gesammelt)"""
+    import plotly.graph_objects as go
+    spans = [s for s in lauf["spans"] if details or s["tiefe"] == 0]
+    farben = [CI_BLUE, "#F39C12", "#2ECC71", "#E74C3C", "#9B59B6"]
+    fig = go.Figure(go.Bar(
+        y=list(range(len(spans))), x=[max(s["dauer_ms"], 0.05) for s in spans],
+        base=[s["start_ms"] for s in spans], orientation="h",
+        marker_color=[farben[s["tiefe"] % len(farben)] for s in spans],
+        customdata=[[s["name"], s["dauer_ms"], s["anzahl"]] for s in spans],
+        hovertemplate="%{customdata[0]}: %{customdata[1]:.1f} ms (%{customdata[2]}×)<extra></extra>"))
+    fig.update_layout(
+        height=60 + 16 * len(spans), margin=dict(l=0, r=0, t=10, b=30), showlegend=False,
+        paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", bargap=0.25,
+        xaxis=dict(title="ms", range=[0, lauf["dauer_ms"] * 1.02], gridcolor="rgba(128,128,128,0.2)"),
+        yaxis=dict(tickvals=list(range(len(spans))), autorange="reversed", tickfont=dict(size=10),
+                   ticktext=["· " * s["tiefe"] + s["name"] + (f" ×{s['anzahl']}" if s["anzahl"] > 1 else "")
+                             for s in spans]))
+    return fig
+
+
+def zeitspuren_panel(laeufe):
+    """Admin-Sidebar: Wasserfall der letzten Läufe, Abschnitte im Vergleich, JSON-Export"""
+    import statistics
+    if not laeufe:
+        return
+    with st.sidebar.expander(f"⏱️ Zeitspuren — letzter Lauf {laeufe[-1]['dauer_ms']:.0f} ms"):
+        nr = st.selectbox(
+            "Lauf", [l["lauf"] for l in reversed(laeufe)], key="zeitspuren_lauf",
+            format_func=lambda n: next(f"#{l['lauf']} · {l['zeit'][11:19]} · {l['dauer_ms']:.0f} ms"
+                                       + (" (abgebrochen)" if l.get("abgebrochen") else "")
+                                       for l in laeufe if l["lauf"] == n))
+        lauf = next((l for l in laeufe if l["lauf"] == nr), laeufe[-1])
+        details = st.checkbox("Verschachtelte Spans (DB, Export, Geräte, Rechengraph)", value=True,
+                              key="zeitspuren_details")
+        st.plotly_chart(zeitspuren_wasserfall(lauf, details), width="stretch",
+                        config={"displayModeBar": False})
+        abschnitte = {}
+        for l in laeufe:
+            for s in l["spans"]:
+                if s["tiefe"] == 0:
+                    abschnitte.setdefault(s["name"], {})[l["lauf"]] = s["dauer_ms"]
+        st.caption(f"Hauptabschnitte über die letzten {len(laeufe)} Läufe [ms]")
+        st.dataframe([{"Abschnitt": name, "Lauf": round(werte.get(lauf["lauf"], 0.0), 1),
+                       "Median": round(statistics.median(werte.values()), 1),
+                       "Max": round(max(werte.values()), 1)}
+                      for name, werte in abschnitte.items()], width="stretch", hide_index=True)
+        st.download_button("⬇️ Zeitspuren (JSON)", zeitspuren_json(laeufe),
+                           file_name=f"coolmath_zeitspuren_{datetime.now():%Y%m%d_%H%M%S}.json",
+                           mime="application/json", width="stretch")
+
+
+def main():
+    # Zeitspuren: Abschnitte dieses Laufs (Admin-Sidebar, JSON-Export)
+    spuren = zeitspuren_beginnen()
+    spuren.abschnitt("setup")
+
+    # --- LOGIN DISABLED ---
+    # auth_ok, auth_user = check_login()
+    # if not auth_ok:
+    #     return
+    auth_role     = "admin"
+    auth_username = "demo"
+    partner_firma = "°coolsulting"  # Wird später aus Input überschrieben
+
+    # Sidebar (Warteschlange, Abgleich, Zeitspuren) nur mit COOLMATH_ADMIN_PANEL
+    admin_panel = auth_role == "admin" and admin_panel_aktiv()
+    setup_page(sidebar=admin_panel)
+    db_init()
+    monday_outbox()                      # Hintergrund-Upload (offene Aufträge nach Neustart)
+
+    # --- HEADER (Bug-freier Aufbau) ---
+    # Logout in Sidebar
+    spuren.abschnitt("sidebar")
+    with st.sidebar:
+        st.markdown(f"**👤 {auth_username}**")
         st.markdown(f"*{partner_firma}*")
         if st.button("🚪 Logout"):
             st.session_state.auth_ok = False
             st.rerun()
         st.markdown("---")
+        _cs = cache_statistik()
+        st.caption(f"⚡ Zonen-Cache: {_cs['zonen']['hits']} Treffer / "
+                   f"{_cs['zonen']['misses']} neu · Geräte-Cache: "
+                   f"{_cs['geraete']['hits']} / {_cs['geraete']['misses']} · Diagramme: "
+                   f"{_cs['diagramme']['hits']} / {_cs['diagramme']['misses']} "
+                   f"({_cs['diagramme']['bytes'] / 1e6:.1f} MB)")
+        _mq = db_outbox_zaehlen() if admin_panel else {}
+        if _mq.get("offen", 0) + _mq.get("laeuft", 0) + _mq.get("fehler", 0):
+            st.caption(f"📤 Monday-Warteschlange: {_mq.get('offen', 0) + _mq.get('laeuft', 0)} "
+                       f"ausstehend · {_mq.get('fehler', 0)} fehlgeschlagen · "
+                       f"{_mq.get('fertig', 0)} übertragen")
+            if _mq.get("fehler") and st.button("🔁 Fehlgeschlagene erneut senden"):
+                db_outbox_wiederholen()
+                monday_outbox().wecken()
+                st.rerun()
+        _mb = get_monday_secrets()[1] if admin_panel else None
+        if _mb:
+            _stand = db_sync_stand(_mb)
+            st.caption(f"🔄 Monday-Abgleich: Stand {_stand.replace('T', ' ')[:16] + ' UTC' if _stand else '—'}")
+            if st.button("🔄 Jetzt abgleichen"):
+                try:
+                    _r = monday_abgleich()
+                    st.toast(f"{_r['gelesen']} gelesen · {_r['aktualisiert']} aktualisiert · "
+                             f"{_r['gesendet']} korrigiert" + (f" · {len(_r['fehler'])} Fehler" if _r["fehler"] else ""))
+                except Exception as e:
+                    st.error(f"Monday-Abgleich fehlgeschlagen: {e}")
         st.caption(f"© 2026 °coolsulting")
+    spuren.abschnitt("header")
     col_hdr, col_logo = st.columns([4, 1])
     with col_hdr:
         st.markdown(
@@ -2320,6 +6754,7 @@ def main():
     
     st.write("---")
     
+    spuren.abschnitt("projekt_eingaben")
     # --- PROJEKT KONFIGURATION ---
     # Geladene Projektdaten auslesen
     loaded = st.session_state.get('loaded_project', None)
@@ -2366,95 +6801,103 @@ def main():
     raumhoehe = gp3.number_input("RAUMHOEHE [m]", 2.0, 6.0, 2.5, step=0.1)
     
     # --- ZONEN KONFIGURATION ---
-    st.markdown('<div class="section-header">🏠 Zonen-Konfiguration (bis 5 Räume)</div>', 
+    st.markdown('<div class="section-header">🏠 Zonen-Konfiguration</div>', 
                 unsafe_allow_html=True)
-    
-    tabs = st.tabs([f"ZONE {i+1}" for i in range(5)])
-    def_ori = ["SUED", "SUED", "SUED", "SUED", "SUED"]
-    
-    # Ergebnis-Container
-    g_sums = {k: np.zeros(24) for k in ["VDI_N", "VDI_A", "PRAK", "RECK", "KLTS", "KI"]}
-    individual_profiles = []
-    room_results        = []
-    room_inputs_list    = []
-    samsung_recs        = []
-    
-    for i, tab in enumerate(tabs):
-        with tab:
-            st.markdown('<div class="card">', unsafe_allow_html=True)
-            
-            rc1, rc2, rc3, rc4 = st.columns(4)
-            r_name  = rc1.text_input("Bezeichnung", f"Raum {i+1}", key=f"rn{i}")
-            area    = rc2.number_input("Flaeche [m²]", 5.0, 500.0, 50.0 if i==0 else 20.0, key=f"ar{i}")
-            win     = rc3.number_input("Fenster [m²]", 0.0, 150.0, 2.4, key=f"wi{i}")
-            orient  = rc4.selectbox("Ausrichtung", list(SOLAR_DB.keys()),
-                                     index=list(SOLAR_DB.keys()).index(def_ori[i]), key=f"or{i}")
-            
-            rc5, rc6, rc7, rc8 = st.columns(4)
-            glass   = rc5.selectbox("Glas", ["Einfach", "Doppel", "Dreifach", "Sonnenschutz"], 
-                                     index=0, key=f"gl{i}")
-            shade   = rc6.selectbox("Sonnenschutz", 
-                                     ["Keine", "Vorhang (Innen)", "Raffstore (Aussen)", "Rollladen"], 
-                                     index=1, key=f"sh{i}")
-            pers    = rc7.slider("Personen", 0, 15, 2, key=f"pe{i}")
-            tech    = rc8.number_input("Technik [W]", 0.0, 10000.0, 200.0, key=f"te{i}")
-            
-            st.markdown('</div>', unsafe_allow_html=True)
-            
-            # ---- BERECHNUNGEN ----
-            u, g, fc = get_phys_constants(bau_std, glass, shade)
-            
-            c_reck   = calc_recknagel(area, orient, bau_std, glass, shade, pers, tech, win)
-            c_vdi_a  = calc_vdi_alt(c_reck)
-            c_vdi_n  = calc_vdi_neu(area, orient, bau_std, glass, shade, pers, tech, win, bau_m)
-            c_prak   = calc_praktiker(area, orient, bau_std, glass, shade, pers, tech)
-            c_klts   = calc_kaltluftsee(area, orient, bau_std, glass, shade, pers, tech, win, bau_m, raumhoehe)
-            c_ki     = calc_ki_hybrid(area, orient, bau_std, glass, shade, pers, tech, win, bau_m)
-            
-            # Summierung
-            g_sums["RECK"]  += c_reck
-            g_sums["VDI_A"] += c_vdi_a
-            g_sums["VDI_N"] += c_vdi_n
-            g_sums["PRAK"]  += c_prak
-            g_sums["KLTS"]  += c_klts
-            g_sums["KI"]    += c_ki
-            
-            individual_profiles.append({
-                "name":  r_name,
-                "reck":  c_reck,
-                "vdi_a": c_vdi_a,
-                "vdi_n": c_vdi_n,
-                "prak":  c_prak,
-                "klts":  c_klts,
-                "ki":    c_ki,
-            })
-            
-            # Samsung Empfehlung (auf Basis VDI Neu)
-            peak_vdi = int(np.max(c_vdi_n))
-            primary, alt = find_samsung_device(peak_vdi)
-            samsung_recs.append({"zone": r_name, "primary": primary, "alt": alt, "peak_w": peak_vdi})
-            
-            # Eingabedaten erfassen
-            room_inputs_list.append({
-                "name":        r_name,
-                "flaeche":     area,
-                "hoehe":       raumhoehe,
-                "personen":    pers,
-                "fenster":     win,
-                "orientierung": orient,
-                "nutzung":     glass,
-                "u_wert":      u,
-            })
-            room_results.append({
-                "ZONE":       r_name,
-                "VDI NEU":    peak_vdi,
-                "VDI ALT":    int(np.max(c_vdi_a)),
-                "RECKNAGEL":  int(np.max(c_reck)),
-                "PRAKTIKER":  int(np.max(c_prak)),
-                "KALTLUFTSEE":int(np.max(c_klts)),
-                "KI HYBRID":  int(np.max(c_ki)),
+    GLAS_OPTIONEN     = list(G_WERTE)
+    SCHATTEN_OPTIONEN = list(FC_WERTE)
+
+    # Spaltenorientierte Zonentabelle (überlebt Reruns in der Session)
+    tabelle = st.session_state.get("zonen_tabelle")
+    if tabelle is None:
+        tabelle = st.session_state["zonen_tabelle"] = ZonenTabelle()
+    neue_zonen = st.session_state.pop("zonen_laden", None)   # Archiv / CSV-Import
+    if neue_zonen is not None:
+        tabelle = st.session_state["zonen_tabelle"] = neue_zonen
+        st.session_state["n_zonen"] = len(neue_zonen)
+        _zonen_widgets_zuruecksetzen()
+
+    zk1, zk2 = st.columns([1, 3])
+    n_zonen = int(zk1.number_input("ANZAHL ZONEN", 1, ZONEN_MAX, len(tabelle), key="n_zonen"))
+    tabelle.anzahl_setzen(n_zonen)
+    zonen_csv = zk2.file_uploader("ZONENLISTE IMPORTIEREN (CSV: name; area; orient; win_area; glass; "
+                                  "shade; pers; tech; serie)", type=["csv"], key="zonen_csv")
+    if zonen_csv is not None and st.session_state.get("zonen_csv_id") != zonen_csv.file_id:
+        try:
+            st.session_state["zonen_laden"] = load_zonenliste(zonen_csv)
+            st.session_state["zonen_csv_id"] = zonen_csv.file_id
+            st.rerun()
+        except ValueError as e:
+            st.error(f"Zonenliste: {e}")
+
+    if n_zonen <= ZONEN_TABS_MAX:
+        # Wenige Räume: ein Tab je Zone
+        tabs = st.tabs([f"ZONE {i+1}" for i in range(n_zonen)])
+        for i, tab in enumerate(tabs):
+            z = tabelle.zeile(i)
+            with tab:
+                st.markdown('<div class="card">', unsafe_allow_html=True)
+
+                rc1, rc2, rc3, rc4 = st.columns(4)
+                r_name  = rc1.text_input("Bezeichnung", z["name"], key=f"rn{i}")
+                area    = rc2.number_input("Flaeche [m²]", 5.0, 500.0, z["area"], key=f"ar{i}")
+                win     = rc3.number_input("Fenster [m²]", 0.0, 150.0, z["win_area"], key=f"wi{i}")
+                orient  = rc4.selectbox("Ausrichtung", list(SOLAR_DB.keys()),
+                                         index=list(SOLAR_DB.keys()).index(z["orient"]), key=f"or{i}")
+
+                rc5, rc6, rc7, rc8 = st.columns(4)
+                glass   = rc5.selectbox("Glas", GLAS_OPTIONEN,
+                                         index=GLAS_OPTIONEN.index(z["glass"]), key=f"gl{i}")
+                shade   = rc6.selectbox("Sonnenschutz", SCHATTEN_OPTIONEN,
+                                         index=SCHATTEN_OPTIONEN.index(z["shade"]), key=f"sh{i}")
+                pers    = rc7.slider("Personen", 0, 15, z["pers"], key=f"pe{i}")
+                tech    = rc8.number_input("Technik [W]", 0.0, 10000.0, z["tech"], key=f"te{i}")
+
+                st.markdown('</div>', unsafe_allow_html=True)
+            tabelle.setzen(i, name=r_name, area=area, win_area=win, orient=orient,
+                           glass=glass, shade=shade, pers=pers, tech=tech)
+    else:
+        # Viele Räume: seitenweiser Tabellen-Editor über der Zonentabelle
+        n_seiten = -(-n_zonen // ZONEN_SEITE)
+        z_seite = st.selectbox(
+            "SEITE", range(n_seiten), key="zonen_seite",
+            format_func=lambda p: f"Zone {p * ZONEN_SEITE + 1}–{min(n_zonen, (p + 1) * ZONEN_SEITE)}"
+                                  f" von {n_zonen}")
+        start = z_seite * ZONEN_SEITE
+        felder = ["name", "area", "win_area", "orient", "glass", "shade", "pers", "tech"]
+        edit = st.data_editor(
+            tabelle.seite(start, min(n_zonen, start + ZONEN_SEITE), felder),
+            key=f"zonen_editor_{z_seite}", hide_index=True, num_rows="fixed", width="stretch",
+            column_config={
+                "name":     st.column_config.TextColumn("Bezeichnung", required=True),
+                "area":     st.column_config.NumberColumn("Flaeche [m²]", min_value=5.0, max_value=500.0),
+                "win_area": st.column_config.NumberColumn("Fenster [m²]", min_value=0.0, max_value=150.0),
+                "orient":   st.column_config.SelectboxColumn("Ausrichtung", options=list(SOLAR_DB.keys()),
+                                                             required=True),
+                "glass":    st.column_config.SelectboxColumn("Glas", options=GLAS_OPTIONEN, required=True),
+                "shade":    st.column_config.SelectboxColumn("Sonnenschutz", options=SCHATTEN_OPTIONEN,
+                                                             required=True),
+                "pers":     st.column_config.NumberColumn("Personen", min_value=0, max_value=15, step=1),
+                "tech":     st.column_config.NumberColumn("Technik [W]", min_value=0.0, max_value=10000.0),
             })
+        tabelle.seite_uebernehmen(start, edit)
+
+    spuren.abschnitt("berechnung")
+    # ---- EINGABEN ERFASSEN (Berechnung gesammelt im Batch) ----
+    # Rechengraph: jeder Schritt rechnet nur bei geänderten Eingaben neu
+    graph = rechen_graph()
+    graph.lauf_beginnen()
+    zone_params   = graph.eingabe("zonen", tabelle.zonen(bau_std, bau_m, raumhoehe))
+    graph.eingabe("namen", tabelle.namen)
+    katalog = geraete_katalog()
+    graph.eingabe("katalog", katalog.stand)
+    room_inputs_list = graph.knoten("room_inputs", room_inputs_aus_zonen, "zonen", "namen")
+    
+    # ---- BERECHNUNGEN: alle Zonen × 6 Methoden in einem Aufruf ----
+    kurven = graph.knoten("kurven", calc_zonen_cached, "zonen")
+    g_sums, individual_profiles, room_results, samsung_recs = graph.knoten(
+        "ergebnisse", zonen_ergebnisse, "kurven", "namen")
     
+    spuren.abschnitt("matrix")
     # ==========================================
     # ERGEBNIS-MATRIX
     # ==========================================
@@ -2462,47 +6905,58 @@ def main():
     st.markdown('<div class="matrix-title">📊 Ergebnis-Matrix [Watt] — 6 Methoden</div>', 
                 unsafe_allow_html=True)
     
-    df_res = pd.DataFrame(room_results)
-    totals = {
-        "ZONE":         "GEBAEUDE SIMULTAN-PEAK",
-        "VDI NEU":      int(np.max(g_sums["VDI_N"])),
-        "VDI ALT":      int(np.max(g_sums["VDI_A"])),
-        "RECKNAGEL":    int(np.max(g_sums["RECK"])),
-        "PRAKTIKER":    int(np.max(g_sums["PRAK"])),
-        "KALTLUFTSEE":  int(np.max(g_sums["KLTS"])),
-        "KI HYBRID":    int(np.max(g_sums["KI"])),
-    }
-    df_res = pd.concat([df_res, pd.DataFrame([totals])], ignore_index=True)
-    
-    tbl = "<table class='styled-table'><thead><tr>"
-    col_map = {
-        "ZONE": "Zone",
-        "VDI NEU": "VDI 6007 Neu",
-        "VDI ALT": "VDI 2078 Alt",
-        "RECKNAGEL": "Recknagel",
-        "PRAKTIKER": "Praktiker",
-        "KALTLUFTSEE": "Kaltluftsee",
-        "KI HYBRID": "KI-Hybrid"
-    }
-    for col in df_res.columns:
-        tbl += f"<th>{col_map.get(col, col)}</th>"
-    tbl += "</tr></thead><tbody>"
-    
-    for _, row in df_res.iterrows():
-        is_total = "SIMULTAN" in str(row["ZONE"])
-        cls = " class='total-row'" if is_total else ""
-        tbl += f"<tr{cls}>"
-        for val in row:
-            if isinstance(val, (int, float)) and not isinstance(val, bool):
-                tbl += f"<td>{val:,}</td>"
-            else:
-                tbl += f"<td>{val}</td>"
-        tbl += "</tr>"
-    tbl += "</tbody></table>"
-    
-    st.markdown(tbl, unsafe_allow_html=True)
+    def ergebnis_matrix(ergebnisse):
+        """Zonen + Gebäude-Simultanpeak → HTML-Tabelle (str) bzw. Zeilen für st.dataframe"""
+        g_sums, _, room_results, _ = ergebnisse
+        totals = {
+            "ZONE":         "GEBAEUDE SIMULTAN-PEAK",
+            "VDI NEU":      int(np.max(g_sums["VDI_N"])),
+            "VDI ALT":      int(np.max(g_sums["VDI_A"])),
+            "RECKNAGEL":    int(np.max(g_sums["RECK"])),
+            "PRAKTIKER":    int(np.max(g_sums["PRAK"])),
+            "KALTLUFTSEE":  int(np.max(g_sums["KLTS"])),
+            "KI HYBRID":    int(np.max(g_sums["KI"])),
+        }
+        matrix_rows = room_results + [totals]
+        
+        tbl = "<table class='styled-table'><thead><tr>"
+        col_map = {
+            "ZONE": "Zone",
+            "VDI NEU": "VDI 6007 Neu",
+            "VDI ALT": "VDI 2078 Alt",
+            "RECKNAGEL": "Recknagel",
+            "PRAKTIKER": "Praktiker",
+            "KALTLUFTSEE": "Kaltluftsee",
+            "KI HYBRID": "KI-Hybrid"
+        }
+        if len(room_results) > ZONEN_SEITE:
+            # Große Gebäude: virtualisierte Tabelle statt HTML
+            return [{col_map.get(col, col): row.get(col, "") for col in totals} for row in matrix_rows]
+        for col in totals:
+            tbl += f"<th>{col_map.get(col, col)}</th>"
+        tbl += "</tr></thead><tbody>"
+
+        for row in matrix_rows:
+            is_total = "SIMULTAN" in str(row["ZONE"])
+            cls = " class='total-row'" if is_total else ""
+            tbl += f"<tr{cls}>"
+            for val in (row.get(col, "") for col in totals):
+                if isinstance(val, (int, float)) and not isinstance(val, bool):
+                    tbl += f"<td>{val:,}</td>"
+                else:
+                    tbl += f"<td>{val}</td>"
+            tbl += "</tr>"
+        tbl += "</tbody></table>"
+        return tbl
+
+    matrix = graph.knoten("matrix", ergebnis_matrix, "ergebnisse")
+    if isinstance(matrix, str):
+        st.markdown(matrix, unsafe_allow_html=True)
+    else:
+        st.dataframe(matrix, width="stretch", hide_index=True)
     st.markdown('</div>', unsafe_allow_html=True)
     
+    spuren.abschnitt("geraeteauslegung")
     # ==========================================
     # SAMSUNG WIND-FREE EMPFEHLUNGEN
     # ==========================================
@@ -2512,17 +6966,11 @@ def main():
     )
 
     # --- Geräte je Methode berechnen ---
-    method_peaks = {}
-    for i in range(5):
-        r = room_results[i]
-        method_peaks[i] = {
-            "VDI NEU":     r["VDI NEU"],
-            "VDI ALT":     r["VDI ALT"],
-            "RECKNAGEL":   r["RECKNAGEL"],
-            "PRAKTIKER":   r["PRAKTIKER"],
-            "KALTLUFTSEE": r["KALTLUFTSEE"],
-            "KI HYBRID":   r["KI HYBRID"],
-        }
+    def zonen_peaks(ergebnisse):
+        return {i: {m: r[m] for m in ("VDI NEU", "VDI ALT", "RECKNAGEL", "PRAKTIKER",
+                                      "KALTLUFTSEE", "KI HYBRID")}
+                for i, r in enumerate(ergebnisse[2])}
+    method_peaks = graph.knoten("peaks", zonen_peaks, "ergebnisse", vergleichen=True)
 
     # Safety factor
     METHOD_SAFETY = {
@@ -2540,79 +6988,57 @@ def main():
                      ("Mini-Kassette 620x620","1-Weg-Kassette","Kanaleinbau","Standtruhe")]
     _alle_serien  = _serien_namen  # inkl. Kassette etc.
 
+    zone_names = [r["ZONE"] for r in room_results]
+    n_zonen    = len(zone_names)
+    # Seitenweise Darstellung: Widgets nur für die sichtbaren Zonen, Rest aus Tabelle/Session
+    if n_zonen > ZONEN_SEITE:
+        g_seite = st.selectbox(
+            "ZONEN-SEITE", range(-(-n_zonen // ZONEN_SEITE)), key="geraete_seite",
+            format_func=lambda p: f"Zone {p * ZONEN_SEITE + 1}–{min(n_zonen, (p + 1) * ZONEN_SEITE)}"
+                                  f" von {n_zonen}")
+    else:
+        g_seite = 0
+    sichtbar = range(g_seite * ZONEN_SEITE, min(n_zonen, (g_seite + 1) * ZONEN_SEITE))
+    zeilen   = [sichtbar[k:k + ZONEN_SPALTEN] for k in range(0, len(sichtbar), ZONEN_SPALTEN)]
+
     st.markdown(
         "<div style='font-size:10px;font-weight:700;color:rgba(255,255,255,0.6);"
         "text-transform:uppercase;letter-spacing:1px;margin-bottom:4px;'>"
         "SAMSUNG SERIE je Zone (für Vergleichstabelle + Empfehlung)</div>",
         unsafe_allow_html=True
     )
-    serie_cols = st.columns([2.2, 1, 1, 1, 1, 1])
-    serie_cols[0].markdown(
-        "<div style='font-size:10px;color:#aaa;padding-top:8px;'>Methode</div>",
-        unsafe_allow_html=True
-    )
-    zone_serien = []
-    zone_names  = [room_results[i]["ZONE"] for i in range(5)]
-    for ci in range(5):
-        s = serie_cols[ci+1].selectbox(
-            zone_names[ci],
-            _alle_serien,
-            index=_alle_serien.index(SAMSUNG_DEFAULT_SERIE),
-            key=f"serie_col{ci}",
-            label_visibility="visible",
-            format_func=lambda x: SERIE_SHORT.get(x, x)
+    for blk in zeilen:
+        serie_cols = st.columns([2.2, 1, 1, 1, 1, 1])
+        serie_cols[0].markdown(
+            "<div style='font-size:10px;color:#aaa;padding-top:8px;'>Methode</div>",
+            unsafe_allow_html=True
         )
-        zone_serien.append(s)
-
-    # selected_serie = erste Zone (für device_label Fallback)
-    selected_serie = zone_serien[0]
-
-    def device_label(peak_w, safety=1.10, serie=None):
-        """Gerätekurzbezeichnung aus gewählter Serie"""
-        if serie is None:
-            serie = selected_serie
-        req = (peak_w * safety) / 1000.0
-        db  = SAMSUNG_SERIEN.get(serie, SAMSUNG_SERIEN[SAMSUNG_DEFAULT_SERIE])
-        for kw in sorted(db.keys()):
-            if kw >= req:
-                d = db[kw]
-                return kw, f"{kw:.1f}kW", d["art_nr"], d["preis"]
-        kw = sorted(db.keys())[-1]
-        d  = db[kw]
-        return kw, f"{kw:.1f}kW", d["art_nr"], d["preis"]
-        r = room_results[i]
-        method_peaks[i] = {
-            "VDI NEU":     r["VDI NEU"],
-            "VDI ALT":     r["VDI ALT"],
-            "RECKNAGEL":   r["RECKNAGEL"],
-            "PRAKTIKER":   r["PRAKTIKER"],
-            "KALTLUFTSEE": r["KALTLUFTSEE"],
-            "KI HYBRID":   r["KI HYBRID"],
-        }
-
-    # Safety factor: uniform 10% for all methods per user spec
-    METHOD_SAFETY = {
-        "VDI NEU":     1.10,
-        "VDI ALT":     1.10,
-        "RECKNAGEL":   1.10,
-        "PRAKTIKER":   1.10,
-        "KALTLUFTSEE": 1.10,
-        "KI HYBRID":   1.10,
-    }
-
-    def device_label(peak_w, safety=1.10, serie=None):
-        """Gibt Gerätekurzbezeichnung für Peak zurück (aus gewählter Serie)"""
-        if serie is None:
-            serie = selected_serie
-        req = (peak_w * safety) / 1000.0
-        db = SAMSUNG_SERIEN.get(serie, SAMSUNG_SERIEN[SAMSUNG_DEFAULT_SERIE])
-        for kw in sorted(db.keys()):
-            if kw >= req:
-                d = db[kw]
-                return kw, f"{kw:.1f}kW", d["art_nr"], d["preis"]
-        kw = sorted(db.keys())[-1]
-        d = db[kw]
-        return kw, f"{kw:.1f}kW", d["art_nr"], d["preis"]
+        for j, ci in enumerate(blk):
+            z_serie = tabelle.spalten["serie"][ci]
+            s = serie_cols[j+1].selectbox(
+                zone_names[ci],
+                _alle_serien,
+                index=_alle_serien.index(z_serie if z_serie in _alle_serien else SAMSUNG_DEFAULT_SERIE),
+                key=f"serie_col{ci}",
+                label_visibility="visible",
+                format_func=lambda x: SERIE_SHORT.get(x, x)
+            )
+            tabelle.setzen(ci, serie=s)
+    zone_serien = list(tabelle.spalten["serie"])
+
+    # Geräte je Zone × Methode × Serie in einem vektorisierten Durchlauf
+    _methoden = list(METHOD_SAFETY)
+    geraete_dim = graph.knoten("geraete", lambda peaks, _stand: geraete_dimensionieren(
+        [[peaks[i][m] for m in _methoden] for i in range(len(peaks))],
+        safety=[METHOD_SAFETY[m] for m in _methoden]), "peaks", "katalog")
+
+    def dim_geraet(serie, zi, mkey):
+        """(kw, art_nr, preis) aus der Dimensionierungs-Matrix"""
+        si = geraete_dim["serien"].index(serie if serie in geraete_dim["serien"]
+                                         else SAMSUNG_DEFAULT_SERIE)
+        mi = _methoden.index(mkey)
+        return (geraete_dim["kw"][si, zi, mi], geraete_dim["art_nr"][si, zi, mi],
+                geraete_dim["preis"][si, zi, mi])
 
     # Farben je Methode
     METHOD_COLORS = {
@@ -2632,8 +7058,6 @@ def main():
         "KI HYBRID":   "KI-Hybrid",
     }
 
-    zone_names = [room_results[i]["ZONE"] for i in range(5)]
-
     # --- Tabelle: eine Zeile je Methode ---
     st.markdown("""
     <div class="matrix-wrapper" style="padding:20px 25px;">
@@ -2644,61 +7068,69 @@ def main():
     </div>
     """, unsafe_allow_html=True)
 
-    # Header-Zeile
-    hdr_cols = st.columns([2.2, 1, 1, 1, 1, 1])
-    hdr_cols[0].markdown(
-        "<div style='font-size:10px;font-weight:700;color:#3C3C3B;"
-        "text-transform:uppercase;letter-spacing:1px;padding:4px 0;'>Methode</div>",
-        unsafe_allow_html=True
-    )
-    for ci, zn in enumerate(zone_names):
-        hdr_cols[ci+1].markdown(
-            f"<div style='font-size:10px;font-weight:700;color:#3C3C3B;"
-            f"text-transform:uppercase;letter-spacing:1px;text-align:center;"
-            f"padding:4px 0;'>{zn}</div>",
+    for blk in zeilen:
+        # Header-Zeile
+        hdr_cols = st.columns([2.2, 1, 1, 1, 1, 1])
+        hdr_cols[0].markdown(
+            "<div style='font-size:10px;font-weight:700;color:#3C3C3B;"
+            "text-transform:uppercase;letter-spacing:1px;padding:4px 0;'>Methode</div>",
             unsafe_allow_html=True
         )
+        for j, ci in enumerate(blk):
+            hdr_cols[j+1].markdown(
+                f"<div style='font-size:10px;font-weight:700;color:#3C3C3B;"
+                f"text-transform:uppercase;letter-spacing:1px;text-align:center;"
+                f"padding:4px 0;'>{zone_names[ci]}</div>",
+                unsafe_allow_html=True
+            )
 
-    for mkey, mlabel in METHOD_LABELS.items():
-        dark_color, light_color = METHOD_COLORS[mkey]
-        is_official = mkey == "PRAKTIKER"
-
-        border = f"2px solid {dark_color}" if is_official else f"1px solid {dark_color}40"
-        bg     = light_color
-        shadow = "box-shadow:0 2px 8px rgba(0,0,0,0.12);" if is_official else ""
+        for mkey, mlabel in METHOD_LABELS.items():
+            dark_color, light_color = METHOD_COLORS[mkey]
+            is_official = mkey == "PRAKTIKER"
 
-        row_cols = st.columns([2.2, 1, 1, 1, 1, 1])
+            border = f"2px solid {dark_color}" if is_official else f"1px solid {dark_color}40"
+            bg     = light_color
+            shadow = "box-shadow:0 2px 8px rgba(0,0,0,0.12);" if is_official else ""
 
-        # Methoden-Label
-        star = " ⭐" if is_official else ""
-        row_cols[0].markdown(
-            f"<div style='background:{bg};border:{border};border-radius:8px;"
-            f"padding:8px 10px;{shadow}margin:2px 0;'>"
-            f"<div style='font-size:11px;font-weight:700;color:{dark_color};"
-            f"text-transform:uppercase;letter-spacing:0.5px;'>{mlabel}{star}</div>"
-            f"</div>",
-            unsafe_allow_html=True
-        )
+            row_cols = st.columns([2.2, 1, 1, 1, 1, 1])
 
-        # Gerät je Zone — mit jeweiliger Zonen-Serie
-        method_safety_val = METHOD_SAFETY.get(mkey, 1.10)
-        for ci in range(5):
-            peak_w = method_peaks[ci][mkey]
-            kw, short, art_nr, preis = device_label(peak_w, safety=method_safety_val,
-                                                     serie=zone_serien[ci])
-            row_cols[ci+1].markdown(
+            # Methoden-Label
+            star = " ⭐" if is_official else ""
+            row_cols[0].markdown(
                 f"<div style='background:{bg};border:{border};border-radius:8px;"
-                f"padding:6px 8px;{shadow}margin:2px 0;text-align:center;'>"
-                f"<div style='font-size:12px;font-weight:700;color:{dark_color};'>{short}</div>"
-                f"<div style='font-size:10px;color:#666;margin-top:2px;'>"
-                f"{kw:.1f} kW | {peak_w:,} W</div>"
-                f"<div style='font-size:9px;color:#999;'>{art_nr}</div>"
+                f"padding:8px 10px;{shadow}margin:2px 0;'>"
+                f"<div style='font-size:11px;font-weight:700;color:{dark_color};"
+                f"text-transform:uppercase;letter-spacing:0.5px;'>{mlabel}{star}</div>"
                 f"</div>",
                 unsafe_allow_html=True
             )
 
+            # Gerät je Zone — mit jeweiliger Zonen-Serie
+            for j, ci in enumerate(blk):
+                peak_w = method_peaks[ci][mkey]
+                kw, art_nr, preis = dim_geraet(zone_serien[ci], ci, mkey)
+                short = f"{kw:.1f}kW"
+                row_cols[j+1].markdown(
+                    f"<div style='background:{bg};border:{border};border-radius:8px;"
+                    f"padding:6px 8px;{shadow}margin:2px 0;text-align:center;'>"
+                    f"<div style='font-size:12px;font-weight:700;color:{dark_color};'>{short}</div>"
+                    f"<div style='font-size:10px;color:#666;margin-top:2px;'>"
+                    f"{kw:.1f} kW | {peak_w:,} W</div>"
+                    f"<div style='font-size:9px;color:#999;'>{art_nr}</div>"
+                    f"</div>",
+                    unsafe_allow_html=True
+                )
+
     st.markdown("</div>", unsafe_allow_html=True)
 
+    # Günstigste normgerechte Serie je Zone (Praktiker ★, über alle Serien)
+    _guenstig = graph.knoten("guenstig", lambda dim: guenstigste_serien(
+        dim, _methoden.index("PRAKTIKER")), "geraete")
+    st.caption("💶 Günstigste Serie je Zone (Praktiker +10 %, IG-Listenpreis): " + "  |  ".join(
+        f"{zone_names[zi]}: " + (f"{SERIE_SHORT.get(g['serie'], g['serie'])} {g['kw']:.1f} kW "
+                                 f"{fmt_number(g['preis'])} EUR" if g else "—")
+        for zi, g in ((zi, _guenstig[zi]) for zi in sichtbar)))
+
     # --- VDI 2078 ALT EMPFEHLUNG (automatisch, Wind-Free Standard) ---
     st.markdown("""
     <div style="margin-top:24px; margin-bottom:8px;">
@@ -2708,27 +7140,26 @@ def main():
         </span>
     </div>""", unsafe_allow_html=True)
 
-    green_cols = st.columns(5)
-    for i, gcol in enumerate(green_cols):
-        peak_vdi_alt = method_peaks[i]["VDI ALT"]
-        kw_rec, _, art_rec, preis_rec = device_label(
-            peak_vdi_alt, safety=1.10, serie="Wind-Free Standard"
-        )
-        gcol.markdown(f"""
-            <div style="background:linear-gradient(135deg,#1565c0,#1e88e5);
-                        border-radius:12px;padding:14px 12px;color:white;margin-bottom:4px;
-                        box-shadow:0 2px 8px rgba(21,101,192,0.4);">
-                <div style="font-size:9px;font-weight:800;opacity:0.85;
-                            letter-spacing:1px;text-transform:uppercase;">⭐ EMPFEHLUNG VDI 2078 Alt</div>
-                <div style="font-size:15px;font-weight:700;margin:5px 0 3px 0;
-                            letter-spacing:-0.3px;">WF Standard {kw_rec:.1f} kW</div>
-                <div style="font-size:10px;opacity:0.92;line-height:1.7;">
-                    📦 {art_rec}<br>
-                    ❄️ {kw_rec:.1f} kW &nbsp;|&nbsp; SEER ~6.2<br>
-                    💶 {preis_rec:.0f} EUR LP
-                </div>
-            </div>""", unsafe_allow_html=True)
-
+    for blk in zeilen:
+        green_cols = st.columns(ZONEN_SPALTEN)
+        for i, gcol in zip(blk, green_cols):
+            kw_rec, art_rec, preis_rec = dim_geraet("Wind-Free Standard", i, "VDI ALT")
+            gcol.markdown(f"""
+                <div style="background:linear-gradient(135deg,#1565c0,#1e88e5);
+                            border-radius:12px;padding:14px 12px;color:white;margin-bottom:4px;
+                            box-shadow:0 2px 8px rgba(21,101,192,0.4);">
+                    <div style="font-size:9px;font-weight:800;opacity:0.85;
+                                letter-spacing:1px;text-transform:uppercase;">⭐ EMPFEHLUNG VDI 2078 Alt</div>
+                    <div style="font-size:15px;font-weight:700;margin:5px 0 3px 0;
+                                letter-spacing:-0.3px;">WF Standard {kw_rec:.1f} kW</div>
+                    <div style="font-size:10px;opacity:0.92;line-height:1.7;">
+                        📦 {art_rec}<br>
+                        ❄️ {kw_rec:.1f} kW &nbsp;|&nbsp; SEER ~6.2<br>
+                        💶 {preis_rec:.0f} EUR LP
+                    </div>
+                </div>""", unsafe_allow_html=True)
+
+    spuren.abschnitt("geraeteauswahl")
     # ==========================================
     # EDITIERBARE FINALE GERÄTEAUSWAHL
     # ==========================================
@@ -2742,86 +7173,12 @@ def main():
     </div>
     """, unsafe_allow_html=True)
 
-    # ==========================================
-    # RAC-AG Datenbank: je IG-Serie passende Außengeräte
-    # ==========================================
-    # FJM Multi-Außengeräte (für alle FJM IG-Typen: Kassette, Kanal, Standtruhe, WF-Serien)
-    FJM_AG = {
-        4.0:  {"art_nr": "AJ040TXJ2KG/EU", "bez": "FJM Multi AG  4,0 kW",   "preis": 2347},
-        5.0:  {"art_nr": "AJ050TXJ2KG/EU", "bez": "FJM Multi AG  5,0 kW",   "preis": 2706},
-        5.2:  {"art_nr": "AJ052TXJ3KG/EU", "bez": "FJM Multi AG  5,2 kW",   "preis": 3061},
-        6.8:  {"art_nr": "AJ068TXJ3KG/EU", "bez": "FJM Multi AG  6,8 kW",   "preis": 3548},
-        8.0:  {"art_nr": "AJ080TXJ4KG/EU", "bez": "FJM Multi AG  8,0 kW",   "preis": 4494},
-        10.0: {"art_nr": "AJ100TXJ5KG/EU", "bez": "FJM Multi AG 10,0 kW",   "preis": 5533},
-    }
-
-    # RAC Single-Split-AGs je IG-Serie (IG-Artnr Präfix → passende AG-Liste)
-    RAC_AG_BY_SERIE = {
-        "Airise Living": [
-            (2.5, "AR50F09C1BHX/EU",  "RAC AG Airise Living 2,5 kW",  984),
-            (3.5, "AR50F12C1BHX/EU",  "RAC AG Airise Living 3,5 kW", 1019),
-            (5.0, "AR50F18C1BHX/EU",  "RAC AG Airise Living 5,0 kW", 1564),
-            (6.5, "AR50F24C1BHX/EU",  "RAC AG Airise Living 6,5 kW", 2056),
-        ],
-        "Wind-Free Standard": [
-            (2.5, "AR60F09C1AWX/EU",  "RAC AG WF Standard 2,5 kW",   1362),
-            (3.5, "AR60F12C1AWX/EU",  "RAC AG WF Standard 3,5 kW",   1540),  # ca.
-            (5.0, "AR60F18C1AWX/EU",  "RAC AG WF Standard 5,0 kW",   1900),
-        ],
-        "Wind-Free Exklusiv": [
-            (2.0, "AR70F07C1AWX/EU",  "RAC AG WF Exklusiv 2,0 kW",   1448),
-            (2.5, "AR70F09C1AWX/EU",  "RAC AG WF Exklusiv 2,5 kW",   1446),
-            (3.5, "AR70F12C1AWX/EU",  "RAC AG WF Exklusiv 3,5 kW",   1540),
-            (4.3, "AR70F15C1AWX/EU",  "RAC AG WF Exklusiv 4,3 kW",   2135),
-            (5.0, "AR70F18C1AWX/EU",  "RAC AG WF Exklusiv 5,0 kW",   2106),
-            (6.5, "AR70F24C1AWX/EU",  "RAC AG WF Exklusiv 6,5 kW",   2761),
-        ],
-        "Wind-Free Exklusiv Black": [
-            (2.0, "AR70F07C1AWX/EU",  "RAC AG WF Exklusiv 2,0 kW",   1448),
-            (2.5, "AR70F09C1AWX/EU",  "RAC AG WF Exklusiv 2,5 kW",   1446),
-            (3.5, "AR70F12C1AWX/EU",  "RAC AG WF Exklusiv 3,5 kW",   1540),
-        ],
-        "Wind-Free Exklusiv-Premiere": [
-            (2.0, "AR70H07C1AWX/EU",  "RAC AG WF Exkl.-Prem. 2,0 kW", 1604),
-            (2.5, "AR70H09C1AWX/EU",  "RAC AG WF Exkl.-Prem. 2,5 kW", 1688),
-            (3.5, "AR70H12C1AWX/EU",  "RAC AG WF Exkl.-Prem. 3,5 kW", 1872),
-            (4.3, "AR70H15C1AWX/EU",  "RAC AG WF Exkl.-Prem. 4,3 kW", 2360),
-            (5.0, "AR70H18C1AWX/EU",  "RAC AG WF Exkl.-Prem. 5,0 kW", 2708),
-            (6.5, "AR70H24C1AWX/EU",  "RAC AG WF Exkl.-Prem. 6,5 kW", 3556),
-        ],
-        "Wind-Free Exklusiv-Premiere Black": [
-            (2.0, "AR70H07C1AWX/EU",  "RAC AG WF Exkl.-Prem. 2,0 kW", 1604),
-            (2.5, "AR70H09C1AWX/EU",  "RAC AG WF Exkl.-Prem. 2,5 kW", 1688),
-            (3.5, "AR70H12C1AWX/EU",  "RAC AG WF Exkl.-Prem. 3,5 kW", 1872),
-        ],
-        "Wind-Free Elite": [
-            (2.5, "AR70F09CAAWKX/EU", "RAC AG WF Elite 2,5 kW",       1752),
-            (3.5, "AR70F12CAAWKX/EU", "RAC AG WF Elite 3,5 kW",       1944),
-        ],
-        "Wind-Free Elite-Premiere Plus": [
-            (2.5, "AR70H09CAAWX/EU",  "RAC AG WF Elite-Prem.Plus 2,5 kW", 1824),
-            (3.5, "AR70H12CAAWX/EU",  "RAC AG WF Elite-Prem.Plus 3,5 kW", 2024),
-        ],
-        "Wind-Free Elite-Premiere Plus Black": [
-            (2.5, "AR70H09CAAWX/EU",  "RAC AG WF Elite-Prem.Plus 2,5 kW", 1824),
-            (3.5, "AR70H12CAAWX/EU",  "RAC AG WF Elite-Prem.Plus 3,5 kW", 2024),
-        ],
-    }
-    # FJM IG-Typen → immer FJM Multi AG
-    FJM_IG_SERIEN = {"Mini-Kassette 620x620", "1-Weg-Kassette", "Kanaleinbau", "Standtruhe"}
-    # FJM Wandgeräte-Serien → können RAC AG oder FJM AG bekommen (Umschalter)
-    FJM_WAND_SERIEN = {"Wind-Free Standard","Wind-Free Exklusiv","Wind-Free Exklusiv Black",
-                       "Wind-Free Exklusiv-Premiere","Wind-Free Exklusiv-Premiere Black",
-                       "Wind-Free Elite","Wind-Free Elite-Premiere Plus",
-                       "Wind-Free Elite-Premiere Plus Black","Airise Living"}
-
-    # IG-Optionen aufbauen
+    # IG-Optionen aufbauen (aus dem indexierten Gerätekatalog)
     IG_OPTIONS = [(0.0, "N.V.", "— nicht vorhanden —")]
-    for sname, sdata in SAMSUNG_SERIEN.items():
-        for kw in sorted(sdata.keys()):
-            d = sdata[kw]
-            label = f"{d['art_nr']}  |  {kw:.1f} kW  |  {sname}  |  {d['preis']:.0f} EUR"
-            IG_OPTIONS.append((kw, sname, label))
+    for sname, reihe in katalog.ig.items():
+        for e in reihe.eintraege:
+            label = f"{e['art_nr']}  |  {e['kw']:.1f} kW  |  {sname}  |  {e['preis']:.0f} EUR"
+            IG_OPTIONS.append((e["kw"], sname, label))
     IG_KEYS   = list(range(len(IG_OPTIONS)))
     # Kurze Labels für das Dropdown (WF statt Wind-Free, Serie verkürzt)
     def _ig_short_label(lbl):
@@ -2839,29 +7196,37 @@ def main():
     selected_hw    = []
     selected_hw_ag = []
     selected_ig_artnr = []  # Neu: IG Art.-Nr. speichern
-    final_cols = st.columns(5)
-
-    for i, col in enumerate(final_cols):
-        with col:
-            r_name    = zone_names[i]
-            prak_peak = method_peaks[i]["PRAKTIKER"]
-            vdi_peak  = method_peaks[i]["VDI NEU"]
-            z_serie   = zone_serien[i]
-
-            # Default IG: Praktiker-Empfehlung in Zonen-Serie
-            prak_kw, _, _, _ = device_label(prak_peak, safety=1.10, serie=z_serie)
-            def_ig_idx = 0
-            for ig_idx, (kw, sname, _) in enumerate(IG_OPTIONS):
-                if sname == z_serie and kw == prak_kw:
-                    def_ig_idx = ig_idx
-                    break
+    # Auswahl je Zone in der Session: Zonen außerhalb der sichtbaren Seite behalten sie
+    geraete_wahl = st.session_state.setdefault("geraete_wahl", {})
+
+    def _wahl(i, feld, optionen, default, anzeigen, widget):
+        """Gespeicherte Auswahl bzw. Widget(index) der sichtbaren Zone → Wert"""
+        gespeichert = geraete_wahl.get((i, feld))
+        index = optionen.index(gespeichert) if gespeichert in optionen else default
+        wert = widget(index) if anzeigen else optionen[index]
+        geraete_wahl[(i, feld)] = wert
+        return wert
+
+    def geraet_zone(i, anzeigen=True):
+        """IG + AG einer Zone → (ig_kw, ig_artnr, ag_info); Widgets nur für sichtbare Zonen"""
+        r_name    = zone_names[i]
+        z_serie   = zone_serien[i]
+
+        # Default IG: Praktiker-Empfehlung in Zonen-Serie
+        prak_kw = dim_geraet(z_serie, i, "PRAKTIKER")[0]
+        def_ig_idx = 0
+        for ig_idx, (kw, sname, _) in enumerate(IG_OPTIONS):
+            if sname == z_serie and kw == prak_kw:
+                def_ig_idx = ig_idx
+                break
 
+        if anzeigen:
             # Info-Box - alle 6 Methoden berechnen
-            vdi_kw,   _, _, _ = device_label(vdi_peak, safety=1.10, serie=z_serie)
-            vdi_a_kw, _, _, _ = device_label(method_peaks[i]["VDI ALT"], safety=1.10, serie=z_serie)
-            reck_kw,  _, _, _ = device_label(method_peaks[i]["RECKNAGEL"], safety=1.10, serie=z_serie)
-            klts_kw,  _, _, _ = device_label(method_peaks[i]["KALTLUFTSEE"], safety=1.10, serie=z_serie)
-            ki_kw,    _, _, _ = device_label(method_peaks[i]["KI HYBRID"], safety=1.10, serie=z_serie)
+            vdi_kw   = dim_geraet(z_serie, i, "VDI NEU")[0]
+            vdi_a_kw = dim_geraet(z_serie, i, "VDI ALT")[0]
+            reck_kw  = dim_geraet(z_serie, i, "RECKNAGEL")[0]
+            klts_kw  = dim_geraet(z_serie, i, "KALTLUFTSEE")[0]
+            ki_kw    = dim_geraet(z_serie, i, "KI HYBRID")[0]
             st.markdown(
                 f"<div style='background:rgba(255,255,255,0.12);border:1px solid "
                 f"rgba(255,255,255,0.3);border-radius:10px;padding:10px;margin-bottom:6px;'>"
@@ -2881,141 +7246,110 @@ def main():
             # ❄️ Innengerät
             st.markdown("<div style='font-size:9px;color:rgba(255,255,255,0.6);"
                         "margin-bottom:2px;'>❄️ INNENGERÄT</div>", unsafe_allow_html=True)
-            ig_val = st.selectbox(
-                f"IG {r_name}", IG_KEYS, index=def_ig_idx, key=f"hw{i}",
-                format_func=lambda x: IG_LABELS[x],
+        ig_val = _wahl(i, "ig", IG_KEYS, def_ig_idx, anzeigen, lambda idx: st.selectbox(
+            f"IG {r_name}", IG_KEYS, index=idx, key=f"hw{i}",
+            format_func=lambda x: IG_LABELS[x],
+            label_visibility="collapsed"
+        ))
+        ig_kw    = IG_OPTIONS[ig_val][0]
+        ig_serie = IG_OPTIONS[ig_val][1]
+
+        # IG Art.-Nr. extrahieren
+        ig_eintrag = katalog.ig_eintrag(ig_serie, ig_kw) if ig_kw > 0 else None
+        ig_artnr = ig_eintrag["art_nr"] if ig_eintrag else '—'
+
+        # 🔀 RAC / FJM Umschalter (nur bei Wandgeräten; Kassette/Kanal/Truhe → immer FJM)
+        is_fjm_ig  = ig_serie in FJM_IG_SERIEN
+        if is_fjm_ig:
+            ag_modus = "FJM Multi"
+        else:
+            ag_modi = ["RAC Single-Split", "FJM Multi"]
+            ag_modus = _wahl(i, "ag_modus", ag_modi, 1, anzeigen, lambda idx: st.radio(
+                f"AG-Typ {r_name}",
+                ag_modi,
+                index=idx, key=f"agm{i}",
+                horizontal=True,
                 label_visibility="collapsed"
-            )
-            ig_kw    = IG_OPTIONS[ig_val][0]
-            ig_serie = IG_OPTIONS[ig_val][1]
-            selected_hw.append(ig_kw)
-            
-            # IG Art.-Nr. extrahieren
-            ig_artnr = '—'
-            if ig_kw > 0 and ig_serie in SAMSUNG_SERIEN and ig_kw in SAMSUNG_SERIEN[ig_serie]:
-                ig_artnr = SAMSUNG_SERIEN[ig_serie][ig_kw]['art_nr']
-            selected_ig_artnr.append(ig_artnr)
-
-            # 🔀 RAC / FJM Umschalter (nur bei Wandgeräten; Kassette/Kanal/Truhe → immer FJM)
-            is_fjm_ig  = ig_serie in FJM_IG_SERIEN
-            if is_fjm_ig:
-                ag_modus = "FJM Multi"
-            else:
-                ag_modus = st.radio(
-                    f"AG-Typ {r_name}",
-                    ["RAC Single-Split", "FJM Multi"],
-                    index=1, key=f"agm{i}",
-                    horizontal=True,
-                    label_visibility="collapsed"
-                )
+            ))
 
-            # 🌡️ Außengerät — gefiltert nach Modus
+        # 🌡️ Außengerät — gefiltert nach Modus
+        if anzeigen:
             st.markdown("<div style='font-size:9px;color:rgba(255,255,255,0.6);"
                         "margin-top:4px;margin-bottom:2px;'>🌡️ AUSSENGERÄT</div>",
                         unsafe_allow_html=True)
 
-            if ag_modus == "FJM Multi":
-                fjm_keys_raw = list(FJM_AG.keys())
-                # N.V. vorne
-                fjm_keys   = ["NV"] + fjm_keys_raw
-                fjm_labels = {"NV": "— nicht vorhanden —"}
-                fjm_labels.update({k: f"{FJM_AG[k]['art_nr']}  |  {FJM_AG[k]['bez']}  |  {FJM_AG[k]['preis']:,} EUR"
-                                   for k in fjm_keys_raw})
-                # Default: Zone 1 = AJ100, Zone 2-5 = N.V. (auch wenn IG > 0)
-                def_fjm = 0  # Default = N.V.
-                if i == 0:
-                    # Zone 1: Default = AJ100 (10.0kW index 6) wenn kein IG, sonst passendes AG
-                    if ig_kw == 0:
-                        def_fjm = 6  # AJ100
-                    else:
-                        # IG ausgewählt: kleinstes AG >= ig_kw
-                        for fi, fk in enumerate(fjm_keys_raw):
-                            if fk >= ig_kw:
-                                def_fjm = fi + 1
-                                break
-                # Zone 2-5: immer N.V. (def_fjm bleibt 0)
-                ag_sel = st.selectbox(
-                    f"AG {r_name}", fjm_keys, index=def_fjm, key=f"ag{i}",
-                    format_func=lambda x, m=fjm_labels: m[x],
-                    label_visibility="collapsed"
-                )
-                if ag_sel == "NV":
-                    selected_hw_ag.append(("FJM", 0, "N.V."))
-                else:
-                    selected_hw_ag.append(("FJM", ag_sel, FJM_AG[ag_sel]["art_nr"]))
+        if ag_modus == "FJM Multi":
+            fjm_ag     = {e["kw"]: e for e in katalog.fjm_ag.eintraege}
+            # N.V. vorne
+            fjm_keys   = ["NV"] + list(fjm_ag)
+            fjm_labels = {"NV": "— nicht vorhanden —"}
+            fjm_labels.update({k: f"{e['art_nr']}  |  {e['bez']}  |  {e['preis']:,} EUR"
+                               for k, e in fjm_ag.items()})
+            # Default: Zone 1 = passendes AG (AJ100 ohne IG), weitere Zonen = N.V.
+            def_ag  = default_fjm_ag(i, ig_kw)
+            def_fjm = 0 if def_ag is None else fjm_keys.index(def_ag)
+            ag_sel = _wahl(i, "ag_fjm", fjm_keys, def_fjm, anzeigen, lambda idx: st.selectbox(
+                f"AG {r_name}", fjm_keys, index=idx, key=f"ag{i}",
+                format_func=lambda x, m=fjm_labels: m[x],
+                label_visibility="collapsed"
+            ))
+            if ag_sel == "NV":
+                ag_info = ("FJM", 0, "N.V.")
             else:
-                # RAC: passendes AG zur IG-Serie
-                rac_list_raw = RAC_AG_BY_SERIE.get(ig_serie,
-                               RAC_AG_BY_SERIE.get("Wind-Free Exklusiv", []))
-                if not rac_list_raw:
-                    rac_list_raw = [(2.5, "—", "Kein passendes RAC AG", 0)]
-                # N.V. vorne einfügen
-                rac_list   = [(0, "NV", "— nicht vorhanden —", 0)] + list(rac_list_raw)
-                rac_keys   = list(range(len(rac_list)))
-                rac_labels = {0: "— nicht vorhanden —"}
-                rac_labels.update({
-                    k+1: f"{rac_list_raw[k][1]}  |  {rac_list_raw[k][2]}  |  {rac_list_raw[k][3]:,} EUR"
-                    for k in range(len(rac_list_raw))
-                })
-                # Default: kleinstes RAC AG >= ig_kw (oder 0 = N.V. wenn ig_kw=0)
-                def_rac = 0
-                if ig_kw > 0:
-                    for ri, (rkw, _, _, _) in enumerate(rac_list_raw):
-                        if rkw >= ig_kw:
-                            def_rac = ri + 1  # +1 wegen N.V. vorne
-                            break
-                ag_sel = st.selectbox(
-                    f"AG {r_name}", rac_keys, index=def_rac, key=f"ag{i}",
-                    format_func=lambda x, m=rac_labels: m[x],
-                    label_visibility="collapsed"
-                )
-                if ag_sel == 0:
-                    selected_hw_ag.append(("RAC", 0, "N.V."))
-                else:
-                    entry = rac_list_raw[ag_sel - 1]
-                    selected_hw_ag.append(("RAC", entry[0], entry[1]))
-
-    # Gesamtleistung + Preis (IG + AG)
-    total_kw = sum(selected_hw)
-    _ig_preis_map = {}
-    for kw, sname, label in IG_OPTIONS:
-        if kw > 0 and "|" in label:
-            try:
-                p = label.split("|")[-1].strip().replace(" EUR","").replace(".","").replace(",",".")
-                _ig_preis_map[(kw, sname)] = float(p)
-            except Exception:
-                pass
-    total_preis_ig = 0.0
-    for idx2, kw in enumerate(selected_hw):
-        if kw > 0:
-            ig_idx = next((j for j,(k,s,_) in enumerate(IG_OPTIONS)
-                           if k == kw and s == zone_serien[idx2]), None)
-            if ig_idx is not None:
-                try:
-                    p = IG_OPTIONS[ig_idx][2].split("|")[-1].strip().replace(" EUR","").replace(".","").replace(",",".")
-                    total_preis_ig += float(p)
-                except Exception:
-                    pass
-
-    # AG-Preise addieren
-    total_preis_ag = 0.0
-    for ag_inf in selected_hw_ag:
-        if isinstance(ag_inf, (list, tuple)) and len(ag_inf) > 1:
-            ag_typ  = ag_inf[0]
-            ag_kw   = ag_inf[1]
-            if ag_kw and ag_kw != 0 and ag_typ != "—":
-                try:
-                    if ag_typ == "FJM" and ag_kw in FJM_AG:
-                        total_preis_ag += FJM_AG[ag_kw]["preis"]
-                    elif ag_typ == "RAC":
-                        # Suche in RAC_AG_BY_SERIE
-                        for serie_list in RAC_AG_BY_SERIE.values():
-                            for rkw, rartnr, rbez, rpreis in serie_list:
-                                if abs(rkw - float(ag_kw)) < 0.01:
-                                    total_preis_ag += rpreis
-                                    break
-                except Exception:
-                    pass
+                ag_info = ("FJM", ag_sel, fjm_ag[ag_sel]["art_nr"])
+        else:
+            # RAC: passendes AG zur IG-Serie
+            rac_reihe    = katalog.rac_reihe(ig_serie)
+            rac_list_raw = rac_reihe.als_tupel() if rac_reihe else []
+            if not rac_list_raw:
+                rac_list_raw = [(2.5, "—", "Kein passendes RAC AG", 0)]
+            # N.V. vorne einfügen
+            rac_list   = [(0, "NV", "— nicht vorhanden —", 0)] + list(rac_list_raw)
+            rac_keys   = list(range(len(rac_list)))
+            rac_labels = {0: "— nicht vorhanden —"}
+            rac_labels.update({
+                k+1: f"{rac_list_raw[k][1]}  |  {rac_list_raw[k][2]}  |  {rac_list_raw[k][3]:,} EUR"
+                for k in range(len(rac_list_raw))
+            })
+            # Default: kleinstes RAC AG >= ig_kw (oder 0 = N.V. wenn ig_kw=0)
+            def_rac = 0
+            if ig_kw > 0:
+                for ri, (rkw, _, _, _) in enumerate(rac_list_raw):
+                    if rkw >= ig_kw:
+                        def_rac = ri + 1  # +1 wegen N.V. vorne
+                        break
+            ag_sel = _wahl(i, "ag_rac", rac_keys, def_rac, anzeigen, lambda idx: st.selectbox(
+                f"AG {r_name}", rac_keys, index=idx, key=f"ag{i}",
+                format_func=lambda x, m=rac_labels: m[x],
+                label_visibility="collapsed"
+            ))
+            if ag_sel == 0:
+                ag_info = ("RAC", 0, "N.V.")
+            else:
+                entry = rac_list_raw[ag_sel - 1]
+                ag_info = ("RAC", entry[0], entry[1])
+        return ig_kw, ig_artnr, ag_info
+
+    # Sichtbare Zonen mit Widgets (je Zeile ZONEN_SPALTEN Karten), übrige aus der Session
+    auswahl = {}
+    for blk in zeilen:
+        for i, col in zip(blk, st.columns(ZONEN_SPALTEN)):
+            with col:
+                auswahl[i] = geraet_zone(i)
+    for i in range(n_zonen):
+        ig_kw, ig_artnr, ag_info = auswahl[i] if i in auswahl else geraet_zone(i, anzeigen=False)
+        selected_hw.append(ig_kw)
+        selected_ig_artnr.append(ig_artnr)
+        selected_hw_ag.append(ag_info)
+
+    # Gesamtleistung + Preis (IG + AG), Listenpreise über den Artikelnummer-Index des Katalogs
+    def summen(auswahl, _stand):
+        hw, ig_artnr, hw_ag = auswahl
+        return (sum(hw), sum(katalog.preis(a, 0) for a in ig_artnr),
+                sum(katalog.preis(ag_inf[2], 0) for ag_inf in hw_ag
+                    if isinstance(ag_inf, (list, tuple)) and len(ag_inf) > 2))
+    graph.eingabe("auswahl", (selected_hw, selected_ig_artnr, selected_hw_ag))
+    total_kw, total_preis_ig, total_preis_ag = graph.knoten("preise", summen, "auswahl", "katalog")
 
     total_preis = total_preis_ig + total_preis_ag
 
@@ -3049,6 +7383,53 @@ def main():
     """, unsafe_allow_html=True)
 
 
+    spuren.abschnitt("optimierung")
+    # ==========================================
+    # KOSTENOPTIMALE KONFIGURATION (Multi-Split-Solver)
+    # ==========================================
+    with st.expander("🧮 Kostenoptimale Konfiguration — RAC Single-Split / FJM Multi-Split"):
+        st.caption(f"IG je Zone nach Praktiker +10 %, FJM-AG nach simultanem Gruppen-Peak (VDI 6007 NEU, "
+                   f"Summenkurve) +10 %, Kombination Σ IG ≤ {FJM_KOMBI_MAX * 100:.0f} % AG, Listenpreise netto.")
+        ox1, ox2 = st.columns([3, 1])
+        opt_serien = ox1.multiselect("IG-SERIEN", list(katalog.ig), default=list(katalog.ig), key="opt_serien")
+        opt_top    = ox2.number_input("VARIANTEN", 1, 20, 5, key="opt_top")
+        if opt_serien and st.button("▶️ KONFIGURATION OPTIMIEREN", width="stretch"):
+            opt = optimiere_konfiguration(kurven, zone_names, serien=opt_serien, top_n=int(opt_top))
+            if not opt["konfigurationen"]:
+                st.warning("Keine zulässige Konfiguration mit den gewählten Serien.")
+            else:
+                st.dataframe([{
+                    "Rang":          rang + 1,
+                    "Gesamt [EUR]":  fmt_number(int(k["gesamt_preis"])),
+                    "IG [EUR]":      fmt_number(int(k["ig_preis"])),
+                    "AG [EUR]":      fmt_number(int(k["ag_preis"])),
+                    "Aufteilung":    "  |  ".join(
+                        [f"FJM {g['ag']['kw']:.1f} kW: " + " + ".join(g["zonen"]) for g in k["gruppen"]]
+                        + [f"RAC: {z['zone']}" for z in k["zonen"] if z["ag_typ"] == "RAC"]),
+                } for rang, k in enumerate(opt["konfigurationen"])], width="stretch", hide_index=True)
+                best = opt["konfigurationen"][0]
+                if best["unterdimensioniert"]:
+                    st.warning("Unterdimensioniert (größtes Gerät der Serien reicht nicht): "
+                               + ", ".join(best["unterdimensioniert"]))
+                st.dataframe([{
+                    "Zone":    z["zone"] + (" ⚠️" if z["zu_klein"] else ""),
+                    "IG":      f"{SERIE_SHORT.get(z['ig']['serie'], z['ig']['serie'])} {z['ig']['kw']:.1f} kW",
+                    "IG Art.": z["ig"]["art_nr"],
+                    "AG":      (f"FJM {z['gruppe']}" if z["ag_typ"] == "FJM" else "RAC")
+                               + f" {z['ag']['kw']:.1f} kW",
+                    "AG Art.": z["ag"]["art_nr"],
+                } for z in best["zonen"]], width="stretch", hide_index=True)
+                for g in best["gruppen"]:
+                    st.caption(f"FJM {g['gruppe']}: {g['ag']['art_nr']} ({g['anschluesse']} Anschlüsse) — "
+                               f"simultan {fmt_number(g['simultan_peak_w'])} W statt "
+                               f"{fmt_number(g['summe_einzelpeaks_w'])} W Σ Einzelpeaks, "
+                               f"Kombination {g['kombi'] * 100:.0f} %")
+                stat = opt["statistik"]
+                st.caption(f"{fmt_number(stat['knoten'])} Knoten, {fmt_number(stat['abgeschnitten'])} abgeschnitten, "
+                           f"{stat['gruppen_bewertet']} Gruppen bewertet, {stat['zeit_ms']} ms"
+                           + ("" if stat["vollstaendig"] else " — Zeitlimit erreicht, beste bisher gefundene Varianten"))
+
+    spuren.abschnitt("karten")
     # ==========================================
     # GRÜNE KARTEN — FINALE GERÄTEAUSWAHL
     # ==========================================
@@ -3060,51 +7441,43 @@ def main():
         </span>
     </div>""", unsafe_allow_html=True)
 
-    finale_cards = st.columns(5)
-    for i, fcol in enumerate(finale_cards):
-        ig_kw_final = selected_hw[i]
-        ig_artnr_final = "—"
-        ig_preis_final = 0.0
-        ig_serie_final = zone_serien[i]
-        for kw_o, sn_o, lbl_o in IG_OPTIONS:
-            if kw_o == ig_kw_final and sn_o == zone_serien[i]:
-                parts = [p.strip() for p in lbl_o.split("|")]
-                ig_artnr_final = parts[0] if parts else "—"
-                ig_serie_final = parts[2] if len(parts) > 2 else sn_o
-                try:
-                    ig_preis_final = float(
-                        parts[-1].replace(" EUR","").replace(".","").replace(",",".")
-                    )
-                except Exception:
-                    pass
-                break
-        ag_info  = selected_hw_ag[i] if i < len(selected_hw_ag) else ("—", 0, "—")
-        ag_typ   = ag_info[0] if isinstance(ag_info, tuple) else "—"
-        ag_artnr = ag_info[2] if isinstance(ag_info, tuple) and len(ag_info)>2 else "—"
-
-        fcol.markdown(f"""
-            <div style="background:linear-gradient(135deg,#1b5e20,#388e3c);
-                        border-radius:12px;padding:14px 12px;color:white;
-                        box-shadow:0 3px 10px rgba(27,94,32,0.5);margin-bottom:4px;">
-                <div style="font-size:9px;font-weight:800;opacity:0.8;letter-spacing:1px;
-                            text-transform:uppercase;margin-bottom:4px;">
-                    ✅ FINALE — {zone_names[i].upper()}</div>
-                <div style="font-size:15px;font-weight:700;margin:3px 0;">
-                    {"N.V." if ig_kw_final == 0 else f"{ig_kw_final:.1f} kW"}</div>
-                <div style="font-size:9px;opacity:0.92;line-height:1.8;">
-                    ❄️ IG: {ig_artnr_final}<br>
-                    📋 {ig_serie_final}<br>
-                    🌡️ AG ({ag_typ}): {ag_artnr}<br>
-                    💶 {ig_preis_final:.0f} EUR LP (IG)
-                </div>
-            </div>""", unsafe_allow_html=True)
-
+    for blk in zeilen:
+        finale_cards = st.columns(ZONEN_SPALTEN)
+        for i, fcol in zip(blk, finale_cards):
+            ig_kw_final = selected_hw[i]
+            ig_final    = katalog.art_nr.get(selected_ig_artnr[i])
+            ig_artnr_final = ig_final["art_nr"] if ig_final else "—"
+            ig_serie_final = ig_final["serie"] if ig_final else zone_serien[i]
+            ig_preis_final = float(ig_final["preis"]) if ig_final else 0.0
+            ag_info  = selected_hw_ag[i] if i < len(selected_hw_ag) else ("—", 0, "—")
+            ag_typ   = ag_info[0] if isinstance(ag_info, tuple) else "—"
+            ag_artnr = ag_info[2] if isinstance(ag_info, tuple) and len(ag_info)>2 else "—"
+
+            fcol.markdown(f"""
+                <div style="background:linear-gradient(135deg,#1b5e20,#388e3c);
+                            border-radius:12px;padding:14px 12px;color:white;
+                            box-shadow:0 3px 10px rgba(27,94,32,0.5);margin-bottom:4px;">
+                    <div style="font-size:9px;font-weight:800;opacity:0.8;letter-spacing:1px;
+                                text-transform:uppercase;margin-bottom:4px;">
+                        ✅ FINALE — {zone_names[i].upper()}</div>
+                    <div style="font-size:15px;font-weight:700;margin:3px 0;">
+                        {"N.V." if ig_kw_final == 0 else f"{ig_kw_final:.1f} kW"}</div>
+                    <div style="font-size:9px;opacity:0.92;line-height:1.8;">
+                        ❄️ IG: {ig_artnr_final}<br>
+                        📋 {ig_serie_final}<br>
+                        🌡️ AG ({ag_typ}): {ag_artnr}<br>
+                        💶 {ig_preis_final:.0f} EUR LP (IG)
+                    </div>
+                </div>""", unsafe_allow_html=True)
+
+    spuren.abschnitt("diagramme")
     # ==========================================
     # VERGLEICHS-DIAGRAMME
     # ==========================================
     st.markdown('<div class="section-header">📈 Simultan-Trendkurven — Alle Methoden</div>',
                 unsafe_allow_html=True)
 
+    import plotly.graph_objects as go
     _layout_dark = dict(
         template="plotly_white",
         paper_bgcolor='rgba(0,0,0,0)',
@@ -3128,67 +7501,103 @@ def main():
         margin=dict(l=60, r=20, t=50, b=90)
     )
 
-    fig_master = go.Figure()
-    for name, data, color, lw, dash in [
-        ("PRAKTIKER (Heuristik)", g_sums["PRAK"],  "#E74C3C", 3,   "dot"),
-        ("VDI 6007 NEU",          g_sums["VDI_N"], "white",   5,   "solid"),
-        ("VDI 2078 ALT",          g_sums["VDI_A"], "#F39C12", 2.5, "dash"),
-        ("RECKNAGEL",             g_sums["RECK"],  CI_GRAY,   2,   "longdash"),
-        ("KALTLUFTSEE",           g_sums["KLTS"],  "#9B59B6", 2.5, "dashdot"),
-        ("KI-HYBRID",             g_sums["KI"],    "#1ABC9C", 3,   "solid"),
-    ]:
-        fig_master.add_trace(go.Scatter(
-            x=HOURS, y=data, name=name,
-            line=dict(width=lw, color=color, dash=dash)
-        ))
-    fig_master.update_layout(**_layout_dark)
-    st.plotly_chart(fig_master, width="stretch")
+    # Einzelzonen-Diagramme je Methode: (Profil-Key, Titel, Gebäude-Key)
+    ZONEN_DIAGRAMME = [
+        ("vdi_n", "VDI 6007 Neu — Einzelzonen", "VDI_N"),
+        ("vdi_a", "VDI 2078 Alt — Einzelzonen", "VDI_A"),
+        ("prak",  "Praktiker — Einzelzonen",    "PRAK"),
+        ("reck",  "Recknagel — Einzelzonen",    "RECK"),
+        ("klts",  "Kaltluftsee / Quelllüftung", "KLTS"),
+        ("ki",    "KI-Hybrid (Peak-Shaving)",   "KI"),
+    ]
 
-    def plot_zones(mode_key, title, total_key):
-        fig = go.Figure()
-        zone_colors = [CI_BLUE, "#E74C3C", "#2ECC71", "#F39C12", "#9B59B6"]
-        for idx2, p in enumerate(individual_profiles):
+    def diagramme_bauen(ergebnisse, sichtbar):
+        """Plotly-Figuren (Gesamt + Einzelzonen je Methode) — nur bei geänderten Kurven/Seite neu"""
+        g_sums, individual_profiles, _, _ = ergebnisse
+        fig_master = go.Figure()
+        for name, data, color, lw, dash in [
+            ("PRAKTIKER (Heuristik)", g_sums["PRAK"],  "#E74C3C", 3,   "dot"),
+            ("VDI 6007 NEU",          g_sums["VDI_N"], "white",   5,   "solid"),
+            ("VDI 2078 ALT",          g_sums["VDI_A"], "#F39C12", 2.5, "dash"),
+            ("RECKNAGEL",             g_sums["RECK"],  CI_GRAY,   2,   "longdash"),
+            ("KALTLUFTSEE",           g_sums["KLTS"],  "#9B59B6", 2.5, "dashdot"),
+            ("KI-HYBRID",             g_sums["KI"],    "#1ABC9C", 3,   "solid"),
+        ]:
+            fig_master.add_trace(go.Scatter(
+                x=HOURS, y=data, name=name,
+                line=dict(width=lw, color=color, dash=dash)
+            ))
+        fig_master.update_layout(**_layout_dark)
+
+        def plot_zones(mode_key, title, total_key):
+            fig = go.Figure()
+            zone_colors = [CI_BLUE, "#E74C3C", "#2ECC71", "#F39C12", "#9B59B6"]
+            for idx2 in sichtbar:               # Einzelzonen der sichtbaren Seite + Gesamtkurve
+                p = individual_profiles[idx2]
+                fig.add_trace(go.Scatter(
+                    x=HOURS, y=p[mode_key], name=p["name"],
+                    line=dict(width=2, color=zone_colors[idx2 % len(zone_colors)], dash='dash'),
+                    opacity=0.8
+                ))
             fig.add_trace(go.Scatter(
-                x=HOURS, y=p[mode_key], name=p["name"],
-                line=dict(width=2, color=zone_colors[idx2 % len(zone_colors)], dash='dash'),
-                opacity=0.8
+                x=HOURS, y=g_sums[total_key], name="GESAMT SIMULTAN",
+                line=dict(width=5, color="#3C3C3B")
             ))
-        fig.add_trace(go.Scatter(
-            x=HOURS, y=g_sums[total_key], name="GESAMT SIMULTAN",
-            line=dict(width=5, color="#3C3C3B")
-        ))
-        layout = dict(_layout_light)
-        layout["title"] = dict(text=title,
-                               font=dict(color=CI_GRAY, size=14, family='Arial Black'))
-        fig.update_layout(**layout)
-        return fig
+            layout = dict(_layout_light)
+            layout["title"] = dict(text=title,
+                                   font=dict(color=CI_GRAY, size=14, family='Arial Black'))
+            fig.update_layout(**layout)
+            return fig
+
+        return fig_master, [plot_zones(*d) for d in ZONEN_DIAGRAMME]
+
+    graph.eingabe("seite", list(sichtbar))
+    fig_master, zonen_figs = graph.knoten("diagramme", diagramme_bauen, "ergebnisse", "seite")
+    st.plotly_chart(fig_master, width="stretch")
 
     st.markdown("<div style='font-size:11px;font-weight:700;color:rgba(255,255,255,0.5);"
                 "text-transform:uppercase;letter-spacing:1px;margin:12px 0 4px 0;'>"
                 "Einzelzonen-Diagramme</div>", unsafe_allow_html=True)
 
-    c1, c2 = st.columns(2)
-    with c1:
-        st.plotly_chart(plot_zones("vdi_n", "VDI 6007 Neu — Einzelzonen", "VDI_N"),
-                        width="stretch")
-    with c2:
-        st.plotly_chart(plot_zones("vdi_a", "VDI 2078 Alt — Einzelzonen", "VDI_A"),
-                        width="stretch")
-    c3, c4 = st.columns(2)
-    with c3:
-        st.plotly_chart(plot_zones("prak", "Praktiker — Einzelzonen", "PRAK"),
-                        width="stretch")
-    with c4:
-        st.plotly_chart(plot_zones("reck", "Recknagel — Einzelzonen", "RECK"),
-                        width="stretch")
-    c5, c6 = st.columns(2)
-    with c5:
-        st.plotly_chart(plot_zones("klts", "Kaltluftsee / Quelllüftung", "KLTS"),
-                        width="stretch")
-    with c6:
-        st.plotly_chart(plot_zones("ki", "KI-Hybrid (Peak-Shaving)", "KI"),
-                        width="stretch")
+    for links, rechts in zip(zonen_figs[::2], zonen_figs[1::2]):
+        c1, c2 = st.columns(2)
+        with c1:
+            st.plotly_chart(links, width="stretch")
+        with c2:
+            st.plotly_chart(rechts, width="stretch")
+
+    # Rechengraph: Zeiten je Knoten dieses Laufs (↻ neu berechnet, ✓ aus dem Vorlauf)
+    if admin_panel:
+        graph_zeilen, graph_ms = graph.protokoll()
+        with st.sidebar.expander(f"⏱️ Rechengraph — {graph_ms:.0f} ms"):
+            st.dataframe([{"Knoten": z["knoten"], "ms": z["ms"], "": "↻" if z["neu"] else "✓"}
+                          for z in graph_zeilen], width="stretch", hide_index=True)
+
+    spuren.abschnitt("jahressimulation")
+    # ==========================================
+    # JAHRESSIMULATION (8760 h)
+    # ==========================================
+    with st.expander("📅 Jahressimulation — 8760 h Wetterreihe (TRY)"):
+        st.caption("CSV mit Spalten t_aussen [°C] und Strahlung je Ausrichtung [W/m²] "
+                   f"({', '.join(SOLAR_DB.keys())}), optional zeit. Trennzeichen , oder ;")
+        jx1, jx2 = st.columns([3, 1])
+        wetter_file = jx1.file_uploader("WETTERREIHE (CSV)", type=["csv"], key="jahr_csv")
+        t_soll      = jx2.number_input("RAUMSOLL [°C]", 20.0, 30.0, T_INNEN_SOLL, step=0.5, key="jahr_tsoll")
+        if wetter_file is not None and st.button("▶️ JAHRESSIMULATION STARTEN", width="stretch"):
+            with st.spinner("⏳ Simuliere 8760 Stunden..."):
+                try:
+                    jahr = simuliere_jahr(zone_params, load_jahresreihe(wetter_file), t_innen=t_soll)
+                    st.dataframe([{
+                        "Methode":           METHODEN_RESULT_KEYS[k],
+                        "Jahrespeak [W]":    v["peak_w"],
+                        "Zeitpunkt":         v["zeitpunkt"],
+                        "Kühlenergie [kWh]": v["energie_kwh"],
+                    } for k, v in jahr["methoden"].items()], width="stretch", hide_index=True)
+                    st.caption(f"{jahr['stunden']} Stunden simuliert | Raumsoll {jahr['t_innen']:.1f} °C")
+                except Exception as e:
+                    st.error(f"Fehler: {e}")
 
+    spuren.abschnitt("export")
     # ==========================================
     # EXPORT SEKTION
     # ==========================================
@@ -3239,30 +7648,32 @@ def main():
         </div>
         """, unsafe_allow_html=True)
         
-        if st.button("🔧 TECHNIKÜBERGABE GENERIEREN", width="stretch"):
-            with st.spinner("⚙️ PDF wird erstellt..."):
-                try:
-                    pdf_bytes = generate_uebergabe_pdf(
-                        proj_name, kunde_name, bearbeiter, firma,
-                        room_results, g_sums, individual_profiles,
-                        samsung_recs, selected_hw, total_kw,
-                        selected_hw_ag=selected_hw_ag,
-                        room_inputs=room_inputs_list,
-                        partner_firma=partner_firma,
-                        selected_ig_artnr=selected_ig_artnr,
-                        liefertermin=liefertermin_str
-                    )
-                    st.download_button(
-                        "⬇️ DOWNLOAD TECHNIKÜBERGABE",
-                        data=pdf_bytes,
-                        file_name=f"coolMATH_Uebergabe_{proj_name}_{datetime.now().strftime('%Y%m%d')}.pdf",
-                        mime="application/pdf",
-                        width="stretch",
-                        key="pdf_tech_dl"
-                    )
-                    st.success("✅ Technikübergabe bereit!")
-                except Exception as e:
-                    st.error(f"Fehler: {e}")
+        gestartet = st.button("🔧 TECHNIKÜBERGABE GENERIEREN", width="stretch")
+        try:
+            pdf_bytes = bericht_erstellen(
+                "tech", "⚙️ PDF wird erstellt...", gestartet,
+                lambda progress: generate_uebergabe_pdf(
+                    proj_name, kunde_name, bearbeiter, firma,
+                    room_results, g_sums, individual_profiles,
+                    samsung_recs, selected_hw, total_kw,
+                    selected_hw_ag=selected_hw_ag,
+                    room_inputs=room_inputs_list,
+                    partner_firma=partner_firma,
+                    selected_ig_artnr=selected_ig_artnr,
+                    liefertermin=liefertermin_str,
+                    progress=progress))
+            if pdf_bytes:
+                st.download_button(
+                    "⬇️ DOWNLOAD TECHNIKÜBERGABE",
+                    data=pdf_bytes,
+                    file_name=f"coolMATH_Uebergabe_{proj_name}_{datetime.now().strftime('%Y%m%d')}.pdf",
+                    mime="application/pdf",
+                    width="stretch",
+                    key="pdf_tech_dl"
+                )
+                st.success("✅ Technikübergabe bereit!")
+        except Exception as e:
+            st.error(f"Fehler: {e}")
     
     # 3. Kundenbericht PDF
     with exp3:
@@ -3278,30 +7689,33 @@ def main():
         </div>
         """, unsafe_allow_html=True)
         
-        if st.button("📄 KUNDENBERICHT GENERIEREN", width="stretch"):
-            with st.spinner("📑 Kundenbericht wird erstellt..."):
-                try:
-                    pdf_bytes = generate_kunden_pdf(
-                        proj_name, kunde_name, bearbeiter, firma,
-                        room_results, g_sums, individual_profiles,
-                        samsung_recs, selected_hw, total_kw,
-                        selected_hw_ag=selected_hw_ag,
-                        room_inputs=room_inputs_list,
-                        partner_firma=partner_firma,
-                        selected_ig_artnr=selected_ig_artnr
-                    )
-                    st.download_button(
-                        "⬇️ DOWNLOAD KUNDENBERICHT",
-                        data=pdf_bytes,
-                        file_name=f"coolMATH_Kundenbericht_{proj_name}_{datetime.now().strftime('%Y%m%d')}.pdf",
-                        mime="application/pdf",
-                        width="stretch",
-                        key="pdf_kd_dl"
-                    )
-                    st.success("✅ Kundenbericht bereit!")
-                except Exception as e:
-                    st.error(f"Fehler: {e}")
+        gestartet = st.button("📄 KUNDENBERICHT GENERIEREN", width="stretch")
+        try:
+            pdf_bytes = bericht_erstellen(
+                "kunde", "📑 Kundenbericht wird erstellt...", gestartet,
+                lambda progress: generate_kunden_pdf(
+                    proj_name, kunde_name, bearbeiter, firma,
+                    room_results, g_sums, individual_profiles,
+                    samsung_recs, selected_hw, total_kw,
+                    selected_hw_ag=selected_hw_ag,
+                    room_inputs=room_inputs_list,
+                    partner_firma=partner_firma,
+                    selected_ig_artnr=selected_ig_artnr,
+                    progress=progress))
+            if pdf_bytes:
+                st.download_button(
+                    "⬇️ DOWNLOAD KUNDENBERICHT",
+                    data=pdf_bytes,
+                    file_name=f"coolMATH_Kundenbericht_{proj_name}_{datetime.now().strftime('%Y%m%d')}.pdf",
+                    mime="application/pdf",
+                    width="stretch",
+                    key="pdf_kd_dl"
+                )
+                st.success("✅ Kundenbericht bereit!")
+        except Exception as e:
+            st.error(f"Fehler: {e}")
     
+    spuren.abschnitt("word_db_monday")
     # ==========================================
     # WORD-EXPORT + DB-SPEICHERUNG + MONDAY + EXCEL
     # ==========================================
@@ -3343,7 +7757,10 @@ def main():
             with st.spinner("Speichere..."):
                 pid = db_save_project(
                     partner_firma, auth_username, proj_name, kunde_name, bearbeiter,
-                    room_inputs_list, room_results, g_sums, selected_hw, selected_hw_ag
+                    room_inputs_list, room_results, g_sums, selected_hw, selected_hw_ag,
+                    zonen=tabelle.als_dicts(),
+                    gebaeude={"standard": bau_std, "bau_m": bau_m, "raumhoehe": raumhoehe},
+                    selected_ig_artnr=selected_ig_artnr, kurven=kurven
                 )
                 if pid:
                     st.success(f"✅ Gespeichert! Projekt-ID: `{pid}`")
@@ -3362,35 +7779,50 @@ def main():
             if not mon.is_configured():
                 st.warning("⚠️ Monday.com nicht konfiguriert. Bitte API-Token + Board-ID in st.secrets['monday'] eintragen.")
             else:
-                with st.spinner("📤 Upload läuft..."):
-                    try:
-                        # Sicherstellen dass samsung_recs nicht None ist
-                        _samsung_recs = samsung_recs if samsung_recs else []
-                        # PDF für Anhang
-                        _pdf_mon = generate_uebergabe_pdf(
-                            proj_name, kunde_name, bearbeiter, firma,
-                            room_results, g_sums, individual_profiles,
-                            _samsung_recs, selected_hw, total_kw,
-                            selected_hw_ag=selected_hw_ag,
-                            room_inputs=room_inputs_list, partner_firma=partner_firma,
-                            selected_ig_artnr=selected_ig_artnr
-                        )
+                try:
+                    # Projekt archivieren (projekt_id = Idempotenzschlüssel); unveränderter
+                    # Stand → gleiche projekt_id, ein zweiter Klick reiht nichts Neues ein
+                    gebaeude = {"standard": bau_std, "bau_m": bau_m, "raumhoehe": raumhoehe}
+                    stand = _fingerabdruck((proj_name, kunde_name, bearbeiter, partner_firma,
+                                            tabelle.als_dicts(), gebaeude, selected_hw,
+                                            selected_hw_ag, selected_ig_artnr))
+                    vorher = st.session_state.get("monday_upload")
+                    pid = vorher[1] if vorher and vorher[0] == stand else db_save_project(
+                        partner_firma, auth_username, proj_name, kunde_name, bearbeiter,
+                        room_inputs_list, room_results, g_sums, selected_hw, selected_hw_ag,
+                        zonen=tabelle.als_dicts(), gebaeude=gebaeude,
+                        selected_ig_artnr=selected_ig_artnr, kurven=kurven)
+                    if pid:
                         geraete_str = " | ".join([
-                            f"Z{zi+1}: {selected_hw[zi]:.1f}kW" for zi in range(5) if selected_hw[zi]>0
+                            f"Z{zi+1}: {selected_hw[zi]:.1f}kW" for zi in range(len(selected_hw)) if selected_hw[zi]>0
                         ])
-                        ok, item_id = mon.save_to_monday({
+                        neu = db_outbox_einreihen(pid, {
                             "projekt":    proj_name,
                             "kunde":      kunde_name,
                             "bearbeiter": bearbeiter,
                             "peak_kw":    round(float(np.max(g_sums["VDI_N"]))/1000, 2),
                             "geraete":    geraete_str,
-                        }, _pdf_mon, f"coolMATH_{proj_name}.pdf")
-                        if ok:
-                            st.success(f"✅ Monday.com Item: {item_id}")
+                        }, f"coolMATH_{proj_name}.pdf")
+                        st.session_state["monday_upload"] = (stand, pid)
+                        monday_outbox().wecken()
+                        if neu:
+                            st.success(f"📤 In der Warteschlange (Projekt-ID `{pid}`) — "
+                                       f"Upload läuft im Hintergrund.")
                         else:
-                            st.error(f"Fehler: {item_id}")
-                    except Exception as e:
-                        st.error(f"Monday-Fehler: {e}")
+                            st.info("ℹ️ Dieser Projektstand ist bereits eingereiht bzw. übertragen.")
+                except Exception as e:
+                    st.error(f"Monday-Fehler: {e}")
+
+        if st.session_state.get("monday_upload"):
+            _mpid = st.session_state["monday_upload"][1]
+
+            def monday_status():
+                st.caption(monday_outbox_text(db_outbox_status(_mpid)))
+
+            # solange der Auftrag aussteht, aktualisiert sich nur die Statuszeile
+            _mst = db_outbox_status(_mpid)
+            st.fragment(monday_status, run_every=3 if _mst and _mst["status"] in ("offen", "laeuft")
+                        else None)()
     
     with wrd4:
         st.markdown("""<div class="card-blue"><div style="font-size:11px;font-weight:700;opacity:0.8;margin-bottom:8px">
@@ -3417,21 +7849,52 @@ def main():
                 except Exception as e:
                     st.error(f"Fehler: {e}")
 
+    spuren.abschnitt("archiv")
     # ==========================================
     # PROJEKTARCHIV
     # ==========================================
     with st.expander("📂 Projektarchiv — gespeicherte Projekte"):
-        projekte = db_load_projects(partner_firma, auth_role)
+        if auth_role == "admin":
+            st.caption("👑 Admin-Ansicht: alle Projekte aller Firmen")
+        else:
+            st.caption(f"🔒 Nur Projekte von: {partner_firma}")
+
+        # Filter gelten für Liste und Sammel-Export; abgefragt wird nur die sichtbare Seite
+        fa1, fa2 = st.columns([3, 1])
+        arch_suche = fa1.text_input("SUCHE (Projekt / Kunde / Bearbeiter)", key="archiv_suche")
+        arch_sort  = fa2.selectbox("SORTIERUNG", list(ARCHIV_SORTIERUNGEN), key="archiv_sort")
+        fx1, fx2, fx3 = st.columns(3)
+        exp_von = fx1.date_input("GESPEICHERT AB", value=None, key="archiv_von")
+        exp_bis = fx2.date_input("BIS", value=None, key="archiv_bis")
+        exp_min = fx3.number_input("PEAK AB [kW]", min_value=0.0, value=0.0, step=1.0,
+                                   key="archiv_min_kw", help="Gebäude-Simultanpeak VDI 6007")
+        exp_filter = (partner_firma, auth_role, exp_von, exp_bis, arch_suche.strip(),
+                      exp_min * 1000 or None)
+        exp_anzahl = db_projekte_zaehlen(*exp_filter)
+
+        # Seiten-Cursor der besuchten Seiten; neuer Filter / neue Sortierung → Seite 1
+        if st.session_state.get("archiv_abfrage") != (exp_filter, arch_sort):
+            st.session_state["archiv_abfrage"] = (exp_filter, arch_sort)
+            st.session_state["archiv_cursor"] = [None]
+        cursor = st.session_state["archiv_cursor"]
+        projekte, naechste = db_projekte_seite(*exp_filter, sortierung=arch_sort, nach=cursor[-1])
+        if not projekte and len(cursor) > 1:          # Seite inzwischen leer → Seite 1
+            del cursor[1:]
+            projekte, naechste = db_projekte_seite(*exp_filter, sortierung=arch_sort)
+
         if projekte:
-            if auth_role == "admin":
-                st.caption("👑 Admin-Ansicht: alle Projekte aller Firmen")
-            else:
-                st.caption(f"🔒 Nur Projekte von: {partner_firma}")
-            
-            # DataFrame mit View-Controls
+            import pandas as pd
             proj_df = pd.DataFrame(projekte,
-                columns=["ID","Firma","Projekt","Kunde","Bearbeiter","Datum"])
+                columns=["ID","Firma","Projekt","Kunde","Bearbeiter","Datum","Monday"])
             st.dataframe(proj_df, width="stretch", hide_index=True)
+
+            seiten = max(1, -(-exp_anzahl // ARCHIV_SEITE))
+            nav1, nav2, nav3 = st.columns([1, 2, 1])
+            nav1.button("◀ ZURÜCK", width="stretch", key="archiv_zurueck",
+                        disabled=len(cursor) == 1, on_click=cursor.pop)
+            nav2.caption(f"Seite {len(cursor)} von {seiten} · {exp_anzahl} Projekt(e) im Filter")
+            nav3.button("WEITER ▶", width="stretch", key="archiv_weiter",
+                        disabled=naechste is None, on_click=cursor.append, args=(naechste,))
             
             st.divider()
             
@@ -3448,38 +7911,92 @@ def main():
             with col2:
                 if st.button("📥 LADEN", type="primary", width="stretch"):
                     proj_id = projekt_optionen[selected]
-                    row = db_load_project(proj_id)
-                    if row:
+                    p = db_load_project(proj_id)
+                    if p:
                         try:
-                            import json as _json
-                            room_data_json = row[8] if len(row) > 8 else '{}'
-                            results_json   = row[9] if len(row) > 9 else '{}'
-                            devices_json   = row[10] if len(row) > 10 else '{}'
-                            
-                            room_data = _json.loads(room_data_json) if room_data_json else {}
-                            results   = _json.loads(results_json) if results_json else {}
-                            devices   = _json.loads(devices_json) if devices_json else {}
-                            
                             st.session_state['loaded_project'] = {
-                                'projekt': row[4],
-                                'kunde': row[5],
-                                'bearbeiter': row[6],
-                                'room_inputs': room_data.get('room_inputs', []),
-                                'room_results': results.get('room_results', []),
-                                'peaks': results.get('peaks', {}),
-                                'selected_hw': devices.get('selected_hw', [0,0,0,0,0]),
-                                'selected_hw_ag': devices.get('selected_hw_ag', []),
+                                k: p[k] for k in ('projekt', 'kunde', 'bearbeiter', 'room_results',
+                                                  'peaks', 'selected_hw', 'selected_hw_ag')
                             }
+                            if p['zonen']:
+                                st.session_state['zonen_laden'] = ZonenTabelle.aus_zonen(p['zonen'])
                             
-                            st.success(f"✅ Projekt '{row[4]}' geladen!")
+                            st.success(f"✅ Projekt '{p['projekt']}' geladen!")
                             st.rerun()
                         except Exception as e:
                             st.error(f"Fehler: {e}")
                     else:
                         st.error("Laden fehlgeschlagen")
+
+            # Kurven-Überlagerung: Gebäude-Simultankurven mehrerer Projekte der Seite
+            st.divider()
+            st.markdown("**📈 Kurven vergleichen** — Gebäude-Simultankurven gespeicherter Projekte")
+            seite_ids = [p[0] for p in projekte]
+            ov1, ov2 = st.columns([3, 1])
+            vergleich = ov1.multiselect(
+                "PROJEKTE", seite_ids, max_selections=8,
+                format_func=lambda pid: next(f"{p[2]} | {p[3]} | {p[5]}" for p in projekte if p[0] == pid),
+                key="archiv_vergleich_" + hashlib.md5("".join(seite_ids).encode()).hexdigest()[:8])
+            vgl_methode = ov2.selectbox("METHODE", METHODEN_KEYS, format_func=METHODEN_RESULT_KEYS.get,
+                                        key="archiv_vergleich_methode")
+            if vergleich:
+                vgl_kurven = archiv_kurven(vergleich)
+                fig_vgl = go.Figure()
+                for pid in vergleich:
+                    if pid in vgl_kurven:
+                        y = vgl_kurven[pid][METHODEN_KEYS.index(vgl_methode)]
+                        fig_vgl.add_trace(go.Scatter(
+                            x=np.arange(len(y)), y=y, line=dict(width=2.5),
+                            name=next(f"{p[2]} | {p[3]}" for p in projekte if p[0] == pid)))
+                layout = dict(_layout_light)
+                layout["title"] = dict(text=f"{METHODEN_RESULT_KEYS[vgl_methode]} — Gebäude-Simultankurven",
+                                       font=dict(color=CI_GRAY, size=14, family='Arial Black'))
+                fig_vgl.update_layout(**layout)
+                st.plotly_chart(fig_vgl, width="stretch")
+
+            # Sammel-Export: gefilterte Projekte → ZIP (Worker-Prozesse, ZIP als Temp-Datei)
+            st.divider()
+            st.markdown("**📦 Sammel-Export** — Kundenbericht, Technikübergabe, "
+                        "Excel-Anfrage und Übergabe-JSON je Projekt als ZIP")
+            gestartet = st.button("📦 ZIP-EXPORT STARTEN", width="stretch",
+                                  disabled=not exp_anzahl, key="archiv_export")
+
+            def _zip_erzeugen(progress):
+                tmp = tempfile.NamedTemporaryFile(suffix=".zip", delete=False)
+                try:
+                    with tmp:
+                        r = archiv_export(tmp, *exp_filter, progress=progress)
+                except BaseException:          # auch Abbruch per Rerun
+                    os.remove(tmp.name)
+                    raise
+                return tmp.name, r
+
+            try:
+                export = bericht_erstellen("archiv", "📦 Sammel-Export läuft...", gestartet,
+                                           _zip_erzeugen, einheit="Projekt")
+                if export:
+                    zip_pfad, r = export
+                    with open(zip_pfad, "rb") as f:
+                        st.download_button(
+                            "⬇️ DOWNLOAD ZIP",
+                            data=f.read(),
+                            file_name=f"coolMATH_Archiv_{datetime.now().strftime('%Y%m%d_%H%M')}.zip",
+                            mime="application/zip",
+                            width="stretch",
+                            key="archiv_zip_dl"
+                        )
+                    os.remove(zip_pfad)
+                    st.success(f"✅ {r['projekte'] - len(r['fehler'])}/{r['projekte']} Projekte exportiert")
+                    if r["fehler"]:
+                        st.warning("⚠️ " + " | ".join(r["fehler"][:5]) + " (vollständig in FEHLER.txt)")
+            except Exception as e:
+                st.error(f"Fehler: {e}")
+        elif any(exp_filter[2:]):
+            st.info("Keine Projekte im Filter.")
         else:
             st.info("Noch keine gespeicherten Projekte.")
 
+    spuren.abschnitt("footer")
     # --- Footer ---
     st.write("---")
     st.markdown(f"""
@@ -3491,6 +8008,13 @@ def main():
     </div>
     """, unsafe_allow_html=True)
 
+    # Zeitspuren: Lauf ablegen, Wasserfall der letzten Läufe (Admin)
+    laeufe = zeitspuren_abschliessen(spuren)
+    if admin_panel:
+        zeitspuren_panel(laeufe)
+
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] in CLI_BEFEHLE:
+        sys.exit(cli(sys.argv[1:]))
     main()
\ No newline at end of file